@@ -1,9 +1,13 @@
 # pylint: disable=pointless-string-statement
 """This is the entry point to the python program."""
+import argparse
+from pathlib import Path
+
 from portfolio_allocation.non_blend_fund_asset_allocation import (
     generate_combined_non_blend_fund_asset_allocation,
 )
 from portfolio_allocation.blend_fund_asset_allocation import (
+    DEFAULT_JOBS,
     generate_combined_blend_fund_asset_allocation,
 )
 
@@ -16,6 +20,9 @@ from portfolio_allocation.generate_html_outputs import (
     update_asset_allocation_html,
     open_local_html,
 )
+from portfolio_allocation.morningstar_cassette import use_cassettes_from_environment
+from portfolio_allocation.rebalancing import load_target_percentages, rebalance
+from portfolio_allocation.scenarios import evaluate_scenarios, load_scenarios
 
 if __name__ == "__main__":
     """
@@ -28,13 +35,59 @@ if __name__ == "__main__":
         for the specific account.
     step3: combine blend funds and create html table.
     step4: open html table.
+    Set PORTFOLIO_ALLOCATION_CASSETTE_MODE to record or replay to record the
+    morningstar responses or to replay them without network access.
+    Pass --jobs to parse the account statements in several processes.
+    Pass --incremental to only parse the accounts whose statement,
+    configuration or fund asset allocations changed since the last run.
+    Pass --rebalance-target to print the blend fund trades towards target asset
+    class percentages and --scenarios to print the tables of what if scenarios.
     """
+    parser = argparse.ArgumentParser(description="Calculates portfolio allocation.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="the number of processes parsing account statements at the same time.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only recompute accounts whose inputs changed since the last run.",
+    )
+    parser.add_argument(
+        "--rebalance-target",
+        type=Path,
+        default=None,
+        help="a JSON file with the target percentage of every asset class.",
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=Path,
+        default=None,
+        help="a JSON file with the what if scenarios to evaluate.",
+    )
+    arguments = parser.parse_args()
+    use_cassettes_from_environment()
     non_blend_fund_asset_allocation = (
         generate_combined_non_blend_fund_asset_allocation()
     )
-    blend_fund_asset_allocation = generate_combined_blend_fund_asset_allocation()
+    blend_fund_asset_allocation = generate_combined_blend_fund_asset_allocation(
+        jobs=arguments.jobs,
+        incremental=arguments.incremental,
+    )
+    stale_funds = [
+        fund_ticker for fund_ticker, _ in blend_fund_asset_allocation.stale_fund_keys
+    ]
+    if stale_funds:
+        print(f"Degraded result, using last known asset allocations for {stale_funds}.")
+    failed_funds = [
+        fund_ticker for fund_ticker, _ in blend_fund_asset_allocation.failed_fund_keys
+    ]
+    if failed_funds:
+        print(f"Degraded result, leaving out {failed_funds} without asset allocations.")
     all_asset_allocation = combine_all_asset_allocation(
-        blend_fund_asset_allocation=blend_fund_asset_allocation,
+        blend_fund_asset_allocation=blend_fund_asset_allocation.asset_allocation,
         non_blend_fund_asset_allocation=non_blend_fund_asset_allocation,
     )
     asset_allocation_by_asset_class_table = (
@@ -47,8 +100,31 @@ if __name__ == "__main__":
             asset_allocation_by_asset_class_table=asset_allocation_by_asset_class_table,
         )
     )
+    if arguments.rebalance_target:
+        rebalance_plan = rebalance(
+            holdings=blend_fund_asset_allocation.holdings,
+            target_percentages=load_target_percentages(
+                file_path=arguments.rebalance_target
+            ),
+        )
+        for trade in rebalance_plan.trades:
+            print(f"{trade.account} {trade.fund_name}: {trade.amount:+.2f}")
+        print(
+            f"Turnover {rebalance_plan.turnover:.2f}, "
+            f"tracking error {rebalance_plan.tracking_error:.2f}."
+        )
+    if arguments.scenarios:
+        for scenario_result in evaluate_scenarios(
+            holdings=blend_fund_asset_allocation.holdings,
+            asset_values=non_blend_fund_asset_allocation,
+            scenarios=load_scenarios(file_path=arguments.scenarios),
+        ):
+            print(scenario_result.name)
+            print(scenario_result.asset_allocation_by_region_and_asset_class_table)
     update_asset_allocation_html(
         asset_table_without_region=asset_allocation_by_asset_class_table,
         asset_table_with_region=asset_allocation_by_region_and_asset_class_table,
+        stale_funds=stale_funds,
+        failed_funds=failed_funds,
     )
     open_local_html()
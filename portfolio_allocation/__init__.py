@@ -1,6 +1,11 @@
 # pylint: disable=missing-module-docstring
+import importlib
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from types import ModuleType
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
 
 PORTFOLIO_BREAKDOWN: Dict[str, float] = {
     "us_stock": 0,
@@ -10,6 +15,9 @@ PORTFOLIO_BREAKDOWN: Dict[str, float] = {
     "cash": 0,
     "other": 0,
 }
+ASSET_CLASSES: Tuple[str, ...] = tuple(PORTFOLIO_BREAKDOWN)
+ALL_ASSET_CLASSES: Tuple[str, ...] = (*ASSET_CLASSES, "mortgage")
+CONFIGURATION_MODULE: str = "portfolio_allocation.configuration"
 
 
 def combine_portfolios(
@@ -31,4 +39,203 @@ def combine_portfolios(
     }
 
 
+def load_configuration() -> ModuleType:
+    """
+    Imports the local configuration module on first use instead of at import
+    time, so entry points that bring their own configuration, such as the
+    household batch, run without it.
+    Returns:
+        the portfolio_allocation.configuration module.
+    """
+    return importlib.import_module(CONFIGURATION_MODULE)
+
+
+@lru_cache(maxsize=None)
+def _asset_class_index(asset_classes: Tuple[str, ...]) -> Dict[str, int]:
+    """
+    Maps the asset classes of an axis to their buffer positions once per axis.
+    Args:
+        asset_classes (Tuple[str, ...]): the asset class axis.
+
+    Returns:
+        the buffer position of every asset class.
+    """
+    return {asset_class: index for index, asset_class in enumerate(asset_classes)}
+
+
+class Portfolio:
+    """
+    A portfolio stored as one float buffer along a fixed asset class axis instead
+    of a dictionary, so accumulating accounts adds into the same buffer in place.
+    Portfolios can only be combined with portfolios of the same axis.
+    """
+
+    __slots__ = ("asset_classes", "values")
+
+    def __init__(
+        self,
+        values: Optional[np.ndarray] = None,
+        asset_classes: Tuple[str, ...] = ASSET_CLASSES,
+    ) -> None:
+        """
+        Args:
+            values (Optional[np.ndarray]): the US dollar value of every asset class
+            along asset_classes, used without copying. None starts at all zeros.
+            asset_classes (Tuple[str, ...]): the asset class axis.
+        """
+        if values is None:
+            values = np.zeros(len(asset_classes))
+        if values.shape != (len(asset_classes),):
+            raise ValueError(
+                f"Expected {len(asset_classes)} asset values, got {values.shape}."
+            )
+        self.asset_classes = asset_classes
+        self.values = values
+
+    @classmethod
+    def from_dict(
+        cls,
+        portfolio: Dict[str, float],
+        asset_classes: Tuple[str, ...] = ASSET_CLASSES,
+    ) -> "Portfolio":
+        """
+        Creates a portfolio from a portfolio dictionary.
+        Args:
+            portfolio (Dict[str, float]): the US dollar value of asset types,
+            asset types can be missing.
+            asset_classes (Tuple[str, ...]): the asset class axis.
+
+        Returns:
+            the portfolio.
+        """
+        new_portfolio = cls(asset_classes=asset_classes)
+        new_portfolio.add_dict(portfolio=portfolio)
+        return new_portfolio
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Returns:
+            the US dollar value of every asset class on the axis.
+        """
+        return dict(zip(self.asset_classes, self.values.tolist()))
+
+    @property
+    def total(self) -> float:
+        """
+        Returns:
+            the US dollar value of the whole portfolio.
+        """
+        return float(self.values.sum())
+
+    def add(self, asset_type: str, asset_value: float) -> None:
+        """
+        Adds a value to one asset class in place.
+        Args:
+            asset_type (str): the asset class.
+            asset_value (float): the US dollar value to add.
+
+        Raises:
+            ValueError: the asset class is not on the axis.
+        """
+        self.values[self._index(asset_type=asset_type)] += asset_value
+
+    def add_dict(self, portfolio: Dict[str, float]) -> None:
+        """
+        Adds a portfolio dictionary in place.
+        Args:
+            portfolio (Dict[str, float]): the US dollar value of asset types.
+
+        Raises:
+            ValueError: an asset type is not on the axis.
+        """
+        for asset_type, asset_value in portfolio.items():
+            self.add(asset_type=asset_type, asset_value=asset_value)
+
+    def percentages(self) -> "Portfolio":
+        """
+        Normalizes the portfolio to percentages of its total.
+        Returns:
+            a new portfolio with the percentage of every asset class, all zeros
+            when the total is zero.
+        """
+        total = self.total
+        if total == 0:
+            return Portfolio(asset_classes=self.asset_classes)
+        return Portfolio(
+            values=self.values * (100.0 / total), asset_classes=self.asset_classes
+        )
+
+    def copy(self) -> "Portfolio":
+        """
+        Returns:
+            a portfolio with its own copy of the buffer.
+        """
+        return Portfolio(values=self.values.copy(), asset_classes=self.asset_classes)
+
+    def __getitem__(self, asset_type: str) -> float:
+        return float(self.values[self._index(asset_type=asset_type)])
+
+    def __iadd__(self, other: "Portfolio") -> "Portfolio":
+        self._check_axis(other=other)
+        np.add(self.values, other.values, out=self.values)
+        return self
+
+    def __add__(self, other: "Portfolio") -> "Portfolio":
+        return self.copy().__iadd__(other)
+
+    def __imul__(self, factor: Union[float, int]) -> "Portfolio":
+        np.multiply(self.values, factor, out=self.values)
+        return self
+
+    def __mul__(self, factor: Union[float, int]) -> "Portfolio":
+        return self.copy().__imul__(factor)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Portfolio):
+            return NotImplemented
+        return self.asset_classes == other.asset_classes and bool(
+            np.array_equal(self.values, other.values)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Portfolio({self.to_dict()})"
+
+    def _index(self, asset_type: str) -> int:
+        """
+        Finds the buffer position of an asset class.
+        Args:
+            asset_type (str): the asset class.
+
+        Returns:
+            the buffer position.
+
+        Raises:
+            ValueError: the asset class is not on the axis.
+        """
+        index = _asset_class_index(self.asset_classes).get(asset_type)
+        if index is None:
+            raise ValueError(f"Unknown asset type {asset_type}.")
+        return index
+
+    def _check_axis(self, other: "Portfolio") -> None:
+        """
+        Checks another portfolio can be combined with this one.
+        Args:
+            other (Portfolio): the other portfolio.
+
+        Raises:
+            ValueError: the portfolios have different asset class axes.
+        """
+        if other.asset_classes != self.asset_classes:
+            raise ValueError(
+                f"Cannot combine portfolios along {self.asset_classes} and "
+                f"{other.asset_classes}."
+            )
+
+
 ROOT_DIR: Path = Path(__file__).parent.parent
+CACHE_DIR: Path = ROOT_DIR / ".cache"
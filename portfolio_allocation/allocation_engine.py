@@ -0,0 +1,172 @@
+"""This module contains the allocation engine that computes blend fund portfolios
+with NumPy instead of one dictionary per fund. PORTFOLIO_BREAKDOWN is encoded as
+a fixed asset class axis, the asset allocations of the funds are stacked into a
+fund by asset class matrix and the fund values form a holdings vector, so a
+portfolio is one matrix vector product. Dictionaries are only built at the
+edges, where portfolios enter or leave the engine, and totals accumulate into
+one preallocated Portfolio buffer."""
+from typing import Dict, Iterable, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from portfolio_allocation import ASSET_CLASSES, Portfolio
+
+
+class FundHolding(NamedTuple):
+    """The value held of one fund in one account and the fund asset allocation."""
+
+    account: str
+    fund_name: str
+    value: float
+    asset_allocation: Dict[str, float]
+
+
+def allocation_matrix(
+    fund_names: Sequence[str], fund_mapping: Dict[str, Dict[str, float]]
+) -> np.ndarray:
+    """
+    Stacks the asset allocation of funds into a matrix. Asset types outside of
+    PORTFOLIO_BREAKDOWN are ignored and missing asset types count as 0.
+    Args:
+        fund_names (Sequence[str]): the fund names, one row per name.
+        fund_mapping (Dict[str, Dict[str, float]]): the asset allocation of every
+        fund with fund name as key.
+
+    Returns:
+        a fund by asset class matrix of allocation fractions.
+    """
+    return stack_asset_allocations(
+        asset_allocations=[fund_mapping[fund_name] for fund_name in fund_names]
+    )
+
+
+def stack_asset_allocations(
+    asset_allocations: Sequence[Dict[str, float]]
+) -> np.ndarray:
+    """
+    Stacks asset allocations into a matrix. Asset types outside of
+    PORTFOLIO_BREAKDOWN are ignored and missing asset types count as 0.
+    Args:
+        asset_allocations (Sequence[Dict[str, float]]): the asset allocations, one
+        row per allocation.
+
+    Returns:
+        an allocation by asset class matrix of allocation fractions.
+    """
+    return np.array(
+        [
+            [asset_allocation.get(asset_class, 0) for asset_class in ASSET_CLASSES]
+            for asset_allocation in asset_allocations
+        ],
+        dtype=float,
+    ).reshape(len(asset_allocations), len(ASSET_CLASSES))
+
+
+def allocate_holdings(
+    fund_names: Sequence[str],
+    fund_values: Union[Sequence[float], np.ndarray],
+    fund_mapping: Dict[str, Dict[str, float]],
+) -> np.ndarray:
+    """
+    Splits fund holdings into asset classes.
+    Args:
+        fund_names (Sequence[str]): the names of the held funds.
+        fund_values (Union[Sequence[float], np.ndarray]): the US dollar value held
+        of every fund, in fund_names order.
+        fund_mapping (Dict[str, Dict[str, float]]): the asset allocation of every
+        fund with fund name as key.
+
+    Returns:
+        the US dollar value of every asset class along ASSET_CLASSES.
+    """
+    return np.asarray(fund_values, dtype=float) @ allocation_matrix(
+        fund_names=fund_names, fund_mapping=fund_mapping
+    )
+
+
+def portfolio_vector(portfolio: Dict[str, float]) -> np.ndarray:
+    """
+    Converts a portfolio dictionary into a vector along ASSET_CLASSES.
+    Args:
+        portfolio (Dict[str, float]): a portfolio in the PORTFOLIO_BREAKDOWN
+        format, asset types can be missing.
+
+    Returns:
+        the US dollar value of every asset class.
+
+    Raises:
+        ValueError: the portfolio has an asset type outside of
+        PORTFOLIO_BREAKDOWN.
+    """
+    return Portfolio.from_dict(portfolio=portfolio).values
+
+
+def portfolio_from_vector(vector: np.ndarray) -> Dict[str, float]:
+    """
+    Converts a vector along ASSET_CLASSES into a portfolio dictionary.
+    Args:
+        vector (np.ndarray): the US dollar value of every asset class.
+
+    Returns:
+        a portfolio in the PORTFOLIO_BREAKDOWN format.
+    """
+    return Portfolio(values=vector).to_dict()
+
+
+def sum_portfolio_vectors(portfolio_vectors: Iterable[np.ndarray]) -> np.ndarray:
+    """
+    Adds up portfolio vectors.
+    Args:
+        portfolio_vectors (Iterable[np.ndarray]): vectors along ASSET_CLASSES.
+
+    Returns:
+        the combined vector, all zeros when there is no vector.
+    """
+    return (
+        np.array(list(portfolio_vectors), dtype=float)
+        .reshape(-1, len(ASSET_CLASSES))
+        .sum(axis=0)
+    )
+
+
+def sum_portfolios(portfolios: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    """
+    Adds up portfolio dictionaries into one preallocated buffer instead of
+    combining them pairwise. Like combine_portfolios, asset types outside of
+    PORTFOLIO_BREAKDOWN, such as the mortgage, are kept.
+    Args:
+        portfolios (Iterable[Dict[str, float]]): portfolios in the
+        PORTFOLIO_BREAKDOWN format, with any other asset types.
+
+    Returns:
+        the combined portfolio with every asset class of PORTFOLIO_BREAKDOWN,
+        followed by the other asset types in the order they first appear in.
+    """
+    portfolios = list(portfolios)
+    total_portfolio = Portfolio(
+        asset_classes=tuple(
+            dict.fromkeys(
+                (*ASSET_CLASSES, *(key for item in portfolios for key in item))
+            )
+        )
+    )
+    for portfolio in portfolios:
+        total_portfolio.add_dict(portfolio=portfolio)
+    return total_portfolio.to_dict()
+
+
+def holdings_portfolio(holdings: Sequence[FundHolding]) -> Dict[str, float]:
+    """
+    Splits fund holdings of any accounts into asset classes.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings.
+
+    Returns:
+        the portfolio of all holdings in the PORTFOLIO_BREAKDOWN format.
+    """
+    return portfolio_from_vector(
+        np.array([holding.value for holding in holdings], dtype=float)
+        @ stack_asset_allocations(
+            asset_allocations=[holding.asset_allocation for holding in holdings]
+        )
+    )
@@ -1,83 +1,624 @@
 # pylint: disable=no-name-in-module, import-error, too-many-locals, too-many-arguments
+# pylint: disable=too-many-lines
 """This module calculates asset_allocation for all accounts with just one or
 more blend type funds or funds."""
-from typing import Dict, Any, Set, Union, Callable, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    AbstractSet,
+    Dict,
+    Any,
+    Union,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+import hashlib
+import json
 import logging
+import multiprocessing
 
+import numpy as np
 import pandas as pd
 
-from portfolio_allocation import PORTFOLIO_BREAKDOWN, combine_portfolios
-from portfolio_allocation.pdf_parser import parse_pdf_tables, load_pdf_statements
+from portfolio_allocation import CACHE_DIR, load_configuration
+from portfolio_allocation.allocation_engine import (
+    FundHolding,
+    allocate_holdings,
+    holdings_portfolio,
+    portfolio_from_vector,
+)
+from portfolio_allocation.fund_name_matcher import FundMatchResult, FundNameMatcher
+from portfolio_allocation.pdf_parser import (
+    PageSelection,
+    TableRequest,
+    find_fund_pages,
+    load_pdf_document,
+    load_pdf_text_lines,
+    parse_pdf_tables,
+    read_pdf_tables,
+)
 from portfolio_allocation.blend_fund_asset_allocation_scraper import (
+    FundAllocationResult,
+    FundKey,
     blend_fund_asset_allocation_generator,
+    resilient_fund_asset_allocation_generator,
 )
-from portfolio_allocation.configuration import (
-    ALL_CURRENT_BLEND_ACCOUNTS,
-    BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING,
-)
+from portfolio_allocation.morningstar_cache import JsonFileCache
 
 DEFAULT_CHARS_TO_STRIP: str = "USD$"
+DOLLAR_AMOUNT_PATTERN: str = (
+    r"^(?P<leading_sign>-)?\s*(?:USD)?\s*\$?\s*(?P<open>\()?\s*(?:USD)?\s*\$?\s*"
+    r"(?P<inner_sign>-)?(?P<number>\d[\d,]*(?:\.\d*)?|\.\d+)"
+    r"(?P<trailing_sign>-)?(?P<close>\))?\s*(?:USD)?$"
+)
+DEFAULT_JOBS: int = 1
+PROCESS_START_METHOD: str = "spawn"
+
+ACCOUNT_PORTFOLIO_CACHE = JsonFileCache(
+    file_path=CACHE_DIR / "account_portfolios.json",
+)
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
 
-def generate_combined_blend_fund_asset_allocation() -> Dict[str, float]:
+class HoldingLineShape(NamedTuple):
+    """The number of words before and after the fund name of a holdings line."""
+
+    words_before: int
+    words_after: int
+
+
+class Household(NamedTuple):
+    """The blend accounts of one household and how to parse their statements."""
+
+    name: str
+    blend_accounts: Sequence[str]
+    account_mapping: Dict[str, Dict[str, Any]]
+
+
+class BlendFundAllocation(NamedTuple):
+    """
+    The combined asset allocation of blend fund accounts and the fund holdings
+    it is computed from, together with the funds whose fetch failed and that use
+    their last known asset allocation, and the funds without any asset
+    allocation whose holdings are left out, so a degraded result can be told
+    apart from a fresh one.
+    """
+
+    asset_allocation: Dict[str, float]
+    holdings: List[FundHolding]
+    stale_fund_keys: List[FundKey]
+    failed_fund_keys: List[FundKey]
+
+
+def generate_combined_blend_fund_asset_allocation(
+    jobs: int = DEFAULT_JOBS,
+    incremental: bool = False,
+) -> BlendFundAllocation:
     """
     This function creates the combined asset allocation for all non blend
-    fund accounts.
+    fund accounts. Every distinct fund across all accounts is fetched once up
+    front and shared by every account holding it. Funds that cannot be fetched
+    use their last known asset allocation, and are left out without one.
+    Args:
+        jobs (int): the number of processes parsing account statements at the
+        same time. 1 parses the accounts one after another in this process.
+        incremental (bool): only parse the accounts whose statement, configuration
+        or fund asset allocations changed since the last run, and reuse the last
+        computed asset allocation of every other account.
     Returns:
-    A dictionary with combined asset allocation for all accounts.
+    The combined asset allocation and fund holdings for all accounts, the funds
+    that use their last known asset allocation and the funds that are left out.
     """
-    combined_blend_fund_asset_allocation = PORTFOLIO_BREAKDOWN.copy()
-    for blend_account in ALL_CURRENT_BLEND_ACCOUNTS:
-        LOGGER.info(blend_account)
+    fund_allocation_result = _fetch_fund_asset_allocations(
+        fund_keys=_plan_unique_funds(),
+    )
+    process_blend_accounts = (
+        _process_changed_blend_accounts if incremental else _process_blend_accounts
+    )
+    holdings = [
+        holding
+        for account_holdings in process_blend_accounts(
+            blend_accounts=load_configuration().ALL_CURRENT_BLEND_ACCOUNTS,
+            fund_asset_allocations=fund_allocation_result.fund_asset_allocations,
+            jobs=jobs,
+        )
+        for holding in account_holdings
+    ]
+    return BlendFundAllocation(
+        asset_allocation=holdings_portfolio(holdings=holdings),
+        holdings=holdings,
+        stale_fund_keys=fund_allocation_result.stale_fund_keys,
+        failed_fund_keys=fund_allocation_result.failed_fund_keys,
+    )
+
 
-        asset_information = BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING[
-            blend_account
+def generate_household_blend_fund_asset_allocations(
+    households: Sequence[Household],
+    jobs: int = DEFAULT_JOBS,
+    incremental: bool = False,
+) -> Dict[str, BlendFundAllocation]:
+    """
+    This function creates the combined blend fund asset allocation of many
+    households in one batch. The union of all funds across all households is
+    fetched once and shared, and the statements of all households are parsed in
+    one process pool, so the cost follows the unique funds and statements instead
+    of households times funds.
+    Args:
+        households (Sequence[Household]): the households to evaluate, with unique
+        names.
+        jobs (int): the number of processes parsing account statements at the
+        same time. 1 parses the accounts one after another in this process.
+        incremental (bool): only parse the accounts whose statement, configuration
+        or fund asset allocations changed since the last run.
+    Returns:
+        the combined asset allocation, fund holdings, stale and failed funds of
+        every household, keyed by household name, in households order. The
+        holdings use the account names of the household.
+    Raises:
+        ValueError: two households have the same name.
+    """
+    household_names = [household.name for household in households]
+    if len(set(household_names)) != len(household_names):
+        raise ValueError(f"Household names are not unique: {household_names}.")
+    account_mapping = {
+        _household_account_key(
+            household_name=household.name, blend_account=blend_account
+        ): household.account_mapping[blend_account]
+        for household in households
+        for blend_account in household.blend_accounts
+    }
+    blend_accounts = list(account_mapping)
+    fund_allocation_result = _fetch_fund_asset_allocations(
+        fund_keys=_plan_unique_funds(
+            blend_accounts=blend_accounts, account_mapping=account_mapping
+        ),
+    )
+    process_blend_accounts = (
+        _process_changed_blend_accounts if incremental else _process_blend_accounts
+    )
+    account_holdings = dict(
+        zip(
+            blend_accounts,
+            process_blend_accounts(
+                blend_accounts=blend_accounts,
+                fund_asset_allocations=fund_allocation_result.fund_asset_allocations,
+                jobs=jobs,
+                account_mapping=account_mapping,
+            ),
+        )
+    )
+    household_allocations = {}
+    for household in households:
+        household_accounts = [
+            _household_account_key(
+                household_name=household.name, blend_account=blend_account
+            )
+            for blend_account in household.blend_accounts
         ]
-        file_path = asset_information["file_path"]
-        fund_name_to_ticker_mapping = asset_information["fund_name_to_ticker_mapping"]
-        page_nums = asset_information["page_nums"]
-        fund_name_lists = asset_information["fund_name_lists"]
-        mid_url = asset_information["mid_url"]
-        if asset_information["pdf_table_parse"]:
-            curr_account_portfolio = _process_all_pdf_table_funds(
-                asset_information=asset_information,
-                fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
-                mid_url=mid_url,
-                file_path=file_path,
-                page_nums=page_nums,
-                fund_name_lists=fund_name_lists,
+        household_fund_keys = {
+            fund_key
+            for household_account in household_accounts
+            for fund_key in _account_fund_keys(
+                asset_information=account_mapping[household_account]
             )
-        else:
-            curr_account_portfolio = _process_all_text_funds(
-                asset_information=asset_information,
-                fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
-                mid_url=mid_url,
-                file_path=file_path,
-                page_nums=page_nums,
-                fund_name_lists=fund_name_lists,
+        }
+        household_holdings = [
+            holding._replace(account=blend_account)
+            for blend_account, household_account in zip(
+                household.blend_accounts, household_accounts
+            )
+            for holding in account_holdings[household_account]
+        ]
+        household_allocations[household.name] = BlendFundAllocation(
+            asset_allocation=holdings_portfolio(holdings=household_holdings),
+            holdings=household_holdings,
+            stale_fund_keys=[
+                fund_key
+                for fund_key in fund_allocation_result.stale_fund_keys
+                if fund_key in household_fund_keys
+            ],
+            failed_fund_keys=[
+                fund_key
+                for fund_key in fund_allocation_result.failed_fund_keys
+                if fund_key in household_fund_keys
+            ],
+        )
+    return household_allocations
+
+
+def _household_account_key(household_name: str, blend_account: str) -> str:
+    """
+    Creates an account name that is unique across households.
+    Args:
+        household_name (str): the household name.
+        blend_account (str): the blend account name within the household.
+    Returns:
+        the household qualified account name.
+    """
+    return f"{household_name}/{blend_account}"
+
+
+def _fetch_fund_asset_allocations(
+    fund_keys: Sequence[FundKey],
+) -> FundAllocationResult:
+    """
+    Fetches the asset allocation of every planned fund once. Funds that cannot be
+    fetched use their last known asset allocation. Funds without one fail and
+    have no asset allocation, so their holdings are left out of the accounts.
+    Args:
+        fund_keys (Sequence[FundKey]): the distinct (ticker, mid_url) pairs.
+    Returns:
+        the asset allocations keyed by (ticker, mid_url) with the stale and
+        failed funds.
+    """
+    fund_allocation_result = resilient_fund_asset_allocation_generator(
+        fund_keys=fund_keys,
+    )
+    if fund_allocation_result.stale_fund_keys:
+        LOGGER.warning(
+            "Degraded run, using last known asset allocations for %s.",
+            fund_allocation_result.stale_fund_keys,
+        )
+    if fund_allocation_result.failed_fund_keys:
+        LOGGER.error(
+            "Degraded run, leaving out the holdings of %s without an asset"
+            " allocation.",
+            fund_allocation_result.failed_fund_keys,
+        )
+    return fund_allocation_result
+
+
+def _process_blend_accounts(
+    blend_accounts: Sequence[str],
+    fund_asset_allocations: Dict[FundKey, Dict[str, float]],
+    jobs: int = DEFAULT_JOBS,
+    account_mapping: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[List[FundHolding]]:
+    """
+    Parses the statements of all blend accounts, in a process pool when more
+    than one job is allowed. The statement parsing is cpu bound, so processes
+    instead of threads let it use several cores. Workers are spawned instead of
+    forked, because this process already runs background refresh threads.
+    Args:
+        blend_accounts (Sequence[str]): the blend account names.
+        fund_asset_allocations (Dict[FundKey, Dict[str, float]]): already fetched
+        asset allocations keyed by (ticker, mid_url).
+        jobs (int): the number of processes parsing account statements at the
+        same time.
+        account_mapping (Optional[Dict[str, Dict[str, Any]]]): asset and fund parse
+        information for every blend account. Defaults to
+        BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING.
+    Returns:
+        the fund holdings of every account in blend_accounts order, so the
+        combined result does not depend on which process finishes first.
+    """
+    if account_mapping is None:
+        account_mapping = (
+            load_configuration().BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING
+        )
+    if jobs <= 1 or len(blend_accounts) <= 1:
+        return [
+            _process_blend_account(
+                blend_account=blend_account,
+                fund_asset_allocations=fund_asset_allocations,
+                asset_information=account_mapping[blend_account],
             )
-        combined_blend_fund_asset_allocation = combine_portfolios(
-            portfolio_a=combined_blend_fund_asset_allocation,
-            portfolio_b=curr_account_portfolio,
+            for blend_account in blend_accounts
+        ]
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(blend_accounts)),
+        mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+    ) as executor:
+        account_futures = [
+            executor.submit(
+                _process_blend_account,
+                blend_account=blend_account,
+                fund_asset_allocations=fund_asset_allocations,
+                asset_information=account_mapping[blend_account],
+            )
+            for blend_account in blend_accounts
+        ]
+        return [account_future.result() for account_future in account_futures]
+
+
+def _process_changed_blend_accounts(
+    blend_accounts: Sequence[str],
+    fund_asset_allocations: Dict[FundKey, Dict[str, float]],
+    jobs: int = DEFAULT_JOBS,
+    account_mapping: Optional[Dict[str, Dict[str, Any]]] = None,
+    account_portfolio_cache: JsonFileCache = ACCOUNT_PORTFOLIO_CACHE,
+) -> List[List[FundHolding]]:
+    """
+    Parses the statements of the blend accounts whose inputs changed since the
+    last run and reuses the stored fund holdings of every other account. The
+    inputs of an account are tracked by its fingerprint.
+    Args:
+        blend_accounts (Sequence[str]): the blend account names.
+        fund_asset_allocations (Dict[FundKey, Dict[str, float]]): already fetched
+        asset allocations keyed by (ticker, mid_url).
+        jobs (int): the number of processes parsing account statements at the
+        same time.
+        account_mapping (Optional[Dict[str, Dict[str, Any]]]): asset and fund parse
+        information for every blend account. Defaults to
+        BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING.
+        account_portfolio_cache (JsonFileCache): the stored fingerprint and fund
+        holdings of every account.
+    Returns:
+        the fund holdings of every account in blend_accounts order.
+    """
+    if account_mapping is None:
+        account_mapping = (
+            load_configuration().BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING
+        )
+    account_fingerprints = {
+        blend_account: _account_fingerprint(
+            asset_information=account_mapping[blend_account],
+            fund_asset_allocations=fund_asset_allocations,
+        )
+        for blend_account in blend_accounts
+    }
+    account_holdings: Dict[str, List[FundHolding]] = {}
+    for blend_account in blend_accounts:
+        stored_account = account_portfolio_cache.get(key=blend_account)
+        if stored_account is None or "holdings" not in stored_account:
+            continue
+        if stored_account["fingerprint"] == account_fingerprints[blend_account]:
+            account_holdings[blend_account] = [
+                FundHolding(*stored_holding)
+                for stored_holding in stored_account["holdings"]
+            ]
+    changed_blend_accounts = [
+        blend_account
+        for blend_account in blend_accounts
+        if blend_account not in account_holdings
+    ]
+    LOGGER.info(
+        "Recomputing %s of %s blend accounts: %s.",
+        len(changed_blend_accounts),
+        len(blend_accounts),
+        changed_blend_accounts,
+    )
+    for blend_account, changed_account_holdings in zip(
+        changed_blend_accounts,
+        _process_blend_accounts(
+            blend_accounts=changed_blend_accounts,
+            fund_asset_allocations=fund_asset_allocations,
+            jobs=jobs,
+            account_mapping=account_mapping,
+        ),
+    ):
+        account_portfolio_cache.set(
+            key=blend_account,
+            value={
+                "fingerprint": account_fingerprints[blend_account],
+                "holdings": [list(holding) for holding in changed_account_holdings],
+            },
         )
-    return combined_blend_fund_asset_allocation
+        account_holdings[blend_account] = changed_account_holdings
+    return [account_holdings[blend_account] for blend_account in blend_accounts]
+
+
+def _account_fingerprint(
+    asset_information: Dict[str, Any],
+    fund_asset_allocations: Dict[FundKey, Dict[str, float]],
+) -> str:
+    """
+    Creates the fingerprint of everything the asset allocation of an account is
+    computed from: the statement content, the account configuration and the
+    asset allocation of every fund the account holds.
+    Args:
+        asset_information (Dict[str, Any]): asset and fund parse information for
+        a specific account.
+        fund_asset_allocations (Dict[FundKey, Dict[str, float]]): already fetched
+        asset allocations keyed by (ticker, mid_url).
+    Returns:
+        a sha256 hex digest that changes whenever one of the inputs changes.
+    """
+    statement_digest = load_pdf_document(
+        file_path=asset_information["file_path"]
+    ).file_digest
+    fingerprint = json.dumps(
+        {
+            "statement": statement_digest,
+            "configuration": asset_information,
+            "fund_asset_allocations": [
+                [ticker, mid_url, fund_asset_allocations.get((ticker, mid_url))]
+                for ticker, mid_url in _account_fund_keys(
+                    asset_information=asset_information
+                )
+            ],
+        },
+        sort_keys=True,
+        default=_fingerprint_json_default,
+    )
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def _fingerprint_json_default(value: Any) -> Any:
+    """
+    Converts configuration values that JSON cannot encode, keeping sets in a
+    stable order.
+    Args:
+        value (Any): a value JSON cannot encode.
+    Returns:
+        an encodable stand in for the value.
+    """
+    if isinstance(value, AbstractSet):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def _process_blend_account(
+    blend_account: str,
+    fund_asset_allocations: Dict[FundKey, Dict[str, float]],
+    asset_information: Optional[Dict[str, Any]] = None,
+) -> List[FundHolding]:
+    """
+    Parses the statement of one blend account.
+    Args:
+        blend_account (str): the blend account name.
+        fund_asset_allocations (Dict[FundKey, Dict[str, float]]): already fetched
+        asset allocations keyed by (ticker, mid_url).
+        asset_information (Optional[Dict[str, Any]]): asset and fund parse
+        information for the account. Defaults to its entry in
+        BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING.
+    Returns:
+        the fund holdings of the account.
+    """
+    LOGGER.info(blend_account)
+
+    if asset_information is None:
+        asset_information = (
+            load_configuration().BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING[
+                blend_account
+            ]
+        )
+    process_all_funds = (
+        _process_all_pdf_table_funds
+        if asset_information["pdf_table_parse"]
+        else _process_all_text_funds
+    )
+    return process_all_funds(
+        blend_account=blend_account,
+        asset_information=asset_information,
+        fund_name_to_ticker_mapping=asset_information["fund_name_to_ticker_mapping"],
+        mid_url=asset_information["mid_url"],
+        file_path=asset_information["file_path"],
+        page_nums=asset_information.get("page_nums"),
+        fund_name_lists=asset_information["fund_name_lists"],
+        fund_asset_allocations=fund_asset_allocations,
+    )
+
+
+def _plan_unique_funds(
+    blend_accounts: Optional[Sequence[str]] = None,
+    account_mapping: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[FundKey]:
+    """
+    Collects the distinct funds that need a fetched asset allocation across all
+    blend accounts. Sub accounts with a configured non blend fund allocation are
+    skipped because they never use the fetched asset allocation.
+    Args:
+        blend_accounts (Optional[Sequence[str]]): the blend account names to plan
+        for. Defaults to ALL_CURRENT_BLEND_ACCOUNTS.
+        account_mapping (Optional[Dict[str, Dict[str, Any]]]): asset and fund parse
+        information for every blend account. Defaults to
+        BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING.
+    Returns:
+        the distinct (ticker, mid_url) pairs in the order they are first used.
+    """
+    if blend_accounts is None:
+        blend_accounts = load_configuration().ALL_CURRENT_BLEND_ACCOUNTS
+    if account_mapping is None:
+        account_mapping = (
+            load_configuration().BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING
+        )
+    fund_keys: Dict[FundKey, None] = {}
+    for blend_account in blend_accounts:
+        for fund_key in _account_fund_keys(
+            asset_information=account_mapping[blend_account]
+        ):
+            fund_keys[fund_key] = None
+    LOGGER.info("Planned %s unique funds for all blend accounts.", len(fund_keys))
+    return list(fund_keys)
+
+
+def _account_fund_keys(asset_information: Dict[str, Any]) -> List[FundKey]:
+    """
+    Collects the funds of an account that need a fetched asset allocation.
+    Args:
+        asset_information (Dict[str, Any]): asset and fund parse information for
+        a specific account.
+    Returns:
+        the (ticker, mid_url) pairs in the order they are used, can contain
+        duplicates.
+    """
+    fund_keys: List[FundKey] = []
+    for index, (fund_name_to_ticker_mapping, mid_url) in enumerate(
+        zip(
+            asset_information["fund_name_to_ticker_mapping"],
+            asset_information["mid_url"],
+        )
+    ):
+        if _has_non_blend_fund_allocation(
+            asset_information=asset_information, index=index
+        ):
+            continue
+        for ticker in fund_name_to_ticker_mapping.values():
+            fund_keys.append((ticker, mid_url))
+    return fund_keys
+
+
+def _has_non_blend_fund_allocation(
+    asset_information: Dict[str, Any], index: int
+) -> bool:
+    """
+    Decides if a text parsed sub account uses a configured non blend fund
+    allocation instead of fetched fund asset allocations.
+    Args:
+        asset_information (Dict[str, Any]): asset and fund parse information for
+        a specific account.
+        index (int): the sub account index.
+    Returns:
+        true if the sub account uses the non blend fund allocation else false.
+    """
+    non_blend_fund_allocation = asset_information.get("non_blend_fund_allocation")
+    if asset_information.get("pdf_table_parse") or not non_blend_fund_allocation:
+        return False
+    return index == non_blend_fund_allocation["fund_index"]
+
+
+def _get_sub_account_fund_asset_allocation(
+    fund_name_to_ticker_mapping: Dict[str, str],
+    mid_url: str,
+    fund_asset_allocations: Optional[Dict[FundKey, Dict[str, float]]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Creates the asset allocation of every fund in a sub account, reusing already
+    fetched fund asset allocations when they are provided.
+    Args:
+        fund_name_to_ticker_mapping (Dict[str, str]): A dictionary containing all funds
+        in a sub account with ticker symbol mapping as value.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        fund_asset_allocations (Optional[Dict[FundKey, Dict[str, float]]]): already
+        fetched asset allocations keyed by (ticker, mid_url). Funds missing from
+        it failed and are left out, so their holdings are left out too.
+    Returns:
+        A dictionary containing asset allocation for all funds in the sub account.
+    """
+    if fund_asset_allocations is None:
+        return blend_fund_asset_allocation_generator(
+            fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
+            mid_url=mid_url,
+        )
+    return {
+        fund_name: fund_asset_allocations[(ticker, mid_url)]
+        for fund_name, ticker in fund_name_to_ticker_mapping.items()
+        if (ticker, mid_url) in fund_asset_allocations
+    }
 
 
 def _process_all_text_funds(
+    blend_account: str,
     asset_information: Dict[str, Any],
     fund_name_to_ticker_mapping: List[Dict[str, str]],
     mid_url: List[str],
     file_path: str,
-    page_nums: List[int],
+    page_nums: Optional[Sequence[Optional[PageSelection]]],
     fund_name_lists: List[List[str]],
-) -> Dict[str, float]:
+    fund_asset_allocations: Optional[Dict[FundKey, Dict[str, float]]] = None,
+) -> List[FundHolding]:
     """
-    This function gathers all non pdf table funds and creates the combined
-    asset allocation.
+    This function gathers all non pdf table funds and creates the fund holdings
+    of the account.
     Args:
+        blend_account (str): the blend account name of the holdings.
         asset_information (Dict[str, Any]): asset and fund parse information for
         a specific account.
         fund_name_to_ticker_mapping (Dict[str, str]): A dictionary containing all funds
@@ -85,54 +626,66 @@ def _process_all_text_funds(
         ticker symbol mapping as value.
         mid_url (str): the base url that differentiates between etfs and mutual_funds.
         file_path (str): statement filepath.
-        page_nums (List[int]): the page numbers for the tables to parse, page one is 0.
+        page_nums (Optional[Sequence[Optional[PageSelection]]]): the pages to parse for
+        every sub account, page one is 0. Pages that are None or missing are found
+        through the fund to page index of the statement.
         fund_name_lists (List[List[str]]): a set of fund_names the PDF text has
         information for.
+        fund_asset_allocations (Optional[Dict[FundKey, Dict[str, float]]]): already
+        fetched asset allocations keyed by (ticker, mid_url). The funds are fetched
+        per sub account when it is not provided.
     Returns:
-        Fund asset allocation in the standardized portfolio_breakdown
-       format.
+        the fund holdings of every sub account.
     """
     fund_value_index_number = asset_information["fund_value_index_number"]
     amount_str_filter = asset_information.get("amount_str_filter")
     non_blend_fund_allocation = asset_information.get("non_blend_fund_allocation", None)
-    total_account_portfolio: Dict[str, float] = {}
+    holdings = []
     for index, sub_account in enumerate(fund_name_lists):
         if non_blend_fund_allocation and (
             index == non_blend_fund_allocation["fund_index"]
         ):
             blend_fund_asset_allocation = non_blend_fund_allocation["fund_allocation"]
         else:
-            blend_fund_asset_allocation = blend_fund_asset_allocation_generator(
+            blend_fund_asset_allocation = _get_sub_account_fund_asset_allocation(
                 fund_name_to_ticker_mapping=fund_name_to_ticker_mapping[index],
                 mid_url=mid_url[index],
+                fund_asset_allocations=fund_asset_allocations,
+            )
+        holdings.extend(
+            _process_blend_fund_texts(
+                blend_account=blend_account,
+                file_path=file_path,
+                target_page_num=(
+                    page_nums[index] if page_nums and index < len(page_nums) else None
+                ),
+                blend_fund_asset_allocation=blend_fund_asset_allocation,
+                fund_names=sub_account,
+                fund_value_index_number=fund_value_index_number[index],
+                amount_str_filter=(
+                    amount_str_filter[index] if amount_str_filter else None
+                ),
             )
-        curr_account_portfolio = _process_blend_fund_texts(
-            file_path=file_path,
-            target_page_num=page_nums[index],
-            blend_fund_asset_allocation=blend_fund_asset_allocation,
-            fund_names=sub_account,
-            fund_value_index_number=fund_value_index_number[index],
-            amount_str_filter=amount_str_filter[index] if amount_str_filter else None,
-        )
-        total_account_portfolio = combine_portfolios(
-            portfolio_a=total_account_portfolio,
-            portfolio_b=curr_account_portfolio,
         )
-    return total_account_portfolio
+    return holdings
 
 
 def _process_all_pdf_table_funds(
+    blend_account: str,
     asset_information: Dict[str, Any],
     fund_name_to_ticker_mapping: List[Dict[str, str]],
     mid_url: List[str],
     file_path: str,
-    page_nums: List[int],
+    page_nums: Optional[List[int]],
     fund_name_lists: List[List[str]],
-) -> Dict[str, float]:
+    fund_asset_allocations: Optional[Dict[FundKey, Dict[str, float]]] = None,
+) -> List[FundHolding]:
     """
-    This function gathers all pdf table funds and creates the combined
-    asset allocation.
+    This function gathers all pdf table funds and creates the fund holdings of
+    the account. Tables are parsed from a known page, so unlike text accounts
+    every sub account needs a configured page.
     Args:
+        blend_account (str): the blend account name of the holdings.
         asset_information (Dict[str, Any]): asset and fund parse information for
         a specific account.
         fund_name_to_ticker_mapping (Dict[str, str]): A dictionary containing all funds
@@ -140,13 +693,23 @@ def _process_all_pdf_table_funds(
         ticker symbol mapping as value.
         mid_url (str): the base url that differentiates between etfs and mutual_funds.
         file_path (str): statement filepath.
-        page_nums (List[int]): the page numbers for the tables to parse, page one is 0.
+        page_nums (Optional[List[int]]): the page number for the tables of every
+        sub account, page one is 0.
         fund_name_lists (List[List[str]]): a set of fund_names the PDF text has
         information for.
+        fund_asset_allocations (Optional[Dict[FundKey, Dict[str, float]]]): already
+        fetched asset allocations keyed by (ticker, mid_url). The funds are fetched
+        per sub account when it is not provided.
     Returns:
-        Fund asset allocation in the standardized portfolio_breakdown
-       format.
+        the fund holdings of every sub account.
+    Raises:
+        ValueError: a sub account has no page number.
     """
+    if page_nums is None or len(page_nums) < len(fund_name_lists):
+        raise ValueError(
+            f"The pdf table account {file_path} needs page_nums with a page for "
+            f"each of its {len(fund_name_lists)} sub accounts, got {page_nums}."
+        )
     all_processed_fund_tables = []
     pandas_parse_options = asset_information["pandas_parse_options"]
     table_index_numbers = asset_information["table_index_number"]
@@ -154,12 +717,19 @@ def _process_all_pdf_table_funds(
     fund_col_parse_function = asset_information["fund_col_parse_function"]
     fund_row_index_start = asset_information["fund_row_index_start"]
     multiple_table_flags = asset_information["multiple_table_flags"]
+    read_pdf_tables(
+        file_path=file_path,
+        table_requests=_plan_statement_tables(
+            asset_information=asset_information, page_nums=page_nums
+        ),
+    )
     blend_fund_asset_allocation = {}
     for index, sub_account in enumerate(fund_name_lists):
         blend_fund_asset_allocation.update(
-            blend_fund_asset_allocation_generator(
+            _get_sub_account_fund_asset_allocation(
                 fund_name_to_ticker_mapping=fund_name_to_ticker_mapping[index],
                 mid_url=mid_url[index],
+                fund_asset_allocations=fund_asset_allocations,
             )
         )
         fund_information = _process_blend_fund_tables(
@@ -176,12 +746,39 @@ def _process_all_pdf_table_funds(
             else None,
         )
         all_processed_fund_tables.append(fund_information)
-    curr_account_portfolio = _create_asset_allocation_from_pdf_tables(
+    return _create_fund_holdings_from_pdf_tables(
+        blend_account=blend_account,
         blend_fund_asset_allocation=blend_fund_asset_allocation,
         fund_list=all_processed_fund_tables,
         vested_pct=asset_information["vested_pct"],
     )
-    return curr_account_portfolio
+
+
+def _plan_statement_tables(
+    asset_information: Dict[str, Any], page_nums: List[int]
+) -> List[TableRequest]:
+    """
+    Collects the tables every sub account of a pdf table account reads, so they
+    are read before the sub accounts are processed.
+    Args:
+        asset_information (Dict[str, Any]): asset and fund parse information for
+        a specific account.
+        page_nums (List[int]): the page numbers for the tables to parse, page one is 0.
+    Returns:
+        the table requests of every sub account.
+    """
+    return [
+        TableRequest(
+            page_num=page_num,
+            pandas_options=pandas_options,
+            multiple_table_flag=multiple_table_flag,
+        )
+        for page_num, pandas_options, multiple_table_flag in zip(
+            page_nums,
+            asset_information["pandas_parse_options"],
+            asset_information["multiple_table_flags"],
+        )
+    ]
 
 
 def _create_blend_fund_asset_allocation(
@@ -200,12 +797,13 @@ def _create_blend_fund_asset_allocation(
          A dictionary with asset allocation calculated for the specific
          blend fund.
     """
-    curr_portfolio = PORTFOLIO_BREAKDOWN.copy()
-    for asset_type in curr_portfolio:
-        curr_portfolio[asset_type] = (
-            fund_mapping[fund_name].get(asset_type, 0) * total_fund_value
+    return portfolio_from_vector(
+        allocate_holdings(
+            fund_names=[fund_name],
+            fund_values=[total_fund_value],
+            fund_mapping=fund_mapping,
         )
-    return curr_portfolio
+    )
 
 
 def _extract_dollar_amount(
@@ -221,13 +819,50 @@ def _extract_dollar_amount(
     Returns:
         A float in unit of US Dollar.
     """
-    dollar_amount = asset_amount.strip(chars_to_strip).split(",")
-    power = 0
-    parsed_dollar_amount = 0
-    for amount in dollar_amount[::-1]:
-        parsed_dollar_amount += float(amount) * 10**power
-        power += 3
-    return parsed_dollar_amount
+    return float(
+        _extract_dollar_amounts(asset_amounts=[asset_amount.strip(chars_to_strip)])[0]
+    )
+
+
+def _extract_dollar_amounts(
+    asset_amounts: Union[pd.Series, np.ndarray, Sequence[str]]
+) -> np.ndarray:
+    """
+    Converts a whole column of amounts into US Dollar floats in one vectorized
+    pass. $, USD and thousands separators are removed. Amounts in parentheses or
+    with a leading or trailing - are negative, an amount can only use one of
+    these sign forms.
+    Args:
+        asset_amounts (Union[pd.Series, np.ndarray, Sequence[str]]): the amounts
+        extracted from PDF in a string format, e.g. "$1,000.25", "(USD 5.00)",
+        "-$3", "1,234-" or ".25".
+
+    Returns:
+        A float64 array in unit of US Dollar, in the order of asset_amounts.
+
+    Raises:
+        ValueError: an amount is not a dollar amount, has unbalanced
+        parentheses or more than one sign form.
+    """
+    amount_texts = pd.Series(asset_amounts, dtype=object).astype(str).str.strip()
+    amount_parts = amount_texts.str.extract(DOLLAR_AMOUNT_PATTERN)
+    dollar_amounts = pd.to_numeric(
+        amount_parts["number"].str.replace(",", "", regex=False), errors="coerce"
+    )
+    sign_form_counts = (
+        amount_parts[["leading_sign", "open", "inner_sign", "trailing_sign"]]
+        .notna()
+        .sum(axis=1)
+    )
+    is_unbalanced = amount_parts["open"].notna() != amount_parts["close"].notna()
+    is_malformed = dollar_amounts.isna() | is_unbalanced | (sign_form_counts > 1)
+    if is_malformed.any():
+        raise ValueError(
+            f"Cannot parse dollar amounts {amount_texts[is_malformed].tolist()}."
+        )
+    is_negative = sign_form_counts == 1
+    dollar_amounts = dollar_amounts.to_numpy(dtype=np.float64)
+    return np.where(is_negative.to_numpy(), -dollar_amounts, dollar_amounts)
 
 
 def _process_fund_name_columns(
@@ -315,16 +950,18 @@ def _process_blend_fund_tables(
     return parsed_pdf_table.loc[fund_names][fund_value_column_name]
 
 
-def _create_asset_allocation_from_pdf_tables(
+def _create_fund_holdings_from_pdf_tables(
+    blend_account: str,
     blend_fund_asset_allocation: Dict[str, Dict[str, float]],
     fund_list: List[pd.Series],
     vested_pct: float,
-) -> Dict[str, float]:
+) -> List[FundHolding]:
     """
-    This function extracts blend fund asset allocation from pdf tables
+    This function extracts blend fund holdings from pdf tables
     after a list of pandas series were created from the pdf tables.
 
     Args:
+        blend_account (str): the blend account name of the holdings.
         blend_fund_asset_allocation (Dict[str, Dict[str, float]]): asset
         allocation for a blend fund account with blend fund as name and
         asset allocation as value.
@@ -333,45 +970,58 @@ def _create_asset_allocation_from_pdf_tables(
         vested_pct (float): a fraction. Amount that actually
         vested.
     Returns:
-        Fund asset allocation in the standardized portfolio_breakdown
-        format.
+        the vested fund holdings of the account.
     """
-    final_portfolio_breakdown = PORTFOLIO_BREAKDOWN.copy()
     combined_fund_information = pd.concat(fund_list)
-    for fund_name in combined_fund_information.index:
-        total_fund_value = _extract_dollar_amount(
-            asset_amount=combined_fund_information.loc[fund_name],
-        )
-        total_fund_value *= vested_pct
-        fund_portfolio_breakdown = _create_blend_fund_asset_allocation(
-            fund_name=fund_name,
-            fund_mapping=blend_fund_asset_allocation,
-            total_fund_value=total_fund_value,
-        )
-        final_portfolio_breakdown = combine_portfolios(
-            portfolio_a=final_portfolio_breakdown,
-            portfolio_b=fund_portfolio_breakdown,
-        )
-
-    return final_portfolio_breakdown
+    total_fund_values = (
+        _extract_dollar_amounts(asset_amounts=combined_fund_information) * vested_pct
+    )
+    return _fund_holdings(
+        blend_account=blend_account,
+        fund_names=list(combined_fund_information.index),
+        fund_values=total_fund_values,
+        fund_mapping=blend_fund_asset_allocation,
+    )
 
 
-def _relevant_page_filter(
-    page_number: int, target_page_num: Union[int, Set[int]]
-) -> bool:
+def _fund_holdings(
+    blend_account: str,
+    fund_names: Sequence[str],
+    fund_values: Union[Sequence[float], np.ndarray],
+    fund_mapping: Dict[str, Dict[str, float]],
+) -> List[FundHolding]:
     """
-    This function takes in page_number and decides if it is part of the
-    target_page_num.
+    Creates one fund holding per fund from the lots of a statement. The lots of
+    a fund are added up and funds without an asset allocation are left out.
     Args:
-        page_number (int): the page number on the PDF. page 1 is 0.
-        target_page_num (Union[int, Set[int]]): could be a single page or
-        a set of pages.
+        blend_account (str): the blend account name of the holdings.
+        fund_names (Sequence[str]): the fund name of every lot.
+        fund_values (Union[Sequence[float], np.ndarray]): the US dollar value of
+        every lot, in fund_names order.
+        fund_mapping (Dict[str, Dict[str, float]]): the asset allocation of every
+        fund with fund name as key.
     Returns:
-        true if it is part of the target page else false.
+        the fund holdings in the order the funds first appear in.
     """
-    return (isinstance(target_page_num, int) and page_number == target_page_num) or (
-        isinstance(target_page_num, set) and page_number in target_page_num
-    )
+    fund_totals: Dict[str, float] = {}
+    for fund_name, fund_value in zip(fund_names, fund_values):
+        if fund_name not in fund_mapping:
+            LOGGER.warning(
+                "Fund %s of %s has no asset allocation, leaving it out.",
+                fund_name,
+                blend_account,
+            )
+            continue
+        fund_totals[fund_name] = fund_totals.get(fund_name, 0.0) + float(fund_value)
+    return [
+        FundHolding(
+            account=blend_account,
+            fund_name=fund_name,
+            value=fund_total,
+            asset_allocation=fund_mapping[fund_name],
+        )
+        for fund_name, fund_total in fund_totals.items()
+    ]
 
 
 def _extract_fund_value_from_text_line(
@@ -404,26 +1054,206 @@ def _extract_fund_value_from_text_line(
     return total_fund_value
 
 
+def _find_fund_lines(
+    file_path: str,
+    target_page_num: Optional[PageSelection],
+    fund_names: List[str],
+    fund_value_index_number: int,
+    amount_str_filter: Optional[str] = None,
+) -> FundMatchResult:
+    """
+    Finds the statement line of every fund. Funds are looked for on the target
+    pages first. Without target pages, or for funds missing from them, the pages
+    come from the fund to page index of the statement. Those pages also name
+    funds in activity and summary lines, so only their lines shaped like the
+    holdings lines of the target pages and with a fund value are used.
+    Args:
+        file_path (str): statement filepath.
+        target_page_num (Optional[PageSelection]): the page number, page number
+        set or page number range for the text to parse, page 1 is 0. None finds
+        the pages through the index.
+        fund_names (List[str]): the fund names to look for.
+        fund_value_index_number (int): the index for where the fund value is
+        inside the text.
+        amount_str_filter (Optional[str]): the text filter of the fund value.
+    Returns:
+        the matched lines with the duplicate and missing fund names.
+    """
+    fund_match_result = FundMatchResult(
+        fund_lines={}, duplicate_fund_names=[], missing_fund_names=list(fund_names)
+    )
+    if target_page_num is not None:
+        fund_match_result = _match_fund_lines(
+            file_path=file_path, page_selection=target_page_num, fund_names=fund_names
+        )
+    if not fund_match_result.missing_fund_names:
+        return fund_match_result
+    discovered_page_nums = find_fund_pages(
+        file_path=file_path, fund_names=fund_match_result.missing_fund_names
+    )
+    if not discovered_page_nums:
+        return fund_match_result
+    LOGGER.log(
+        logging.INFO if target_page_num is None else logging.WARNING,
+        "Looking for funds %s of %s on pages %s.",
+        fund_match_result.missing_fund_names,
+        file_path,
+        sorted(discovered_page_nums),
+    )
+    fund_name_matcher = FundNameMatcher(fund_names=fund_match_result.missing_fund_names)
+    discovered_match_result = fund_name_matcher.match_lines(
+        text_lines=_holding_lines(
+            text_lines=(
+                text_line
+                for _, _, text_line in load_pdf_text_lines(
+                    file_path=file_path, page_selection=discovered_page_nums
+                )
+            ),
+            fund_name_matcher=fund_name_matcher,
+            holding_line_shapes={
+                _holding_line_shape(text_line=text_line, fund_name=fund_name)
+                for fund_name, text_lines in fund_match_result.fund_lines.items()
+                for text_line in text_lines
+            },
+            fund_value_index_number=fund_value_index_number,
+            amount_str_filter=amount_str_filter,
+        )
+    )
+    return FundMatchResult(
+        fund_lines={
+            fund_name: [
+                *fund_match_result.fund_lines.get(fund_name, []),
+                *discovered_match_result.fund_lines.get(fund_name, []),
+            ]
+            for fund_name in {
+                **fund_match_result.fund_lines,
+                **discovered_match_result.fund_lines,
+            }
+        },
+        duplicate_fund_names=[
+            *fund_match_result.duplicate_fund_names,
+            *discovered_match_result.duplicate_fund_names,
+        ],
+        missing_fund_names=discovered_match_result.missing_fund_names,
+    )
+
+
+def _holding_line_shape(text_line: str, fund_name: str) -> HoldingLineShape:
+    """
+    Counts the words before and after the fund name of a statement line.
+    Args:
+        text_line (str): a line of statement text naming the fund.
+        fund_name (str): the fund name in the line.
+    Returns:
+        the number of words before and after the fund name.
+    """
+    before_fund_name, _, after_fund_name = text_line.partition(fund_name)
+    return HoldingLineShape(
+        words_before=len(before_fund_name.split()),
+        words_after=len(after_fund_name.split()),
+    )
+
+
+def _holding_lines(
+    text_lines: Iterable[str],
+    fund_name_matcher: FundNameMatcher,
+    holding_line_shapes: AbstractSet[HoldingLineShape],
+    fund_value_index_number: int,
+    amount_str_filter: Optional[str],
+) -> Iterator[str]:
+    """
+    Keeps the lines that look like holdings lines. Other lines naming a fund,
+    such as "Sold fund_C on 03/01", are logged and skipped.
+    Args:
+        text_lines (Iterable[str]): the lines of statement text.
+        fund_name_matcher (FundNameMatcher): the matcher of the fund names.
+        holding_line_shapes (AbstractSet[HoldingLineShape]): the shapes of known
+        holdings lines, empty accepts any shape.
+        fund_value_index_number (int): the index for where the fund value is
+        inside the text.
+        amount_str_filter (Optional[str]): the text filter of the fund value.
+    Returns:
+        an iterator of the holdings lines.
+    """
+    for text_line in text_lines:
+        fund_name = fund_name_matcher.match_line(text_line=text_line)
+        if fund_name is None:
+            continue
+        holding_line_shape = _holding_line_shape(
+            text_line=text_line, fund_name=fund_name
+        )
+        if holding_line_shapes and holding_line_shape not in holding_line_shapes:
+            LOGGER.warning(
+                "Skipping %r, it names %s but is not shaped like a holdings line.",
+                text_line.strip(),
+                fund_name,
+            )
+            continue
+        try:
+            _extract_fund_value_from_text_line(
+                text_line=text_line,
+                fund_value_index_number=fund_value_index_number,
+                amount_str_filter=amount_str_filter,
+            )
+        except (IndexError, ValueError):
+            LOGGER.warning(
+                "Skipping %r, it names %s but has no fund value.",
+                text_line.strip(),
+                fund_name,
+            )
+            continue
+        yield text_line
+
+
+def _match_fund_lines(
+    file_path: str, page_selection: PageSelection, fund_names: List[str]
+) -> FundMatchResult:
+    """
+    Finds the statement line of every fund on the selected pages in one pass.
+    Args:
+        file_path (str): statement filepath.
+        page_selection (PageSelection): the pages to read, page 1 is 0.
+        fund_names (List[str]): the fund names to look for.
+    Returns:
+        the matched lines with the duplicate and missing fund names.
+    """
+    return FundNameMatcher(fund_names=fund_names).match_lines(
+        text_lines=(
+            text_line
+            for _, _, text_line in load_pdf_text_lines(
+                file_path=file_path,
+                page_selection=page_selection,
+            )
+        )
+    )
+
+
 def _process_blend_fund_texts(
+    blend_account: str,
     file_path: str,
-    target_page_num: Union[int, Set[int]],
+    target_page_num: Optional[PageSelection],
     blend_fund_asset_allocation: Dict[str, Dict[str, float]],
     fund_names: List[str],
     fund_value_index_number: int,
     amount_str_filter: Optional[str] = None,
-) -> Dict[str, float]:
+) -> List[FundHolding]:
     """
-     This function extracts blend fund asset allocation from pdf text.
+     This function extracts blend fund holdings from pdf text.
 
      Args:
+         blend_account (str): the blend account name of the holdings.
          file_path (str): statement filepath.
-         target_page_num (Union[int, Set[int]]): the page number or page number set
-         for the text to parse, page 1 is 0.
+         target_page_num (Optional[PageSelection]): the page number, page number
+         set or page number range for the text to parse, page 1 is 0. Only these
+         pages are read, and reading stops once every fund was found. None, or a
+         fund missing from these pages, looks the pages up in the fund to page
+         index of the statement.
          blend_fund_asset_allocation (Dict[str, Dict[str, float]]): asset
          allocation for a blend fund account with blend fund as name and
          asset allocation as value.
          fund_names (List[str]): a set of fund_names the PDF text has information
-         for.
+         for, in any order. A fund listed n times sums its first n lines, extra and
+         missing funds are logged.
          fund_value_index_number (int): the index for where the fund value is
          inside the text.
          amount_str_filter (Optional[str]): if the line containing the fund amount
@@ -431,38 +1261,43 @@ def _process_blend_fund_texts(
          have text filter, then this str filter is passed in. This returns all text
          containing the str.
     Returns:
-       Fund asset allocation in the standardized portfolio_breakdown
-       format.
+       the fund holdings of the found funds.
     """
-    final_portfolio_breakdown = PORTFOLIO_BREAKDOWN.copy()
-    num_of_funds = len(fund_names)
-    fund_index = 0
-    loaded_pdf_pages = load_pdf_statements(
+    fund_match_result = _find_fund_lines(
         file_path=file_path,
+        target_page_num=target_page_num,
+        fund_names=fund_names,
+        fund_value_index_number=fund_value_index_number,
+        amount_str_filter=amount_str_filter,
+    )
+    if fund_match_result.duplicate_fund_names:
+        LOGGER.warning(
+            "Funds %s appear on more lines than configured in %s, using their"
+            " first lines.",
+            fund_match_result.duplicate_fund_names,
+            file_path,
+        )
+    if fund_match_result.missing_fund_names:
+        LOGGER.warning(
+            "Funds %s were not found in %s.",
+            fund_match_result.missing_fund_names,
+            file_path,
+        )
+    return _fund_holdings(
+        blend_account=blend_account,
+        fund_names=[
+            fund_name
+            for fund_name, text_lines in fund_match_result.fund_lines.items()
+            for _ in text_lines
+        ],
+        fund_values=[
+            _extract_fund_value_from_text_line(
+                text_line=text_line,
+                amount_str_filter=amount_str_filter,
+                fund_value_index_number=fund_value_index_number,
+            )
+            for text_lines in fund_match_result.fund_lines.values()
+            for text_line in text_lines
+        ],
+        fund_mapping=blend_fund_asset_allocation,
     )
-    for page_num, page_content in enumerate(loaded_pdf_pages):
-        if _relevant_page_filter(
-            page_number=page_num,
-            target_page_num=target_page_num,
-        ):
-            for text_line in page_content.extract_text().split("\n"):
-                if fund_index == num_of_funds:
-                    return final_portfolio_breakdown
-                fund_name = fund_names[fund_index]
-                if fund_name in text_line:
-                    total_fund_value = _extract_fund_value_from_text_line(
-                        text_line=text_line,
-                        amount_str_filter=amount_str_filter,
-                        fund_value_index_number=fund_value_index_number,
-                    )
-                    fund_portfolio_breakdown = _create_blend_fund_asset_allocation(
-                        fund_name=fund_name,
-                        fund_mapping=blend_fund_asset_allocation,
-                        total_fund_value=total_fund_value,
-                    )
-                    final_portfolio_breakdown = combine_portfolios(
-                        portfolio_a=final_portfolio_breakdown,
-                        portfolio_b=fund_portfolio_breakdown,
-                    )
-                    fund_index += 1
-    return final_portfolio_breakdown
@@ -1,28 +1,52 @@
-# pylint: disable=no-name-in-module, import-error
+# pylint: disable=no-name-in-module, import-error, broad-except
 """This module contains functions that gets the more real time mutual fund or
 etf fund asset allocations for the blend fund asset allocation calculation. """
+import codecs
 import json
 import logging
-from typing import Dict, Any
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
-from portfolio_allocation.configuration import DEFAULT_API_KEY
-from portfolio_allocation import PORTFOLIO_BREAKDOWN
+from portfolio_allocation import (
+    PORTFOLIO_BREAKDOWN,
+    CACHE_DIR,
+    http_session,
+    load_configuration,
+)
+from portfolio_allocation.morningstar_cache import JsonFileCache
 
-MORNINGSTAR_FRONT_URL: str = "https://www.morningstar.com"
+MORNINGSTAR_FRONT_URL: str = os.environ.get(
+    "MORNINGSTAR_FRONT_URL", "https://www.morningstar.com"
+)
 MORNINGSTAR_END_URL: str = "portfolio"
 BEAUTIFULSOUP_PARSER: str = "html.parser"
 SECURITY_ID_HTML_TAG_NAME: str = "sal-components"
 SECURITY_ID_HTML_ATTRIBUTE_NAME: str = "security-id"
-MORNINGSTAR_API_FRONT_URL: str = "https://api-global.morningstar.com/sal-service/v1"
+SECURITY_ID_STREAM_CHUNK_SIZE: int = 16 * 1024
+DEFAULT_HTML_ENCODING: str = "utf-8"
+MORNINGSTAR_API_FRONT_URL: str = os.environ.get(
+    "MORNINGSTAR_API_FRONT_URL", "https://api-global.morningstar.com/sal-service/v1"
+)
+MORNINGSTAR_API_KEY_ENVIRONMENT_VARIABLE: str = "MORNINGSTAR_API_KEY"
 MORNINGSTAR_API_MID_URL: str = "process/asset/v2"
 MORNINGSTAR_API_END_URL: str = (
     "data?languageId=en&locale=en&clientId=MDC&benchmarkId=mstarorcat&component="
     "sal-components-mip-asset-allocation&version=3.79.0"
 )
 REQUEST_TIME_OUT: int = 60
+DEFAULT_MAX_WORKERS: int = 8
+SECURITY_ID_CACHE_TTL_SECONDS: float = 30 * 24 * 60 * 60
+ALLOCATION_CACHE_TTL_SECONDS: float = 7 * 24 * 60 * 60
+ALLOCATION_CACHE_MAX_ENTRIES: int = 1000
+DEFAULT_STALE_WHILE_REVALIDATE: bool = True
+BACKGROUND_REFRESH_MAX_WORKERS: int = 2
+DEFAULT_FUND_DEADLINE_SECONDS: float = 30.0
 
 RAW_TO_STANDARDIZED_PORTFOLIO_KEY_MAPPING: Dict[str, str] = {
     "AssetAllocCash": "cash",
@@ -36,81 +60,635 @@ RAW_TO_STANDARDIZED_PORTFOLIO_KEY_MAPPING: Dict[str, str] = {
 DEFAULT_ALLOCATION_TYPE: str = "netAllocation"
 PERCENT_FACTOR: float = 100.0
 
+FundKey = Tuple[str, str]
+
+
+class FundAllocationResult(NamedTuple):
+    """
+    The asset allocations of a collection of funds, together with the funds that
+    could not be fetched. Stale funds use their last known asset allocation and
+    failed funds have no asset allocation at all.
+    """
+
+    fund_asset_allocations: Dict[FundKey, Dict[str, float]]
+    stale_fund_keys: List[FundKey]
+    failed_fund_keys: List[FundKey]
+
+
 LOGGER = logging.getLogger(__name__)
 
 
+class _SecurityIdHTMLParser(HTMLParser):
+    """
+    An incremental html tokenizer that remembers the security id of the first
+    sal-components tag carrying one.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.security_id: Optional[str] = None
+
+    def error(self, message: str) -> None:
+        """Ignores malformed html, the same way the full html parser does."""
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        """
+        Looks for the security id attribute on sal-components tags.
+        Args:
+            tag (str): the lower cased tag name.
+            attrs (List[Tuple[str, Optional[str]]]): the tag attributes.
+        """
+        if self.security_id is None and tag == SECURITY_ID_HTML_TAG_NAME:
+            self.security_id = dict(attrs).get(SECURITY_ID_HTML_ATTRIBUTE_NAME)
+
+
+SECURITY_ID_CACHE = JsonFileCache(
+    file_path=CACHE_DIR / "security_ids.json",
+    ttl_seconds=SECURITY_ID_CACHE_TTL_SECONDS,
+)
+ALLOCATION_CACHE = JsonFileCache(
+    file_path=CACHE_DIR / "asset_allocations.json",
+    ttl_seconds=ALLOCATION_CACHE_TTL_SECONDS,
+    max_entries=ALLOCATION_CACHE_MAX_ENTRIES,
+)
+LAST_KNOWN_ALLOCATION_CACHE = JsonFileCache(
+    file_path=CACHE_DIR / "last_known_asset_allocations.json",
+)
+
+_BACKGROUND_REFRESH_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_BACKGROUND_REFRESH_LOCK = threading.Lock()
+_BACKGROUND_REFRESHES: Dict[str, Future] = {}
+
+
 def blend_fund_asset_allocation_generator(
-    fund_name_to_ticker_mapping: Dict[str, str], mid_url: str
+    fund_name_to_ticker_mapping: Dict[str, str],
+    mid_url: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    force_refresh: bool = False,
+    stale_while_revalidate: bool = DEFAULT_STALE_WHILE_REVALIDATE,
 ) -> Dict[str, Dict[str, float]]:
     """
     Creates asset allocation information for all funds for a given account.
+    Funds are fetched concurrently with a bounded thread pool, so the wall time
+    scales with the slowest fund instead of the sum of all funds.
     Args:
         fund_name_to_ticker_mapping (Dict[str, str]): A dictionary containing all funds
         in a blend account with
         ticker symbol mapping as value.
         mid_url (str): the base url that differentiates between etfs and mutual_funds.
-
+        max_workers (int): the maximum number of funds fetched at the same time.
+        1 fetches the funds one after another.
+        force_refresh (bool): ignore the cached security ids and asset allocations
+        and look them up again.
+        stale_while_revalidate (bool): serve expired cached asset allocations right
+        away and refresh them in the background.
 
     Returns:
         A dictionary containing asset allocation for all funds in a blend fund account.
     """
-    blend_fund_account_mapping = {}
-    for fund_name, ticker in fund_name_to_ticker_mapping.items():
-        fund_api_url = _create_api_url_for_asset_allocation(
-            fund_ticker=ticker,
-            mid_url=mid_url,
+    unique_fund_asset_allocation = unique_fund_asset_allocation_generator(
+        fund_keys=[
+            (ticker, mid_url) for ticker in fund_name_to_ticker_mapping.values()
+        ],
+        max_workers=max_workers,
+        force_refresh=force_refresh,
+        stale_while_revalidate=stale_while_revalidate,
+    )
+    return {
+        fund_name: unique_fund_asset_allocation[(ticker, mid_url)]
+        for fund_name, ticker in fund_name_to_ticker_mapping.items()
+    }
+
+
+def unique_fund_asset_allocation_generator(
+    fund_keys: Iterable[FundKey],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    force_refresh: bool = False,
+    stale_while_revalidate: bool = DEFAULT_STALE_WHILE_REVALIDATE,
+) -> Dict[FundKey, Dict[str, float]]:
+    """
+    Creates asset allocation information for a collection of funds. Every distinct
+    (ticker, mid_url) pair is fetched exactly once, concurrently with a bounded
+    thread pool.
+    Args:
+        fund_keys (Iterable[FundKey]): (ticker, mid_url) pairs of the funds, can
+        contain duplicates.
+        max_workers (int): the maximum number of funds fetched at the same time.
+        1 fetches the funds one after another.
+        force_refresh (bool): ignore the cached security ids and asset allocations
+        and look them up again.
+        stale_while_revalidate (bool): serve expired cached asset allocations right
+        away and refresh them in the background.
+
+    Returns:
+        A dictionary with (ticker, mid_url) as key and the standardized asset
+        allocation of the fund as value.
+    """
+    unique_fund_keys = list(dict.fromkeys(fund_keys))
+    if max_workers <= 1 or len(unique_fund_keys) <= 1:
+        return {
+            fund_key: _fetch_fund_asset_allocation(
+                fund_ticker=fund_key[0],
+                mid_url=fund_key[1],
+                force_refresh=force_refresh,
+                stale_while_revalidate=stale_while_revalidate,
+            )
+            for fund_key in unique_fund_keys
+        }
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(unique_fund_keys))
+    ) as executor:
+        fund_futures = {
+            fund_key: executor.submit(
+                _fetch_fund_asset_allocation,
+                fund_ticker=fund_key[0],
+                mid_url=fund_key[1],
+                force_refresh=force_refresh,
+                stale_while_revalidate=stale_while_revalidate,
+            )
+            for fund_key in unique_fund_keys
+        }
+        return {
+            fund_key: fund_future.result()
+            for fund_key, fund_future in fund_futures.items()
+        }
+
+
+def resilient_fund_asset_allocation_generator(
+    fund_keys: Iterable[FundKey],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    fund_deadline_seconds: Optional[float] = DEFAULT_FUND_DEADLINE_SECONDS,
+    force_refresh: bool = False,
+    stale_while_revalidate: bool = DEFAULT_STALE_WHILE_REVALIDATE,
+) -> FundAllocationResult:
+    """
+    Creates asset allocation information for a collection of funds without
+    letting one slow or failing fund fail the whole run. Every fund gets its own
+    deadline, and a fund that cannot be fetched falls back to its last known
+    asset allocation.
+    Args:
+        fund_keys (Iterable[FundKey]): (ticker, mid_url) pairs of the funds, can
+        contain duplicates.
+        max_workers (int): the maximum number of funds fetched at the same time.
+        1 fetches the funds one after another.
+        fund_deadline_seconds (Optional[float]): the time budget of every fund,
+        including retries. None waits as long as the retries take.
+        force_refresh (bool): ignore the cached security ids and asset allocations
+        and look them up again.
+        stale_while_revalidate (bool): serve expired cached asset allocations right
+        away and refresh them in the background.
+
+    Returns:
+        the fetched or last known asset allocations, with the stale and failed
+        funds.
+    """
+    unique_fund_keys = list(dict.fromkeys(fund_keys))
+    fund_outcomes: Dict[FundKey, Any] = {}
+    if max_workers <= 1 or len(unique_fund_keys) <= 1:
+        for fund_key in unique_fund_keys:
+            try:
+                fund_outcomes[fund_key] = _fetch_fund_asset_allocation(
+                    fund_ticker=fund_key[0],
+                    mid_url=fund_key[1],
+                    force_refresh=force_refresh,
+                    stale_while_revalidate=stale_while_revalidate,
+                    deadline_seconds=fund_deadline_seconds,
+                )
+            except Exception as exc:
+                fund_outcomes[fund_key] = exc
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(unique_fund_keys))
+        ) as executor:
+            fund_futures = {
+                fund_key: executor.submit(
+                    _fetch_fund_asset_allocation,
+                    fund_ticker=fund_key[0],
+                    mid_url=fund_key[1],
+                    force_refresh=force_refresh,
+                    stale_while_revalidate=stale_while_revalidate,
+                    deadline_seconds=fund_deadline_seconds,
+                )
+                for fund_key in unique_fund_keys
+            }
+            for fund_key, fund_future in fund_futures.items():
+                fund_exception = fund_future.exception()
+                fund_outcomes[fund_key] = (
+                    fund_future.result() if fund_exception is None else fund_exception
+                )
+    return _fall_back_to_last_known_allocations(fund_outcomes=fund_outcomes)
+
+
+def _fall_back_to_last_known_allocations(
+    fund_outcomes: Dict[FundKey, Any]
+) -> FundAllocationResult:
+    """
+    Replaces the failed fetches with the last known asset allocations.
+    Args:
+        fund_outcomes (Dict[FundKey, Any]): the asset allocation or the raised
+        exception of every fund.
+
+    Returns:
+        the fetched or last known asset allocations, with the stale and failed
+        funds.
+    """
+    fund_allocation_result = FundAllocationResult({}, [], [])
+    for fund_key, fund_outcome in fund_outcomes.items():
+        if not isinstance(fund_outcome, Exception):
+            fund_allocation_result.fund_asset_allocations[fund_key] = fund_outcome
+            continue
+        last_known_allocation = LAST_KNOWN_ALLOCATION_CACHE.get(
+            key=_fund_cache_key(fund_ticker=fund_key[0], mid_url=fund_key[1])
+        )
+        if last_known_allocation is None:
+            LOGGER.error(
+                "No asset allocation available for ticker %s from %s: %s",
+                fund_key[0],
+                fund_key[1],
+                fund_outcome,
+            )
+            fund_allocation_result.failed_fund_keys.append(fund_key)
+            continue
+        LOGGER.warning(
+            "Using the last known asset allocation for ticker %s from %s: %s",
+            fund_key[0],
+            fund_key[1],
+            fund_outcome,
+        )
+        fund_allocation_result.fund_asset_allocations[fund_key] = last_known_allocation
+        fund_allocation_result.stale_fund_keys.append(fund_key)
+    return fund_allocation_result
+
+
+def _fetch_fund_asset_allocation(
+    fund_ticker: str,
+    mid_url: str,
+    force_refresh: bool = False,
+    stale_while_revalidate: bool = DEFAULT_STALE_WHILE_REVALIDATE,
+    deadline_seconds: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Retrieves and standardizes the asset allocation for one fund. Freshly fetched
+    asset allocations are remembered as the last known asset allocation of the
+    fund.
+    Args:
+        fund_ticker (str): a ticker symbol for a specific ETF or mutual fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        force_refresh (bool): ignore the cached security id and asset allocation and
+        look them up again.
+        stale_while_revalidate (bool): serve an expired cached asset allocation right
+        away and refresh it in the background.
+        deadline_seconds (Optional[float]): the time budget for all requests of the
+        fund. None waits as long as the retries take.
+
+    Returns:
+        A standardized asset allocation that follow PORTFOLIO_BREAKDOWN format.
+    """
+    try:
+        with http_session.request_deadline(seconds=deadline_seconds):
+            security_id = _resolve_security_id(
+                fund_ticker=fund_ticker,
+                mid_url=mid_url,
+                force_refresh=force_refresh,
+            )
+            return _get_cached_asset_allocation(
+                security_id=security_id,
+                mid_url=mid_url,
+                force_refresh=force_refresh,
+                stale_while_revalidate=stale_while_revalidate,
+                last_known_key=_fund_cache_key(
+                    fund_ticker=fund_ticker, mid_url=mid_url
+                ),
+            )
+    except Exception:
+        LOGGER.error(
+            "Failed to retrieve asset allocation for ticker %s from %s.",
+            fund_ticker,
+            mid_url,
         )
+        raise
+
+
+def _get_cached_asset_allocation(
+    security_id: str,
+    mid_url: str,
+    force_refresh: bool = False,
+    stale_while_revalidate: bool = DEFAULT_STALE_WHILE_REVALIDATE,
+    last_known_key: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Retrieves the standardized asset allocation of a fund from the allocation
+    cache, falling back to morningstar when it is missing or expired. Background
+    refreshes get the request deadline of the current thread.
+    Args:
+        security_id (str): the morningstar security id of the fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        force_refresh (bool): ignore the cached asset allocation and fetch it again.
+        stale_while_revalidate (bool): serve an expired cached asset allocation right
+        away and refresh it in the background.
+        last_known_key (Optional[str]): the last known allocation cache key that a
+        fetched asset allocation is also stored under, None to not store it.
+
+    Returns:
+        A standardized asset allocation that follow PORTFOLIO_BREAKDOWN format.
+    """
+    if not force_refresh:
+        cached_allocation, is_expired = ALLOCATION_CACHE.get_with_expiry(
+            key=security_id
+        )
+        if cached_allocation is not None and not is_expired:
+            return cached_allocation
+        if cached_allocation is not None and stale_while_revalidate:
+            _schedule_background_refresh(
+                security_id=security_id,
+                mid_url=mid_url,
+                last_known_key=last_known_key,
+                deadline_seconds=http_session.remaining_request_time(),
+            )
+            return cached_allocation
+    return _refresh_asset_allocation(
+        security_id=security_id, mid_url=mid_url, last_known_key=last_known_key
+    )
+
+
+def _refresh_asset_allocation(
+    security_id: str,
+    mid_url: str,
+    last_known_key: Optional[str] = None,
+    deadline_seconds: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Fetches the asset allocation of a fund from morningstar and stores it in the
+    allocation cache and as the last known asset allocation.
+    Args:
+        security_id (str): the morningstar security id of the fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        last_known_key (Optional[str]): the last known allocation cache key, None
+        to not store it there.
+        deadline_seconds (Optional[float]): the time budget for the requests, None
+        keeps the deadline of the current thread.
+
+    Returns:
+        A standardized asset allocation that follow PORTFOLIO_BREAKDOWN format.
+    """
+    with http_session.request_deadline(seconds=deadline_seconds):
         raw_fund_asset_mapping = _get_asset_allocation(
-            morningstar_asset_allocation_url=fund_api_url
+            morningstar_asset_allocation_url=_build_api_url_for_asset_allocation(
+                security_id=security_id,
+                mid_url=mid_url,
+            )
         )
-        blend_fund_account_mapping[fund_name] = _process_asset_allocation(
-            raw_fund_asset_mapping
+    fund_asset_allocation = _process_asset_allocation(raw_fund_asset_mapping)
+    ALLOCATION_CACHE.set(key=security_id, value=fund_asset_allocation)
+    if last_known_key is not None:
+        LAST_KNOWN_ALLOCATION_CACHE.set(key=last_known_key, value=fund_asset_allocation)
+    return fund_asset_allocation
+
+
+def _schedule_background_refresh(
+    security_id: str,
+    mid_url: str,
+    last_known_key: Optional[str],
+    deadline_seconds: Optional[float],
+) -> None:
+    """
+    Refreshes an expired asset allocation in the background. A security id is
+    only refreshed once at a time. The background threads do not share the
+    request deadline of the scheduling thread, so the refresh gets its own.
+    Args:
+        security_id (str): the morningstar security id of the fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        last_known_key (Optional[str]): the last known allocation cache key, None
+        to not store the refreshed asset allocation there.
+        deadline_seconds (Optional[float]): the time budget for the requests, None
+        uses DEFAULT_FUND_DEADLINE_SECONDS.
+    """
+    global _BACKGROUND_REFRESH_EXECUTOR  # pylint: disable=global-statement
+    with _BACKGROUND_REFRESH_LOCK:
+        if security_id in _BACKGROUND_REFRESHES:
+            return
+        if _BACKGROUND_REFRESH_EXECUTOR is None:
+            _BACKGROUND_REFRESH_EXECUTOR = ThreadPoolExecutor(
+                max_workers=BACKGROUND_REFRESH_MAX_WORKERS,
+                thread_name_prefix="asset_allocation_refresh",
+            )
+        refresh_future = _BACKGROUND_REFRESH_EXECUTOR.submit(
+            _refresh_asset_allocation,
+            security_id=security_id,
+            mid_url=mid_url,
+            last_known_key=last_known_key,
+            deadline_seconds=(
+                DEFAULT_FUND_DEADLINE_SECONDS
+                if deadline_seconds is None
+                else deadline_seconds
+            ),
+        )
+        _BACKGROUND_REFRESHES[security_id] = refresh_future
+    refresh_future.add_done_callback(
+        lambda future: _finish_background_refresh(
+            security_id=security_id, refresh_future=future
+        )
+    )
+
+
+def _finish_background_refresh(security_id: str, refresh_future: Future) -> None:
+    """
+    Reports a failed background refresh and forgets the finished refresh.
+    Args:
+        security_id (str): the morningstar security id of the fund.
+        refresh_future (Future): the finished background refresh.
+    """
+    with _BACKGROUND_REFRESH_LOCK:
+        _BACKGROUND_REFRESHES.pop(security_id, None)
+    if refresh_future.exception() is not None:
+        LOGGER.warning(
+            "Background refresh of asset allocation for security id %s failed: %s",
+            security_id,
+            refresh_future.exception(),
         )
-    return blend_fund_account_mapping
 
 
-def _create_api_url_for_asset_allocation(fund_ticker: str, mid_url: str) -> str:
+def wait_for_background_refreshes(timeout: float = REQUEST_TIME_OUT) -> Set[str]:
+    """
+    Waits for the pending background asset allocation refreshes.
+    Args:
+        timeout (float): the maximum number of seconds to wait.
+
+    Returns:
+        the security ids that are still being refreshed after the timeout.
+    """
+    with _BACKGROUND_REFRESH_LOCK:
+        pending_refreshes = dict(_BACKGROUND_REFRESHES)
+    _, not_done = wait(pending_refreshes.values(), timeout=timeout)
+    return {
+        security_id
+        for security_id, refresh_future in pending_refreshes.items()
+        if refresh_future in not_done
+    }
+
+
+def _create_api_url_for_asset_allocation(
+    fund_ticker: str, mid_url: str, force_refresh: bool = False
+) -> str:
     """
     Creates the api url to retrieve asset allocation information from morningstar.
     Args:
         fund_ticker (str): a ticker symbol for a specific ETF or mutual fund.
         mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        force_refresh (bool): ignore the cached security id and look it up again.
     Returns:
         an api url that retrieves the asset allocation information.
     """
-    response = requests.get(
-        f"{MORNINGSTAR_FRONT_URL}/{mid_url}/{fund_ticker}/{MORNINGSTAR_END_URL}",
-        timeout=REQUEST_TIME_OUT,
+    return _build_api_url_for_asset_allocation(
+        security_id=_resolve_security_id(
+            fund_ticker=fund_ticker,
+            mid_url=mid_url,
+            force_refresh=force_refresh,
+        ),
+        mid_url=mid_url,
     )
-    soup = BeautifulSoup(response.content, BEAUTIFULSOUP_PARSER)
-    security_id = soup.find(SECURITY_ID_HTML_TAG_NAME)[SECURITY_ID_HTML_ATTRIBUTE_NAME]
+
+
+def _build_api_url_for_asset_allocation(security_id: str, mid_url: str) -> str:
+    """
+    Builds the api url to retrieve asset allocation information for a security id.
+    Args:
+        security_id (str): the morningstar security id of the fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+    Returns:
+        an api url that retrieves the asset allocation information.
+    """
     return (
         f"{MORNINGSTAR_API_FRONT_URL}/{mid_url.split('/')[0][:-1]}/"
         f"{MORNINGSTAR_API_MID_URL}/{security_id}/{MORNINGSTAR_API_END_URL}"
     )
 
 
+def _resolve_security_id(
+    fund_ticker: str, mid_url: str, force_refresh: bool = False
+) -> str:
+    """
+    Looks up the morningstar security id for a fund, using the on disk security id
+    cache unless it is missing, expired or a refresh is forced.
+    Args:
+        fund_ticker (str): a ticker symbol for a specific ETF or mutual fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+        force_refresh (bool): ignore the cached security id and look it up again.
+    Returns:
+        the morningstar security id of the fund.
+    """
+    cache_key = _fund_cache_key(fund_ticker=fund_ticker, mid_url=mid_url)
+    security_id = None if force_refresh else SECURITY_ID_CACHE.get(key=cache_key)
+    if security_id is None:
+        security_id = _fetch_security_id(fund_ticker=fund_ticker, mid_url=mid_url)
+        SECURITY_ID_CACHE.set(key=cache_key, value=security_id)
+    return security_id
+
+
+def _fund_cache_key(fund_ticker: str, mid_url: str) -> str:
+    """
+    Creates the cache key of a fund.
+    Args:
+        fund_ticker (str): a ticker symbol for a specific ETF or mutual fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+    Returns:
+        a cache key unique to the ticker and mid url.
+    """
+    return f"{mid_url}|{fund_ticker}"
+
+
+def _fetch_security_id(fund_ticker: str, mid_url: str) -> str:
+    """
+    Reads the security id from the morningstar portfolio page of a fund. The page
+    is streamed and the download stops as soon as the security id was seen. The
+    whole page is only parsed when streaming did not find it.
+    Args:
+        fund_ticker (str): a ticker symbol for a specific ETF or mutual fund.
+        mid_url (str): the base url that differentiates between etfs and mutual_funds.
+    Returns:
+        the morningstar security id of the fund.
+    """
+    response = http_session.HTTP_CLIENT.get(
+        f"{MORNINGSTAR_FRONT_URL}/{mid_url}/{fund_ticker}/{MORNINGSTAR_END_URL}",
+        timeout=REQUEST_TIME_OUT,
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        security_id, page_content = _stream_security_id(response=response)
+    finally:
+        response.close()
+    if security_id is None:
+        LOGGER.warning(
+            "Falling back to a full html parse for the security id of %s.",
+            fund_ticker,
+        )
+        soup = BeautifulSoup(
+            page_content,
+            BEAUTIFULSOUP_PARSER,
+            parse_only=SoupStrainer(SECURITY_ID_HTML_TAG_NAME),
+        )
+        security_id = soup.find(SECURITY_ID_HTML_TAG_NAME)[
+            SECURITY_ID_HTML_ATTRIBUTE_NAME
+        ]
+    return security_id
+
+
+def _stream_security_id(
+    response: requests.Response,
+) -> Tuple[Optional[str], bytes]:
+    """
+    Feeds a streamed html response into an incremental tokenizer until the
+    security id shows up.
+    Args:
+        response (requests.Response): a streamed morningstar portfolio page.
+    Returns:
+        the security id or None if the page does not contain it, and the full page
+        content when the security id was not found.
+    """
+    parser = _SecurityIdHTMLParser()
+    decoder = codecs.getincrementaldecoder(response.encoding or DEFAULT_HTML_ENCODING)(
+        errors="replace"
+    )
+    page_chunks = []
+    for page_chunk in response.iter_content(chunk_size=SECURITY_ID_STREAM_CHUNK_SIZE):
+        page_chunks.append(page_chunk)
+        parser.feed(decoder.decode(page_chunk))
+        if parser.security_id is not None:
+            return parser.security_id, b""
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.security_id, b"".join(page_chunks)
+
+
 def _get_asset_allocation(
-    morningstar_asset_allocation_url: str, api_key: str = DEFAULT_API_KEY
+    morningstar_asset_allocation_url: str, api_key: Optional[str] = None
 ) -> Dict[str, Dict[str, float]]:
     """
     Retrieves asset allocation for a specific blend fund from morningstar website.
     Args:
         morningstar_asset_allocation_url (str): api url to retrieve the asset allocation
         url.
-        api_key (str): api key to retrieve asset allocation informatin.
+        api_key (Optional[str]): api key to retrieve asset allocation informatin.
+        Defaults to the MORNINGSTAR_API_KEY environment variable, then to
+        DEFAULT_API_KEY of the configuration.
 
     Returns:
         A dictionary of dictionary containing asset allocation information.
     """
+    if api_key is None:
+        api_key = os.environ.get(MORNINGSTAR_API_KEY_ENVIRONMENT_VARIABLE)
+    if not api_key:
+        api_key = load_configuration().DEFAULT_API_KEY
     try:
-        asset_content = requests.get(
+        asset_content = http_session.HTTP_CLIENT.get(
             morningstar_asset_allocation_url,
             headers={
                 "apikey": api_key,
             },
             timeout=REQUEST_TIME_OUT,
         )
+        asset_content.raise_for_status()
     except requests.exceptions.RequestException as exc:
         LOGGER.error(
             "Please go to morningstar to retrieve an updated api key "
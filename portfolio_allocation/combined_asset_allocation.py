@@ -1,10 +1,11 @@
 """This module combines both blend and non-blend accounts."""
 
-from typing import Dict, List, Set
+from typing import Dict, List, Sequence, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
-from portfolio_allocation import combine_portfolios, PORTFOLIO_BREAKDOWN
+from portfolio_allocation import ALL_ASSET_CLASSES, combine_portfolios
 
 DEFAULT_DATAFRAME_ORIENT: str = "index"
 DEFAULT_ASSET_AMOUNT_COLUMN_NAME: str = "asset_value($)"
@@ -18,7 +19,7 @@ DEFAULT_ASSET_ALLOCATION_BY_REGION_AND_ASSET_CLASS_COLUMNS: List[str] = [
     "not_classified",
 ]
 DEFAULT_US_ASSET_TYPES: Set[str] = {"cash", "other", "not_classified", "mortgage"}
-ALL_ASSET_TYPES: Set[str] = {"mortgage"}.union(PORTFOLIO_BREAKDOWN.keys())
+ALL_ASSET_TYPES: Set[str] = set(ALL_ASSET_CLASSES)
 DEFAULT_US_INTERNATIONAL_ASSET_TYPES: Set[str] = {"fixed_income"}
 DEFAULT_REGION_INDICES: List[str] = ["us", "international", "us_international"]
 DEFAULT_NA_VALUE: float = 0.0
@@ -135,3 +136,63 @@ def generate_asset_allocation_by_region_and_asset_class_table(
         DEFAULT_TOTAL_ROW_INDEX
     ] = asset_allocation_by_region_and_asset_class_df.sum()
     return asset_allocation_by_region_and_asset_class_df
+
+
+def generate_asset_allocation_tables(
+    asset_values: np.ndarray, asset_types: Sequence[str]
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Creates the asset class table and the region and asset class table of many
+    portfolios at once. The percentages and region cells of all portfolios are
+    computed in one vectorized pass, only the data frames are built one by one.
+    Args:
+        asset_values (np.ndarray): one row of asset amounts in US dollars along
+        asset_types per portfolio.
+        asset_types (Sequence[str]): the asset types of the columns.
+    Returns:
+        for every portfolio the table of
+        generate_asset_allocation_by_asset_class_table and the table of
+        generate_asset_allocation_by_region_and_asset_class_table.
+    """
+    asset_values = np.asarray(asset_values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asset_pcts = asset_values / asset_values.sum(axis=1, keepdims=True) * 100.0
+    region_cells = np.zeros(
+        (
+            len(asset_types),
+            len(DEFAULT_REGION_INDICES),
+            len(DEFAULT_ASSET_ALLOCATION_BY_REGION_AND_ASSET_CLASS_COLUMNS),
+        )
+    )
+    for asset_index, asset_type in enumerate(asset_types):
+        if asset_type not in ALL_ASSET_TYPES:
+            continue
+        df_index, col_name = _assign_asset_type_breakdown(asset_type=asset_type)
+        region_cells[
+            asset_index,
+            DEFAULT_REGION_INDICES.index(df_index),
+            DEFAULT_ASSET_ALLOCATION_BY_REGION_AND_ASSET_CLASS_COLUMNS.index(col_name),
+        ] = 1.0
+    region_pcts = np.einsum("pa,arc->prc", asset_pcts, region_cells)
+    region_pcts = np.concatenate(
+        [region_pcts, region_pcts.sum(axis=1, keepdims=True)], axis=1
+    )
+    return [
+        (
+            pd.DataFrame(
+                {
+                    DEFAULT_ASSET_AMOUNT_COLUMN_NAME: portfolio_values,
+                    DEFAULT_ASSET_PCT_COLUMN_NAME: portfolio_pcts,
+                },
+                index=list(asset_types),
+            ),
+            pd.DataFrame(
+                portfolio_region_pcts,
+                index=[*DEFAULT_REGION_INDICES, DEFAULT_TOTAL_ROW_INDEX],
+                columns=DEFAULT_ASSET_ALLOCATION_BY_REGION_AND_ASSET_CLASS_COLUMNS,
+            ),
+        )
+        for portfolio_values, portfolio_pcts, portfolio_region_pcts in zip(
+            asset_values, asset_pcts, region_pcts
+        )
+    ]
@@ -0,0 +1,314 @@
+"""This module contains the on disk cache of text and tables extracted from
+statement PDFs. Entries are addressed by the SHA-256 of the PDF bytes, so reruns
+on unchanged statements skip PDF decoding entirely while a replaced statement is
+always extracted again."""
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from portfolio_allocation import CACHE_DIR
+
+EXTRACTION_CACHE_DIR: Path = CACHE_DIR / "extractions"
+DEFAULT_EXTRACTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+EVICTION_TARGET_RATIO: float = 0.9
+FILE_HASH_CHUNK_SIZE: int = 1024 * 1024
+TEXT_FILE_ENCODING: str = "utf-8"
+TEXT_FILE_SUFFIX: str = ".txt.gz"
+TABLES_FILE_SUFFIX: str = ".tables.json.gz"
+
+LOGGER = logging.getLogger(__name__)
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Hashes the content of a file.
+    Args:
+        file_path (str): the file to hash.
+
+    Returns:
+        the sha256 hex digest of the file bytes.
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(FILE_HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def buffer_sha256(buffer: Union[bytes, mmap.mmap]) -> str:
+    """
+    Hashes an in memory or memory mapped file content without copying it.
+    Args:
+        buffer (Union[bytes, mmap.mmap]): the file content.
+
+    Returns:
+        the sha256 hex digest of the content.
+    """
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def table_parameters_key(
+    page_num: int, pandas_options: Dict[str, Any], multiple_table_flag: bool
+) -> str:
+    """
+    Creates the cache key of the tables parsed from a page.
+    Args:
+        page_num (int): the page number for the tables to parse, page one is 0.
+        pandas_options (Dict[str, Any]): optional argument for the pandas method
+        pd.read_csv.
+        multiple_table_flag (bool): only one table or multiple table in the page.
+
+    Returns:
+        a sha256 hex digest of the parse parameters.
+    """
+    parameters = json.dumps(
+        {
+            "page_num": page_num,
+            "pandas_options": pandas_options,
+            "multiple_table_flag": multiple_table_flag,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(parameters.encode(TEXT_FILE_ENCODING)).hexdigest()
+
+
+class ExtractionCache:
+    """
+    A thread safe on disk cache of extracted statement text, stored as gzip
+    compressed plain text, and parsed statement tables, stored as gzip compressed
+    JSON so reading a cache entry never runs code. Every read marks an entry as
+    recently used, and the least recently used entries are removed once the cache
+    holds more than max_bytes.
+
+    The cache size is kept as a running total, so a write only scans the cache
+    directory the first time and when the total passes max_bytes. Eviction then
+    shrinks the cache to EVICTION_TARGET_RATIO of max_bytes, which leaves room
+    for many writes before the next scan.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = EXTRACTION_CACHE_DIR,
+        max_bytes: int = DEFAULT_EXTRACTION_CACHE_MAX_BYTES,
+    ) -> None:
+        """
+        Args:
+            cache_dir (Path): the directory that stores the cache entries.
+            max_bytes (int): the maximum size of all cache entries on disk.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get_text(self, file_digest: str, name: str) -> Optional[str]:
+        """
+        Retrieves cached text of a statement.
+        Args:
+            file_digest (str): the sha256 hex digest of the statement.
+            name (str): the name of the text, e.g. the page it was extracted from.
+
+        Returns:
+            the cached text or None if it is missing.
+        """
+        content = self._read(
+            file_path=self._entry_path(file_digest, f"{name}{TEXT_FILE_SUFFIX}")
+        )
+        return None if content is None else content.decode(TEXT_FILE_ENCODING)
+
+    def set_text(self, file_digest: str, name: str, text: str) -> None:
+        """
+        Stores text of a statement.
+        Args:
+            file_digest (str): the sha256 hex digest of the statement.
+            name (str): the name of the text, e.g. the page it was extracted from.
+            text (str): the text to store.
+        """
+        self._write(
+            file_path=self._entry_path(file_digest, f"{name}{TEXT_FILE_SUFFIX}"),
+            content=text.encode(TEXT_FILE_ENCODING),
+        )
+
+    def get_tables(
+        self, file_digest: str, parameters_key: str
+    ) -> Optional[List[pd.DataFrame]]:
+        """
+        Retrieves cached tables of a statement.
+        Args:
+            file_digest (str): the sha256 hex digest of the statement.
+            parameters_key (str): the key of the parse parameters, created with
+            table_parameters_key.
+
+        Returns:
+            the cached tables or None if they are missing.
+        """
+        content = self._read(
+            file_path=self._entry_path(
+                file_digest, f"{parameters_key}{TABLES_FILE_SUFFIX}"
+            )
+        )
+        if content is None:
+            return None
+        try:
+            return _tables_from_json(content=content)
+        except (ValueError, KeyError, TypeError):
+            LOGGER.warning("Ignoring unreadable cached tables %s.", parameters_key)
+            return None
+
+    def set_tables(
+        self, file_digest: str, parameters_key: str, tables: List[pd.DataFrame]
+    ) -> None:
+        """
+        Stores tables of a statement.
+        Args:
+            file_digest (str): the sha256 hex digest of the statement.
+            parameters_key (str): the key of the parse parameters, created with
+            table_parameters_key.
+            tables (List[pd.DataFrame]): the parsed tables.
+        """
+        self._write(
+            file_path=self._entry_path(
+                file_digest, f"{parameters_key}{TABLES_FILE_SUFFIX}"
+            ),
+            content=_tables_to_json(tables=tables),
+        )
+
+    def _entry_path(self, file_digest: str, file_name: str) -> Path:
+        """
+        Creates the file path of a cache entry.
+        Args:
+            file_digest (str): the sha256 hex digest of the statement.
+            file_name (str): the file name of the entry.
+
+        Returns:
+            the cache entry file path.
+        """
+        return self.cache_dir / file_digest / file_name
+
+    def _read(self, file_path: Path) -> Optional[bytes]:
+        """
+        Reads and decompresses a cache entry and marks it as recently used.
+        Args:
+            file_path (Path): the cache entry file path.
+
+        Returns:
+            the entry content or None if it is missing or unreadable.
+        """
+        try:
+            with gzip.open(file_path, "rb") as file:
+                content = file.read()
+            os.utime(file_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError):
+            LOGGER.warning("Ignoring unreadable cache file %s.", file_path)
+            return None
+        return content
+
+    def _write(self, file_path: Path, content: bytes) -> None:
+        """
+        Compresses and writes a cache entry atomically, then evicts old entries
+        when the running cache size passes max_bytes.
+        Args:
+            file_path (Path): the cache entry file path.
+            content (bytes): the entry content.
+        """
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = file_path.with_name(
+            f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with gzip.open(temporary_path, "wb") as file:
+            file.write(content)
+        written_bytes = temporary_path.stat().st_size
+        try:
+            replaced_bytes = file_path.stat().st_size
+        except FileNotFoundError:
+            replaced_bytes = 0
+        os.replace(temporary_path, file_path)
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += written_bytes - replaced_bytes
+            if self._total_bytes is None or self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Scans the cache directory for its actual size, which includes entries
+        written by other processes, and removes the least recently used entries
+        once the cache is over max_bytes. The caller holds the lock.
+        """
+        entries = []
+        for file_path in self.cache_dir.glob("*/*"):
+            if file_path.suffix == ".tmp":
+                continue
+            try:
+                entries.append((file_path, file_path.stat()))
+            except FileNotFoundError:
+                continue
+        total_bytes = sum(file_stat.st_size for _, file_stat in entries)
+        if total_bytes > self.max_bytes:
+            target_bytes = self.max_bytes * EVICTION_TARGET_RATIO
+            entries.sort(key=lambda entry: entry[1].st_mtime)
+            for file_path, file_stat in entries:
+                if total_bytes <= target_bytes:
+                    break
+                file_path.unlink(missing_ok=True)
+                total_bytes -= file_stat.st_size
+        self._total_bytes = total_bytes
+
+
+def _tables_to_json(tables: List[pd.DataFrame]) -> bytes:
+    """
+    Encodes tables as JSON with their labels, column dtypes and column values.
+    Args:
+        tables (List[pd.DataFrame]): the parsed tables.
+
+    Returns:
+        the JSON encoded tables.
+    """
+    return json.dumps(
+        [
+            {
+                "columns": table.columns.tolist(),
+                "index": table.index.tolist(),
+                "dtypes": [str(dtype) for dtype in table.dtypes],
+                "data": [
+                    table.iloc[:, column_num].tolist()
+                    for column_num in range(table.shape[1])
+                ],
+            }
+            for table in tables
+        ]
+    ).encode(TEXT_FILE_ENCODING)
+
+
+def _tables_from_json(content: bytes) -> List[pd.DataFrame]:
+    """
+    Decodes tables encoded by _tables_to_json.
+    Args:
+        content (bytes): the JSON encoded tables.
+
+    Returns:
+        the tables.
+
+    Raises:
+        ValueError: the content is not JSON or the tables do not fit their labels.
+        KeyError: a table misses a field.
+    """
+    tables = []
+    for table_entry in json.loads(content.decode(TEXT_FILE_ENCODING)):
+        table = pd.DataFrame(
+            dict(enumerate(table_entry["data"])), index=table_entry["index"]
+        ).astype(dict(enumerate(table_entry["dtypes"])))
+        table.columns = table_entry["columns"]
+        tables.append(table)
+    return tables
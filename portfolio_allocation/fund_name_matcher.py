@@ -0,0 +1,112 @@
+"""This module contains the matcher that finds configured fund names in statement
+text. All fund names are compiled into one alternation regex, so every line is
+scanned once no matter how many funds an account holds, and the funds may appear
+in any order."""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence
+
+
+class FundMatchResult(NamedTuple):
+    """
+    The statement lines of every matched fund name, one line per configured
+    occurrence, together with the fund names seen on more lines than configured
+    and the fund names seen on fewer lines, once per missing occurrence.
+    """
+
+    fund_lines: Dict[str, List[str]]
+    duplicate_fund_names: List[str]
+    missing_fund_names: List[str]
+
+
+class FundNameMatcher:
+    """Finds the configured fund names in statement text lines."""
+
+    def __init__(self, fund_names: Sequence[str]) -> None:
+        """
+        Args:
+            fund_names (Sequence[str]): the fund names to look for, a fund name
+            listed several times is expected on that many lines, for example
+            one lot per contribution source.
+        """
+        self.fund_name_counts = Counter(fund_names)
+        self.fund_names = list(self.fund_name_counts)
+        self._pattern: Optional[Pattern[str]] = None
+        if self.fund_names:
+            self._pattern = re.compile(
+                "|".join(
+                    re.escape(fund_name)
+                    for fund_name in sorted(self.fund_names, key=len, reverse=True)
+                )
+            )
+
+    def match_line(self, text_line: str) -> Optional[str]:
+        """
+        Finds the fund name in a text line. When several fund names are in the
+        line, the leftmost one wins, and the longest one when they start at the
+        same position.
+        Args:
+            text_line (str): a line of statement text.
+
+        Returns:
+            the matched fund name or None if the line has no fund name.
+        """
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(text_line)
+        return None if match is None else match.group()
+
+    def find_all(self, text_line: str) -> List[str]:
+        """
+        Finds every fund name in a text line.
+        Args:
+            text_line (str): a line of statement text.
+
+        Returns:
+            the matched fund names from left to right, without overlaps.
+        """
+        if self._pattern is None:
+            return []
+        return self._pattern.findall(text_line)
+
+    def match_lines(self, text_lines: Iterable[str]) -> FundMatchResult:
+        """
+        Finds the lines of every fund name. Every configured occurrence of a fund
+        name uses up the next line naming it. Reading stops once every
+        occurrence was found, so extra lines are only reported as duplicates for
+        the lines read until then.
+        Args:
+            text_lines (Iterable[str]): the lines of statement text, read lazily.
+
+        Returns:
+            the matched lines with the duplicate and missing fund names.
+        """
+        fund_lines: Dict[str, List[str]] = {}
+        duplicate_fund_names: Dict[str, None] = {}
+        missing_count = sum(self.fund_name_counts.values())
+        if self.fund_names:
+            for text_line in text_lines:
+                fund_name = self.match_line(text_line=text_line)
+                if fund_name is None:
+                    continue
+                matched_lines = fund_lines.setdefault(fund_name, [])
+                if len(matched_lines) == self.fund_name_counts[fund_name]:
+                    duplicate_fund_names[fund_name] = None
+                    continue
+                matched_lines.append(text_line)
+                missing_count -= 1
+                if not missing_count:
+                    break
+        return FundMatchResult(
+            fund_lines={
+                fund_name: matched_lines
+                for fund_name, matched_lines in fund_lines.items()
+                if matched_lines
+            },
+            duplicate_fund_names=list(duplicate_fund_names),
+            missing_fund_names=[
+                fund_name
+                for fund_name, fund_name_count in self.fund_name_counts.items()
+                for _ in range(fund_name_count - len(fund_lines.get(fund_name, [])))
+            ],
+        )
@@ -2,7 +2,7 @@
 the default browser with allocation information."""
 
 import webbrowser
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 from enum import Enum
 
 import pandas as pd
@@ -14,6 +14,8 @@ ASSET_CLASS_TABLE_START_END_LINE_INDICES: Tuple[int, int] = (45, 79)
 REGION_TABLE_START_END_LINE_INDICES: Tuple[int, int] = (93, 128)
 DEFAULT_INDENT: str = 3 * "\t"
 DEFAULT_END: str = "\n"
+STALE_FUND_NOTICE_CLASS: str = "stale_funds"
+BODY_END_TAG: str = "</body>"
 
 
 class AssetTableType(Enum):
@@ -82,10 +84,59 @@ def _update_asset_allocation_table(
     return html_data
 
 
+def _update_stale_fund_notice(
+    html_data: List[str],
+    stale_funds: Sequence[str],
+    failed_funds: Sequence[str] = (),
+) -> List[str]:
+    """
+    This function replaces the notice listing the funds that use their last known
+    asset allocation and the funds left out without one. The notice goes right
+    before the end of the body, after both tables, so the table line indices stay
+    the same.
+    Args:
+        html_data (List[str]): all the html file lines.
+        stale_funds (Sequence[str]): the stale fund names.
+        failed_funds (Sequence[str]): the fund names left out. The notice is
+        removed when both are empty.
+    Returns:
+        all the html file lines with the notice updated.
+    """
+    html_data = [
+        html_line
+        for html_line in html_data
+        if f'class="{STALE_FUND_NOTICE_CLASS}"' not in html_line
+    ]
+    notices = []
+    if stale_funds:
+        notices.append(
+            f"using the last known asset allocation of: {', '.join(stale_funds)}"
+        )
+    if failed_funds:
+        notices.append(
+            "leaving out the funds without an asset allocation: "
+            f"{', '.join(failed_funds)}"
+        )
+    if not notices:
+        return html_data
+    notice_line = (
+        f'\t<p class="{STALE_FUND_NOTICE_CLASS}">Degraded result, '
+        f"{'; '.join(notices)}</p>{DEFAULT_END}"
+    )
+    body_end_indices = [
+        index for index, html_line in enumerate(html_data) if BODY_END_TAG in html_line
+    ]
+    notice_index = body_end_indices[-1] if body_end_indices else len(html_data)
+    html_data.insert(notice_index, notice_line)
+    return html_data
+
+
 def update_asset_allocation_html(
     asset_table_without_region: pd.DataFrame,
     asset_table_with_region: pd.DataFrame,
     file_path: str = DEFAULT_PATH,
+    stale_funds: Sequence[str] = (),
+    failed_funds: Sequence[str] = (),
 ) -> None:
     """
     This function updates the existing html table.
@@ -96,6 +147,10 @@ def update_asset_allocation_html(
         information.
         file_path (str): local file path for the html file. It uses default_path if
         not provided.
+        stale_funds (Sequence[str]): the funds that use their last known asset
+        allocation, shown in a notice below the tables.
+        failed_funds (Sequence[str]): the funds left out without an asset
+        allocation, shown in the same notice.
     """
     asset_table_without_region_lines = _convert_df_to_html_table(
         asset_table=asset_table_without_region
@@ -117,5 +172,8 @@ def update_asset_allocation_html(
         asset_table_lines=asset_table_with_region_lines,
         asset_table_type=AssetTableType.REGION,
     )
+    html_data = _update_stale_fund_notice(
+        html_data=html_data, stale_funds=stale_funds, failed_funds=failed_funds
+    )
     with open(ROOT_DIR / file_path, "w", encoding="utf-8") as html_file:
         html_file.writelines(html_data)
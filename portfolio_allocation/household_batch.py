@@ -0,0 +1,103 @@
+"""This module is the batch entry point that evaluates the blend fund accounts of
+many households in one run. Every household is a configuration module defining
+its own ALL_CURRENT_BLEND_ACCOUNTS and
+BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING, so portfolio_allocation.configuration
+is not needed when the MORNINGSTAR_API_KEY environment variable is set. Funds held
+by several households are fetched once:
+
+    python -m portfolio_allocation.household_batch households.lee households.kim \\
+        --jobs 4 --output household_asset_allocations.json
+"""
+import argparse
+import importlib
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from portfolio_allocation.blend_fund_asset_allocation import (
+    DEFAULT_JOBS,
+    Household,
+    generate_household_blend_fund_asset_allocations,
+)
+
+JSON_INDENT: int = 2
+
+LOGGER = logging.getLogger(__name__)
+
+
+def load_household(module_name: str) -> Household:
+    """
+    Loads the blend accounts of a household from its configuration module.
+    Args:
+        module_name (str): the importable configuration module name, also used as
+        the household name.
+
+    Returns:
+        the household.
+    """
+    configuration = importlib.import_module(module_name)
+    return Household(
+        name=module_name,
+        blend_accounts=configuration.ALL_CURRENT_BLEND_ACCOUNTS,
+        account_mapping=configuration.BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING,
+    )
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """
+    Evaluates every household and writes one asset allocation per household as
+    JSON, together with the tickers of the funds that use their last known asset
+    allocation and of the funds left out without one.
+    Args:
+        arguments (Optional[List[str]]): command line arguments, defaults to
+        sys.argv.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("households", nargs="+", help="configuration module names.")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="the JSON file, defaults to stdout."
+    )
+    parsed_arguments = parser.parse_args(arguments)
+    household_asset_allocations = generate_household_blend_fund_asset_allocations(
+        households=[
+            load_household(module_name=module_name)
+            for module_name in parsed_arguments.households
+        ],
+        jobs=parsed_arguments.jobs,
+        incremental=parsed_arguments.incremental,
+    )
+    output = json.dumps(
+        {
+            household_name: {
+                "asset_allocation": household_allocation.asset_allocation,
+                "stale_funds": [
+                    fund_ticker
+                    for fund_ticker, _ in household_allocation.stale_fund_keys
+                ],
+                "failed_funds": [
+                    fund_ticker
+                    for fund_ticker, _ in household_allocation.failed_fund_keys
+                ],
+            }
+            for household_name, household_allocation in (
+                household_asset_allocations.items()
+            )
+        },
+        indent=JSON_INDENT,
+    )
+    if parsed_arguments.output is None:
+        print(output)
+        return
+    parsed_arguments.output.write_text(output, encoding="utf-8")
+    LOGGER.info(
+        "Wrote %s household asset allocations to %s.",
+        len(household_asset_allocations),
+        parsed_arguments.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+# pylint: disable=too-many-arguments, too-many-instance-attributes
+"""This module contains the shared http session layer used to talk to
+morningstar. It pools keep-alive connections per host, paces requests with an
+adaptive rate limiter, stops calling failing hosts with a circuit breaker and
+retries throttled or failed requests with exponential backoff."""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Protocol, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS: int = 4
+DEFAULT_POOL_MAXSIZE: int = 16
+DEFAULT_MAX_RETRIES: int = 4
+DEFAULT_BACKOFF_FACTOR: float = 0.5
+DEFAULT_MAX_BACKOFF: float = 30.0
+DEFAULT_REQUEST_TIME_OUT: int = 60
+RETRY_STATUS_CODES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+RETRY_AFTER_HEADER_NAME: str = "Retry-After"
+HTTP_SCHEMES: Tuple[str, ...] = ("https://", "http://")
+THROTTLED_STATUS_CODES: FrozenSet[int] = frozenset({429, 503})
+DEFAULT_RATE_PER_SECOND: float = 5.0
+DEFAULT_MIN_RATE_PER_SECOND: float = 0.5
+DEFAULT_MAX_RATE_PER_SECOND: float = 20.0
+DEFAULT_RATE_INCREASE_PER_SECOND: float = 0.5
+DEFAULT_BURST_SIZE: float = 5.0
+DEFAULT_MAX_CONCURRENCY: int = 16
+DEFAULT_MIN_CONCURRENCY: int = 1
+DEFAULT_THROTTLED_DECREASE_FACTOR: float = 0.5
+DEFAULT_SLOW_DECREASE_FACTOR: float = 0.8
+DEFAULT_SLOW_RESPONSE_SECONDS: float = 5.0
+DEFAULT_FAILURE_THRESHOLD: int = 5
+DEFAULT_RESET_TIMEOUT_SECONDS: float = 30.0
+
+LOGGER = logging.getLogger(__name__)
+
+_REQUEST_DEADLINE = threading.local()
+
+
+class HttpClient(Protocol):
+    """The interface of the shared http client, a PooledHttpClient or a layer on
+    top of one."""
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = DEFAULT_REQUEST_TIME_OUT,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Sends a GET request."""
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the circuit of a host is open."""
+
+
+class DeadlineExceededError(requests.Timeout):
+    """Raised when the request deadline of the current thread has passed."""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Limits the total time every request sent from the current thread may take,
+    including rate limiting, retries and backoff. Nested deadlines can only make
+    the deadline earlier.
+    Args:
+        seconds (Optional[float]): the time budget in seconds, None for no limit.
+    """
+    previous_deadline = getattr(_REQUEST_DEADLINE, "deadline", None)
+    deadline = previous_deadline
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        if previous_deadline is not None:
+            deadline = min(deadline, previous_deadline)
+    _REQUEST_DEADLINE.deadline = deadline
+    try:
+        yield
+    finally:
+        _REQUEST_DEADLINE.deadline = previous_deadline
+
+
+def remaining_request_time() -> Optional[float]:
+    """
+    Returns:
+        the seconds left before the request deadline of the current thread, None if
+        there is no deadline.
+    """
+    deadline = getattr(_REQUEST_DEADLINE, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    A thread safe circuit breaker for one host. After failure_threshold failures
+    in a row the circuit opens and requests fail right away. Once
+    reset_timeout_seconds have passed, a single trial request is let through and
+    its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout_seconds: float = DEFAULT_RESET_TIMEOUT_SECONDS,
+    ) -> None:
+        """
+        Args:
+            failure_threshold (int): the failures in a row that open the circuit.
+            reset_timeout_seconds (float): how long the circuit stays open before
+            a trial request is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Returns:
+            true if requests are currently rejected else false.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._trial_in_flight:
+                return True
+            return time.monotonic() - self._opened_at < self.reset_timeout_seconds
+
+    def before_request(self, host: str) -> None:
+        """
+        Checks if a request may be sent.
+        Args:
+            host (str): the host of the request, used in the error message.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            cooling_down = (
+                time.monotonic() - self._opened_at < self.reset_timeout_seconds
+            )
+            if cooling_down or self._trial_in_flight:
+                raise CircuitOpenError(f"The circuit for {host} is open.")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        """Closes the circuit after a successful request."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """
+        Gives back the trial slot of a request that was never sent, without
+        counting it as a success or a failure.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Counts a failed request and opens the circuit when needed."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class AdaptiveRateLimiter:
+    """
+    A thread safe token bucket shared by every request. Besides the request rate,
+    it also limits the number of requests in flight. Both limits are halved when
+    a request is throttled, reduced a little when responses get slow and grow
+    back additively while responses are healthy.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        min_rate_per_second: float = DEFAULT_MIN_RATE_PER_SECOND,
+        max_rate_per_second: float = DEFAULT_MAX_RATE_PER_SECOND,
+        rate_increase_per_second: float = DEFAULT_RATE_INCREASE_PER_SECOND,
+        burst_size: float = DEFAULT_BURST_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        slow_response_seconds: float = DEFAULT_SLOW_RESPONSE_SECONDS,
+    ) -> None:
+        """
+        Args:
+            rate_per_second (float): the starting request rate.
+            min_rate_per_second (float): the lowest rate the limiter backs off to.
+            max_rate_per_second (float): the highest rate the limiter ramps up to.
+            rate_increase_per_second (float): how much the rate grows after every
+            healthy response.
+            burst_size (float): the maximum number of tokens saved up while idle.
+            max_concurrency (int): the highest number of requests in flight.
+            min_concurrency (int): the lowest number of requests in flight the
+            limiter backs off to.
+            slow_response_seconds (float): responses slower than this are treated
+            as a sign of an overloaded server.
+        """
+        self.rate_per_second = rate_per_second
+        self.min_rate_per_second = min_rate_per_second
+        self.max_rate_per_second = max_rate_per_second
+        self.rate_increase_per_second = rate_increase_per_second
+        self.burst_size = burst_size
+        self.concurrency = max_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.slow_response_seconds = slow_response_seconds
+        self._tokens = burst_size
+        self._in_flight = 0
+        self._healthy_streak = 0
+        self._last_refill = time.monotonic()
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until a request may be sent.
+        Args:
+            timeout (Optional[float]): the maximum number of seconds to wait, None
+            waits as long as needed.
+
+        Returns:
+            true if the request may be sent, false if the timeout passed first.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._refill()
+                if self._in_flight < self.concurrency and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    return True
+                wait_seconds = None
+                if self._in_flight < self.concurrency:
+                    wait_seconds = (1 - self._tokens) / self.rate_per_second
+                if give_up_at is not None:
+                    seconds_left = give_up_at - time.monotonic()
+                    if seconds_left <= 0:
+                        return False
+                    wait_seconds = min(wait_seconds or seconds_left, seconds_left)
+                self._condition.wait(timeout=wait_seconds)
+
+    def release(self, status_code: Optional[int], elapsed_seconds: float) -> None:
+        """
+        Frees the slot of a finished request and adapts the limits to it.
+        Args:
+            status_code (Optional[int]): the response status code, None if the
+            request failed without a response.
+            elapsed_seconds (float): how long the request took.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if status_code in THROTTLED_STATUS_CODES:
+                self._decrease(factor=DEFAULT_THROTTLED_DECREASE_FACTOR)
+            elif status_code is None or elapsed_seconds > self.slow_response_seconds:
+                self._decrease(factor=DEFAULT_SLOW_DECREASE_FACTOR)
+            else:
+                self._increase()
+            self._condition.notify_all()
+
+    def _refill(self) -> None:
+        """Adds the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst_size,
+            self._tokens + (now - self._last_refill) * self.rate_per_second,
+        )
+        self._last_refill = now
+
+    def _decrease(self, factor: float) -> None:
+        """
+        Multiplicatively lowers the rate and the concurrency.
+        Args:
+            factor (float): the fraction of the limits to keep.
+        """
+        self._refill()
+        self._healthy_streak = 0
+        self.rate_per_second = max(
+            self.min_rate_per_second, self.rate_per_second * factor
+        )
+        self.concurrency = max(self.min_concurrency, int(self.concurrency * factor))
+        self._tokens = min(self._tokens, 1.0)
+
+    def _increase(self) -> None:
+        """
+        Additively raises the rate, and raises the concurrency by one after as many
+        healthy responses in a row as requests are allowed in flight.
+        """
+        self._refill()
+        self.rate_per_second = min(
+            self.max_rate_per_second,
+            self.rate_per_second + self.rate_increase_per_second,
+        )
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.concurrency:
+            self._healthy_streak = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+
+class PooledHttpClient:
+    """
+    A thread safe http client that reuses one requests session, so every host
+    keeps a pool of keep-alive connections, and retries requests that failed to
+    connect or were answered with a retryable status code.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout_seconds: float = DEFAULT_RESET_TIMEOUT_SECONDS,
+    ) -> None:
+        """
+        Args:
+            pool_connections (int): the number of hosts to keep connection pools for.
+            pool_maxsize (int): the maximum number of connections kept per host.
+            max_retries (int): how many times a failed request is retried.
+            backoff_factor (float): the delay in seconds before the first retry. The
+            delay doubles with every retry.
+            max_backoff (float): the maximum delay in seconds between two retries.
+            rate_limiter (Optional[AdaptiveRateLimiter]): the rate limiter every
+            attempt goes through. A new one is created when it is not provided.
+            failure_threshold (int): the failures in a row that open the circuit
+            of a host.
+            reset_timeout_seconds (float): how long the circuit of a host stays
+            open before a trial request is allowed.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Lazily creates the shared requests session.
+        Returns:
+            a requests session with pooled http adapters mounted.
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                for scheme in HTTP_SCHEMES:
+                    self._session.mount(
+                        scheme,
+                        HTTPAdapter(
+                            pool_connections=self.pool_connections,
+                            pool_maxsize=self.pool_maxsize,
+                        ),
+                    )
+            return self._session
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = DEFAULT_REQUEST_TIME_OUT,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Sends a GET request through the shared session with retries. The request
+        deadline of the current thread caps the timeout of every attempt and stops
+        retrying once the backoff would pass it.
+        Args:
+            url (str): the url to request.
+            headers (Optional[Dict[str, str]]): extra request headers.
+            timeout (float): the request timeout in seconds for every attempt.
+            **kwargs (Any): other keyword arguments for requests.Session.get.
+
+        Returns:
+            the response of the last attempt. A response with a retryable status
+            code is returned once all retries are used up.
+        """
+        host = urlsplit(url).netloc
+        circuit_breaker = self.circuit_breaker(host=host)
+        attempt = 0
+        while True:
+            circuit_breaker.before_request(host=host)
+            try:
+                response = self._rate_limited_get(
+                    url, headers=headers, timeout=timeout, **kwargs
+                )
+            except DeadlineExceededError:
+                circuit_breaker.release_trial()
+                raise
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                circuit_breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                LOGGER.warning("Retrying %s after %s.", url, exc)
+                if not self._sleep_before_retry(attempt=attempt):
+                    raise
+            except requests.RequestException:
+                circuit_breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    circuit_breaker.record_success()
+                    return response
+                circuit_breaker.record_failure()
+                if attempt >= self.max_retries:
+                    return response
+                LOGGER.warning(
+                    "Retrying %s after status code %s.", url, response.status_code
+                )
+                if not self._sleep_before_retry(
+                    attempt=attempt,
+                    retry_after=response.headers.get(RETRY_AFTER_HEADER_NAME),
+                ):
+                    return response
+                response.close()
+            attempt += 1
+
+    def circuit_breaker(self, host: str) -> CircuitBreaker:
+        """
+        Retrieves the circuit breaker of a host.
+        Args:
+            host (str): the host name and port.
+
+        Returns:
+            the circuit breaker shared by every request to the host.
+        """
+        with self._lock:
+            if host not in self._circuit_breakers:
+                self._circuit_breakers[host] = CircuitBreaker(
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout_seconds=self.reset_timeout_seconds,
+                )
+            return self._circuit_breakers[host]
+
+    def _rate_limited_get(
+        self, url: str, timeout: float, **kwargs: Any
+    ) -> requests.Response:
+        """
+        Sends one GET attempt once the rate limiter allows it and reports the
+        outcome back to the rate limiter.
+        Args:
+            url (str): the url to request.
+            timeout (float): the request timeout in seconds.
+            **kwargs (Any): keyword arguments for requests.Session.get.
+
+        Returns:
+            the response of the attempt.
+        """
+        seconds_left = remaining_request_time()
+        if seconds_left is not None:
+            if seconds_left <= 0 or not self.rate_limiter.acquire(timeout=seconds_left):
+                raise DeadlineExceededError(f"The deadline for {url} has passed.")
+            timeout = min(timeout, max(remaining_request_time() or 0.0, 0.001))
+        else:
+            self.rate_limiter.acquire()
+        status_code = None
+        start_time = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=timeout, **kwargs)
+            status_code = response.status_code
+            return response
+        finally:
+            self.rate_limiter.release(
+                status_code=status_code,
+                elapsed_seconds=time.monotonic() - start_time,
+            )
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _sleep_before_retry(
+        self, attempt: int, retry_after: Optional[str] = None
+    ) -> bool:
+        """
+        Waits before the next retry. The delay grows exponentially with a small
+        random jitter, unless the server asked for a specific delay.
+        Args:
+            attempt (int): the number of the failed attempt, the first one is 0.
+            retry_after (Optional[str]): the Retry-After header of the response.
+
+        Returns:
+            true if it waited, false if the delay would pass the request deadline.
+        """
+        if retry_after is not None and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.backoff_factor * 2**attempt + random.uniform(
+                0, self.backoff_factor
+            )
+        delay = min(delay, self.max_backoff)
+        seconds_left = remaining_request_time()
+        if seconds_left is not None and delay >= seconds_left:
+            return False
+        time.sleep(delay)
+        return True
+
+
+HTTP_CLIENT: HttpClient = PooledHttpClient()
+
+
+def configure_http_client(**client_settings: Any) -> PooledHttpClient:
+    """
+    Replaces the shared http client with one using the given settings.
+    Args:
+        **client_settings (Any): keyword arguments for PooledHttpClient.
+
+    Returns:
+        the new shared http client.
+    """
+    global HTTP_CLIENT  # pylint: disable=global-statement
+    HTTP_CLIENT.close()
+    http_client = PooledHttpClient(**client_settings)
+    HTTP_CLIENT = http_client
+    return http_client
@@ -0,0 +1,139 @@
+"""This module contains the on disk caches used by the morningstar scraper so
+warm runs can skip network calls for information that rarely changes."""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_VALUE_KEY: str = "value"
+CACHE_STORED_AT_KEY: str = "stored_at"
+CACHE_FILE_ENCODING: str = "utf-8"
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JsonFileCache:
+    """
+    A thread safe key value cache persisted as a JSON index on disk. Entries
+    older than ttl_seconds are treated as missing, and the least recently used
+    entries are evicted once the cache holds more than max_entries.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            file_path (Path): the JSON file that stores the cache entries.
+            ttl_seconds (Optional[float]): how long an entry stays valid. None keeps
+            entries forever.
+            max_entries (Optional[int]): the maximum number of entries kept. None
+            keeps every entry.
+        """
+        self.file_path = file_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieves a cached value.
+        Args:
+            key (str): the cache key.
+
+        Returns:
+            the cached value or None if it is missing or expired.
+        """
+        value, is_expired = self.get_with_expiry(key=key)
+        return None if is_expired else value
+
+    def get_with_expiry(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Retrieves a cached value even if it is expired, so callers can serve a
+        stale value while a fresh one is fetched.
+        Args:
+            key (str): the cache key.
+
+        Returns:
+            the cached value or None if it is missing, and true if the value is
+            expired else false.
+        """
+        with self._lock:
+            entries = self._load_entries()
+            entry = entries.pop(key, None)
+            if entry is None:
+                return None, False
+            entries[key] = entry
+            return entry[CACHE_VALUE_KEY], self._is_expired(entry=entry)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores a value and persists the cache to disk.
+        Args:
+            key (str): the cache key.
+            value (Any): a JSON serializable value.
+        """
+        with self._lock:
+            entries = self._load_entries()
+            entries.pop(key, None)
+            entries[key] = {
+                CACHE_VALUE_KEY: value,
+                CACHE_STORED_AT_KEY: time.time(),
+            }
+            while self.max_entries is not None and len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+            self._save_entries()
+
+    def clear(self) -> None:
+        """Removes every entry from the cache and from disk."""
+        with self._lock:
+            self._entries = {}
+            self._save_entries()
+
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        """
+        Checks if a cache entry is older than the cache ttl.
+        Args:
+            entry (Dict[str, Any]): a cache entry with value and stored_at time.
+
+        Returns:
+            true if the entry is expired else false.
+        """
+        if self.ttl_seconds is None:
+            return False
+        return time.time() - entry[CACHE_STORED_AT_KEY] > self.ttl_seconds
+
+    def _load_entries(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Lazily reads the cache entries from disk. A missing or corrupted cache
+        file starts an empty cache.
+        Returns:
+            all cache entries.
+        """
+        if self._entries is None:
+            try:
+                with open(self.file_path, "r", encoding=CACHE_FILE_ENCODING) as file:
+                    self._entries = json.load(file)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError):
+                LOGGER.warning("Ignoring unreadable cache file %s.", self.file_path)
+                self._entries = {}
+        return self._entries
+
+    def _save_entries(self) -> None:
+        """Writes the cache entries to disk atomically."""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.file_path.with_suffix(
+            f"{self.file_path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(temporary_path, "w", encoding=CACHE_FILE_ENCODING) as file:
+            json.dump(self._entries, file)
+        os.replace(temporary_path, self.file_path)
@@ -0,0 +1,266 @@
+"""This module contains the record and replay layer for morningstar responses.
+Responses are recorded once into a cassette directory and replayed later, so the
+scraper can run on machines without network access."""
+import base64
+import hashlib
+import json
+import logging
+import os
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from portfolio_allocation import ROOT_DIR, http_session
+from portfolio_allocation.http_session import (
+    DEFAULT_REQUEST_TIME_OUT,
+    HttpClient,
+    PooledHttpClient,
+)
+
+CASSETTE_DIR: Path = ROOT_DIR / "cassettes"
+CASSETTE_MODE_ENVIRONMENT_VARIABLE: str = "PORTFOLIO_ALLOCATION_CASSETTE_MODE"
+CASSETTE_DIR_ENVIRONMENT_VARIABLE: str = "PORTFOLIO_ALLOCATION_CASSETTE_DIR"
+CASSETTE_FILE_SUFFIX: str = ".json"
+CASSETTE_FILE_ENCODING: str = "utf-8"
+RECORDED_HEADER_NAMES: Tuple[str, ...] = ("Content-Type",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CassetteMode(Enum):
+    """
+    This Enum Class ensures the cassette layer can only be turned off, record
+    live responses or replay recorded responses.
+    """
+
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+def cassette_key(url: str) -> str:
+    """
+    Creates the cassette key of a url. Only the path and the query are used, so
+    a recording of the live site can be served from any host.
+    Args:
+        url (str): a full url or a path with an optional query.
+
+    Returns:
+        a sha256 hex digest identifying the request.
+    """
+    split_url = urlsplit(url)
+    request_target = split_url.path
+    if split_url.query:
+        request_target = f"{request_target}?{split_url.query}"
+    return hashlib.sha256(request_target.encode(CASSETTE_FILE_ENCODING)).hexdigest()
+
+
+def cassette_path(url: str, cassette_dir: Path = CASSETTE_DIR) -> Path:
+    """
+    Creates the cassette file path of a url.
+    Args:
+        url (str): a full url or a path with an optional query.
+        cassette_dir (Path): the directory with the recorded cassettes.
+
+    Returns:
+        the cassette file path.
+    """
+    return cassette_dir / f"{cassette_key(url=url)}{CASSETTE_FILE_SUFFIX}"
+
+
+def record_cassette(
+    url: str, response: requests.Response, cassette_dir: Path = CASSETTE_DIR
+) -> Path:
+    """
+    Stores a response as a cassette. Request headers such as the api key are never
+    stored.
+    Args:
+        url (str): the requested url.
+        response (requests.Response): the live response.
+        cassette_dir (Path): the directory with the recorded cassettes.
+
+    Returns:
+        the written cassette file path.
+    """
+    cassette_dir.mkdir(parents=True, exist_ok=True)
+    file_path = cassette_path(url=url, cassette_dir=cassette_dir)
+    cassette = {
+        "url": url,
+        "status_code": response.status_code,
+        "headers": {
+            header_name: response.headers[header_name]
+            for header_name in RECORDED_HEADER_NAMES
+            if header_name in response.headers
+        },
+        "body_base64": base64.b64encode(response.content).decode("ascii"),
+    }
+    with open(file_path, "w", encoding=CASSETTE_FILE_ENCODING) as cassette_file:
+        json.dump(cassette, cassette_file, indent=2)
+    return file_path
+
+
+def load_cassette(
+    url: str, cassette_dir: Path = CASSETTE_DIR
+) -> Optional[Dict[str, Any]]:
+    """
+    Reads the cassette of a url.
+    Args:
+        url (str): a full url or a path with an optional query.
+        cassette_dir (Path): the directory with the recorded cassettes.
+
+    Returns:
+        the cassette with status_code, headers and body_base64, or None if the url
+        was never recorded.
+    """
+    try:
+        with open(
+            cassette_path(url=url, cassette_dir=cassette_dir),
+            "r",
+            encoding=CASSETTE_FILE_ENCODING,
+        ) as cassette_file:
+            return json.load(cassette_file)
+    except FileNotFoundError:
+        return None
+
+
+def cassette_body(cassette: Dict[str, Any]) -> bytes:
+    """
+    Decodes the recorded response body of a cassette.
+    Args:
+        cassette (Dict[str, Any]): a cassette loaded with load_cassette.
+
+    Returns:
+        the recorded response body.
+    """
+    return base64.b64decode(cassette["body_base64"])
+
+
+def cassette_to_response(cassette: Dict[str, Any], url: str) -> requests.Response:
+    """
+    Turns a cassette back into a requests response.
+    Args:
+        cassette (Dict[str, Any]): a cassette loaded with load_cassette.
+        url (str): the requested url.
+
+    Returns:
+        a requests response with the recorded status code, headers and body.
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = cassette["status_code"]
+    response.headers = CaseInsensitiveDict(cassette["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = cassette_body(  # pylint: disable=protected-access
+        cassette=cassette
+    )
+    return response
+
+
+class CassetteHttpClient:
+    """
+    An http client with the same get interface as PooledHttpClient that records
+    live responses into cassettes or replays recorded cassettes without any
+    network access.
+    """
+
+    def __init__(
+        self,
+        mode: CassetteMode,
+        cassette_dir: Path = CASSETTE_DIR,
+        http_client: Optional[HttpClient] = None,
+    ) -> None:
+        """
+        Args:
+            mode (CassetteMode): record or replay.
+            cassette_dir (Path): the directory with the recorded cassettes.
+            http_client (Optional[HttpClient]): the client used for live
+            requests in record mode.
+        """
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.http_client: HttpClient = http_client or PooledHttpClient()
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = DEFAULT_REQUEST_TIME_OUT,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Records or replays a GET request. Only successful live responses are
+        recorded, so a throttled or failed request is retried live next time
+        instead of being replayed.
+        Args:
+            url (str): the url to request.
+            headers (Optional[Dict[str, str]]): extra request headers, only sent
+            in record mode.
+            timeout (float): the request timeout in seconds in record mode.
+            **kwargs (Any): other keyword arguments for the live request.
+
+        Returns:
+            the live response in record mode and the recorded response in replay
+            mode.
+        """
+        if self.mode is CassetteMode.REPLAY:
+            cassette = load_cassette(url=url, cassette_dir=self.cassette_dir)
+            if cassette is None:
+                raise requests.ConnectionError(f"No cassette recorded for {url}.")
+            return cassette_to_response(cassette=cassette, url=url)
+        response = self.http_client.get(url, headers=headers, timeout=timeout, **kwargs)
+        if response.ok:
+            record_cassette(url=url, response=response, cassette_dir=self.cassette_dir)
+        return response
+
+    def close(self) -> None:
+        """Closes the live http client."""
+        self.http_client.close()
+
+
+def use_cassettes(
+    mode: Union[CassetteMode, str], cassette_dir: Path = CASSETTE_DIR
+) -> HttpClient:
+    """
+    Installs the cassette layer as the shared http client.
+    Args:
+        mode (Union[CassetteMode, str]): off, record or replay.
+        cassette_dir (Path): the directory with the recorded cassettes.
+
+    Returns:
+        the shared http client.
+    """
+    mode = CassetteMode(mode)
+    live_http_client = http_session.HTTP_CLIENT
+    if isinstance(live_http_client, CassetteHttpClient):
+        live_http_client = live_http_client.http_client
+    if mode is CassetteMode.OFF:
+        http_session.HTTP_CLIENT = live_http_client
+    else:
+        LOGGER.info("Using %s cassettes from %s.", mode.value, cassette_dir)
+        http_session.HTTP_CLIENT = CassetteHttpClient(
+            mode=mode,
+            cassette_dir=cassette_dir,
+            http_client=live_http_client,
+        )
+    return http_session.HTTP_CLIENT
+
+
+def use_cassettes_from_environment() -> HttpClient:
+    """
+    Installs the cassette layer configured by the
+    PORTFOLIO_ALLOCATION_CASSETTE_MODE and PORTFOLIO_ALLOCATION_CASSETTE_DIR
+    environment variables.
+    Returns:
+        the shared http client.
+    """
+    return use_cassettes(
+        mode=os.environ.get(CASSETTE_MODE_ENVIRONMENT_VARIABLE, CassetteMode.OFF.value),
+        cassette_dir=Path(
+            os.environ.get(CASSETTE_DIR_ENVIRONMENT_VARIABLE, str(CASSETTE_DIR))
+        ),
+    )
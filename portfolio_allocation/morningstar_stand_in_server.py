@@ -0,0 +1,184 @@
+# pylint: disable=too-many-arguments
+"""This module contains a local http server that stands in for morningstar by
+serving recorded cassettes, with configurable injected latency and error rates.
+Point MORNINGSTAR_FRONT_URL and MORNINGSTAR_API_FRONT_URL at it to benchmark the
+scraper reproducibly without network access:
+
+    python -m portfolio_allocation.morningstar_stand_in_server --port 8765
+    MORNINGSTAR_FRONT_URL=http://127.0.0.1:8765 \\
+    MORNINGSTAR_API_FRONT_URL=http://127.0.0.1:8765/sal-service/v1 python main.py
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from portfolio_allocation.morningstar_cassette import (
+    CASSETTE_DIR,
+    cassette_body,
+    load_cassette,
+)
+
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8765
+DEFAULT_LATENCY_SECONDS: float = 0.0
+DEFAULT_LATENCY_JITTER_SECONDS: float = 0.0
+DEFAULT_ERROR_RATE: float = 0.0
+DEFAULT_ERROR_STATUS_CODE: int = 503
+MISSING_CASSETTE_STATUS_CODE: int = 404
+DEFAULT_CONTENT_TYPE: str = "application/octet-stream"
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    A threading http server that serves cassettes for any host, injecting latency
+    and errors into the responses.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        cassette_dir: Path = CASSETTE_DIR,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        latency_seconds: float = DEFAULT_LATENCY_SECONDS,
+        latency_jitter_seconds: float = DEFAULT_LATENCY_JITTER_SECONDS,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        error_status_code: int = DEFAULT_ERROR_STATUS_CODE,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            cassette_dir (Path): the directory with the recorded cassettes.
+            host (str): the host name to listen on.
+            port (int): the port to listen on, 0 picks a free port.
+            latency_seconds (float): the delay added before every response.
+            latency_jitter_seconds (float): a random extra delay of up to this many
+            seconds added before every response.
+            error_rate (float): the fraction of requests answered with
+            error_status_code instead of the cassette.
+            error_status_code (int): the status code of injected errors.
+            seed (Optional[int]): the random seed for reproducible jitter and errors.
+        """
+        super().__init__((host, port), StandInRequestHandler)
+        self.cassette_dir = cassette_dir
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+        self.error_status_code = error_status_code
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """
+        Returns:
+            the http url the server listens on.
+        """
+        host = self.server_address[0]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{self.server_port}"
+
+    def draw_response_delay_and_error(self) -> Tuple[float, bool]:
+        """
+        Draws the injected delay and decides if the response is an injected error.
+        Returns:
+            the delay in seconds and true if an error should be returned else false.
+        """
+        with self._random_lock:
+            delay = self.latency_seconds + self._random.uniform(
+                0, self.latency_jitter_seconds
+            )
+            return delay, self._random.random() < self.error_rate
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """This request handler answers GET requests with recorded cassettes."""
+
+    server: StandInServer
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serves the cassette recorded for the request path and query."""
+        delay, inject_error = self.server.draw_response_delay_and_error()
+        time.sleep(delay)
+        if inject_error:
+            self._send(status_code=self.server.error_status_code, body=b"")
+            return
+        cassette = load_cassette(url=self.path, cassette_dir=self.server.cassette_dir)
+        if cassette is None:
+            self._send(status_code=MISSING_CASSETTE_STATUS_CODE, body=b"")
+            return
+        self._send(
+            status_code=cassette["status_code"],
+            body=cassette_body(cassette=cassette),
+            content_type=cassette["headers"].get("Content-Type", DEFAULT_CONTENT_TYPE),
+        )
+
+    def log_message(  # pylint: disable=redefined-builtin
+        self, format: str, *args: object
+    ) -> None:
+        """Sends the access log to the module logger instead of stderr."""
+        LOGGER.debug(format, *args)
+
+    def _send(
+        self, status_code: int, body: bytes, content_type: str = DEFAULT_CONTENT_TYPE
+    ) -> None:
+        """
+        Writes a complete response.
+        Args:
+            status_code (int): the response status code.
+            body (bytes): the response body.
+            content_type (str): the response content type.
+        """
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """
+    Runs the stand in server until it is interrupted.
+    Args:
+        arguments (Optional[List[str]]): command line arguments, defaults to
+        sys.argv.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--cassette-dir", type=Path, default=CASSETTE_DIR)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY_SECONDS)
+    parser.add_argument("--jitter", type=float, default=DEFAULT_LATENCY_JITTER_SECONDS)
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE)
+    parser.add_argument("--error-status", type=int, default=DEFAULT_ERROR_STATUS_CODE)
+    parser.add_argument("--seed", type=int, default=None)
+    parsed_arguments = parser.parse_args(arguments)
+    with StandInServer(
+        cassette_dir=parsed_arguments.cassette_dir,
+        host=parsed_arguments.host,
+        port=parsed_arguments.port,
+        latency_seconds=parsed_arguments.latency,
+        latency_jitter_seconds=parsed_arguments.jitter,
+        error_rate=parsed_arguments.error_rate,
+        error_status_code=parsed_arguments.error_status,
+        seed=parsed_arguments.seed,
+    ) as server:
+        LOGGER.info("Serving %s on %s.", server.cassette_dir, server.base_url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,9 +1,9 @@
 # pylint:disable=no-name-in-module, import-error
 """This module calculates asset_allocation for all accounts with just one
 type fund."""
-from typing import Dict
+from typing import Dict, Tuple
 
-from portfolio_allocation import PORTFOLIO_BREAKDOWN, combine_portfolios
+from portfolio_allocation import ALL_ASSET_CLASSES, Portfolio
 from portfolio_allocation.configuration import (
     NON_BLEND_FUND_ACCOUNT_TO_ASSET_TYPE_MAPPING,
     ALL_CURRENT_NON_BLEND_ACCOUNTS,
@@ -44,6 +44,20 @@ def _estimate_mortgage_asset() -> float:
     return float(current_estimation) - float(principal)
 
 
+def _non_blend_asset_classes() -> Tuple[str, ...]:
+    """
+    Grows ALL_ASSET_CLASSES with the asset types of the current non blend fund
+    accounts that are not on it, so those accounts keep their own asset type.
+    Returns:
+        the asset class axis of the non blend fund accounts.
+    """
+    extra_asset_types = (
+        NON_BLEND_FUND_ACCOUNT_TO_ASSET_TYPE_MAPPING[account_name]
+        for account_name in ALL_CURRENT_NON_BLEND_ACCOUNTS
+    )
+    return tuple(dict.fromkeys((*ALL_ASSET_CLASSES, *extra_asset_types)))
+
+
 def generate_combined_non_blend_fund_asset_allocation() -> Dict[str, float]:
     """
     This function creates the combined asset allocation for all non blend
@@ -51,12 +65,11 @@ def generate_combined_non_blend_fund_asset_allocation() -> Dict[str, float]:
     Returns:
     A dictionary with combined asset allocation for all accounts.
     """
-    curr_portfolio = PORTFOLIO_BREAKDOWN.copy()
+    curr_portfolio = Portfolio(asset_classes=_non_blend_asset_classes())
     for account_name in ALL_CURRENT_NON_BLEND_ACCOUNTS:
-        curr_portfolio = combine_portfolios(
-            portfolio_a=curr_portfolio,
-            portfolio_b=_create_non_blend_fund_asset_allocation(
+        curr_portfolio.add_dict(
+            portfolio=_create_non_blend_fund_asset_allocation(
                 account_name=account_name,
             ),
         )
-    return curr_portfolio
+    return curr_portfolio.to_dict()
@@ -1,14 +1,533 @@
+# pylint: disable=too-many-instance-attributes
 """This module contain all functions that enable parsing a PDF file as a table
-or text."""
+or text. Parsed statements are kept in a per run document cache, so every
+statement is opened and decoded once no matter how many sub accounts use it.
+Fund names can be indexed to the pages and lines they occur on, so a fund is
+found even when its page is not configured or moved. Tables are read by tabula
+in process through jpype, so the JVM is started once
+per run instead of once per table. Extracted text and tables are also kept in an
+on disk extraction cache, so reruns on unchanged statements skip PDF decoding.
+Statements are memory mapped once, and the mapping is shared by the PDF reader
+and the statement hash, so a large statement is neither read nor copied twice."""
 
-from typing import Any, Dict, List
+import mmap
+import os
+import threading
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 import pandas as pd
 import PyPDF2
 import tabula
 from PyPDF2._page import PageObject
 
+from portfolio_allocation.extraction_cache import (
+    ExtractionCache,
+    buffer_sha256,
+    table_parameters_key,
+)
+from portfolio_allocation.fund_name_matcher import FundNameMatcher
 
-def load_pdf_statements(file_path: str) -> List[PageObject]:
+DEFAULT_DOCUMENT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+DocumentKey = Tuple[str, int, int]
+PageSelection = Union[int, AbstractSet[int], range]
+FundLocation = Tuple[int, int]
+TextLine = Tuple[int, int, str]
+
+
+class TableRequest(NamedTuple):
+    """A statement page to read tables from, with its tabula parse options."""
+
+    page_num: int
+    pandas_options: Dict[str, Any]
+    multiple_table_flag: bool
+
+
+def select_page_numbers(page_selection: PageSelection, page_count: int) -> List[int]:
+    """
+    Turns a page selection into the page numbers that exist in a statement.
+    Args:
+        page_selection (PageSelection): a single page, a set of pages or a range
+        of pages, page one is 0.
+        page_count (int): the number of pages in the statement.
+
+    Returns:
+        the selected page numbers in ascending order.
+    """
+    if isinstance(page_selection, int):
+        page_numbers: Sequence[int] = [page_selection]
+    elif isinstance(page_selection, range) and page_selection.step > 0:
+        page_numbers = range(
+            page_selection.start,
+            min(page_selection.stop, page_count),
+            page_selection.step,
+        )
+    else:
+        page_numbers = sorted(page_selection)
+    return [
+        page_number for page_number in page_numbers if 0 <= page_number < page_count
+    ]
+
+
+def iter_text_lines(text: str) -> Iterator[str]:
+    """
+    Lazily splits a text into lines without building a list of all lines.
+    Args:
+        text (str): the text to split.
+
+    Returns:
+        an iterator of the lines, the same lines as text.split("\\n").
+    """
+    line_start = 0
+    while True:
+        line_end = text.find("\n", line_start)
+        if line_end == -1:
+            yield text[line_start:]
+            return
+        yield text[line_start:line_end]
+        line_start = line_end + 1
+
+
+def map_pdf_file(file_path: str) -> mmap.mmap:
+    """
+    Memory maps a statement read only. The file is closed right away, the mapping
+    stays valid until it is garbage collected.
+    Args:
+        file_path (str): statement filepath.
+
+    Returns:
+        the read only memory mapped statement.
+    """
+    with open(file_path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PdfDocument:
+    """
+    A parsed PDF statement. The PDF reader, the extracted text of every page and
+    the parsed tables of every page are created on first use and kept. With an
+    extraction cache, text and tables extracted in an earlier run are reused and
+    the PDF reader is only created when something is missing. The statement is
+    memory mapped on first use, so the PDF reader reads pages straight from the
+    page cache instead of copying the whole file into memory. tabula still reads
+    the statement by path, because tabula-java only opens files.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        pages: Optional[Sequence[PageObject]] = None,
+        file_size: int = 0,
+        extraction_cache: Optional[ExtractionCache] = None,
+    ) -> None:
+        """
+        Args:
+            file_path (str): statement filepath.
+            pages (Optional[Sequence[PageObject]]): already loaded page objects.
+            The statement is read on first use when it is not provided.
+            file_size (int): the statement size in bytes, mapped into memory for
+            the PDF reader.
+            extraction_cache (Optional[ExtractionCache]): the on disk cache of
+            extracted text and tables. None only caches in memory.
+        """
+        self.file_path = file_path
+        self.file_size = file_size
+        self.extraction_cache = extraction_cache
+        self._pages = pages
+        self._mapped_file: Optional[mmap.mmap] = None
+        self._file_digest: Optional[str] = None
+        self._page_count: Optional[int] = None
+        self._page_texts: Dict[int, str] = {}
+        self._tables: Dict[str, List[pd.DataFrame]] = {}
+        self._fund_locations: Dict[str, List[FundLocation]] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def mapped_file(self) -> mmap.mmap:
+        """
+        Returns:
+            the read only memory mapped statement.
+        """
+        with self._lock:
+            if self._mapped_file is None:
+                self._mapped_file = map_pdf_file(file_path=self.file_path)
+            return self._mapped_file
+
+    @property
+    def pages(self) -> Sequence[PageObject]:
+        """
+        Returns:
+            a virtual list of page objects.
+        """
+        with self._lock:
+            if self._pages is None:
+                # mmap implements read, seek and tell, so PdfReader reads the
+                # mapped pages in place instead of a copy of the statement.
+                self._pages = PyPDF2.PdfReader(
+                    stream=cast(IO[bytes], self.mapped_file)
+                ).pages
+            return self._pages
+
+    @property
+    def file_digest(self) -> str:
+        """
+        Returns:
+            the sha256 hex digest of the statement bytes.
+        """
+        with self._lock:
+            if self._file_digest is None:
+                self._file_digest = buffer_sha256(buffer=self.mapped_file)
+            return self._file_digest
+
+    @property
+    def page_count(self) -> int:
+        """
+        Returns:
+            the number of pages in the statement.
+        """
+        with self._lock:
+            if self._page_count is None:
+                cached_page_count = self._get_cached_text(name="page_count")
+                if cached_page_count is None:
+                    self._page_count = len(self.pages)
+                    self._set_cached_text(name="page_count", text=str(self._page_count))
+                else:
+                    self._page_count = int(cached_page_count)
+            return self._page_count
+
+    @property
+    def estimated_bytes(self) -> int:
+        """
+        Returns:
+            a rough estimate of the memory held by the document.
+        """
+        with self._lock:
+            text_bytes = sum(len(page_text) for page_text in self._page_texts.values())
+            table_bytes = sum(
+                int(table.memory_usage(deep=True).sum())
+                for tables in self._tables.values()
+                for table in tables
+            )
+            return self.file_size + text_bytes + table_bytes
+
+    def page_text(self, page_num: int) -> str:
+        """
+        Extracts the text of a page once.
+        Args:
+            page_num (int): the page number, page one is 0.
+
+        Returns:
+            the extracted page text.
+        """
+        with self._lock:
+            if page_num not in self._page_texts:
+                page_text = self._get_cached_text(name=f"page_{page_num}")
+                if page_text is None:
+                    page_text = self.pages[page_num].extract_text()
+                    self._set_cached_text(name=f"page_{page_num}", text=page_text)
+                self._page_texts[page_num] = page_text
+            return self._page_texts[page_num]
+
+    def page_texts(self, page_selection: PageSelection) -> Iterator[Tuple[int, str]]:
+        """
+        Lazily extracts the text of the selected pages only, so the extraction
+        cost follows the selected pages instead of the statement length.
+        Args:
+            page_selection (PageSelection): a single page, a set of pages or a
+            range of pages, page one is 0.
+
+        Returns:
+            an iterator of page number and page text pairs in page order.
+        """
+        for page_num in select_page_numbers(
+            page_selection=page_selection, page_count=self.page_count
+        ):
+            yield page_num, self.page_text(page_num=page_num)
+
+    def text_lines(self, page_selection: PageSelection) -> Iterator[TextLine]:
+        """
+        Lazily streams the lines of the selected pages. A page is only extracted
+        once the lines before it were consumed.
+        Args:
+            page_selection (PageSelection): a single page, a set of pages or a
+            range of pages, page one is 0.
+
+        Returns:
+            an iterator of (page number, line number, line) in page order, line
+            one is 0.
+        """
+        for page_num, page_text in self.page_texts(page_selection=page_selection):
+            for line_num, text_line in enumerate(iter_text_lines(text=page_text)):
+                yield page_num, line_num, text_line
+
+    def fund_locations(
+        self, fund_names: Iterable[str]
+    ) -> Dict[str, List[FundLocation]]:
+        """
+        Looks up where fund names occur through an inverted index. Fund names
+        that were not indexed yet are indexed together in one pass over the text
+        of every page.
+        Args:
+            fund_names (Iterable[str]): the fund names to look up.
+
+        Returns:
+            the (page number, line number) pairs of every fund name, page one and
+            line one are 0.
+        """
+        fund_names = list(dict.fromkeys(fund_names))
+        with self._lock:
+            new_fund_names = [
+                fund_name
+                for fund_name in fund_names
+                if fund_name not in self._fund_locations
+            ]
+            if new_fund_names:
+                fund_locations: Dict[str, List[FundLocation]] = {
+                    fund_name: [] for fund_name in new_fund_names
+                }
+                matcher = FundNameMatcher(fund_names=new_fund_names)
+                for page_num, line_num, text_line in self.text_lines(
+                    page_selection=range(self.page_count)
+                ):
+                    for fund_name in matcher.find_all(text_line=text_line):
+                        fund_locations[fund_name].append((page_num, line_num))
+                self._fund_locations.update(fund_locations)
+            return {
+                fund_name: self._fund_locations[fund_name] for fund_name in fund_names
+            }
+
+    def tables(
+        self,
+        page_num: int,
+        pandas_options: Dict[str, Any],
+        multiple_table_flag: bool,
+    ) -> List[pd.DataFrame]:
+        """
+        Reads in the tables of a page once for every set of parse options.
+        Args:
+            page_num (int): the page number for the tables to parse,
+            page one is 0.
+            pandas_options (Dict[str, Any]): optional argument for the
+            pandas method pd.read_csv.
+            multiple_table_flag (bool): only one table or multiple table in the page.
+
+        Returns:
+            the parsed PDF tables of the page.
+        """
+        table_key = table_parameters_key(
+            page_num=page_num,
+            pandas_options=pandas_options,
+            multiple_table_flag=multiple_table_flag,
+        )
+        with self._lock:
+            if table_key not in self._tables:
+                tables: Optional[List[pd.DataFrame]] = None
+                if self.extraction_cache is not None:
+                    tables = self.extraction_cache.get_tables(
+                        file_digest=self.file_digest, parameters_key=table_key
+                    )
+                if tables is None:
+                    tables = list(
+                        tabula.read_pdf(
+                            input_path=self.file_path,
+                            multiple_tables=multiple_table_flag,
+                            pages=page_num,
+                            pandas_options=pandas_options,
+                        )
+                    )
+                    if self.extraction_cache is not None:
+                        self.extraction_cache.set_tables(
+                            file_digest=self.file_digest,
+                            parameters_key=table_key,
+                            tables=tables,
+                        )
+                self._tables[table_key] = tables
+            return self._tables[table_key]
+
+    def _get_cached_text(self, name: str) -> Optional[str]:
+        """
+        Retrieves text extracted in an earlier run.
+        Args:
+            name (str): the name of the text.
+
+        Returns:
+            the cached text or None if it is missing or there is no extraction
+            cache.
+        """
+        if self.extraction_cache is None:
+            return None
+        return self.extraction_cache.get_text(file_digest=self.file_digest, name=name)
+
+    def _set_cached_text(self, name: str, text: str) -> None:
+        """
+        Stores extracted text for later runs.
+        Args:
+            name (str): the name of the text.
+            text (str): the extracted text.
+        """
+        if self.extraction_cache is not None:
+            self.extraction_cache.set_text(
+                file_digest=self.file_digest, name=name, text=text
+            )
+
+
+class PdfDocumentCache:
+    """
+    A thread safe cache of parsed PDF statements keyed by path, modification time
+    and size, so an edited statement is parsed again. The least recently used
+    documents are evicted once the documents hold more than max_bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_DOCUMENT_CACHE_MAX_BYTES,
+        extraction_cache: Optional[ExtractionCache] = None,
+    ) -> None:
+        """
+        Args:
+            max_bytes (int): the estimated memory the cached documents may hold.
+            The most recently used document is always kept.
+            extraction_cache (Optional[ExtractionCache]): the on disk cache of
+            extracted text and tables shared by all documents.
+        """
+        self.max_bytes = max_bytes
+        self.extraction_cache = extraction_cache
+        self._documents: Dict[DocumentKey, PdfDocument] = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> PdfDocument:
+        """
+        Retrieves the parsed document of a statement.
+        Args:
+            file_path (str): statement filepath.
+
+        Returns:
+            the cached document, or a new uncached document if the statement
+            cannot be found on disk.
+        """
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return PdfDocument(file_path=file_path)
+        document_key = (
+            os.path.abspath(file_path),
+            file_stat.st_mtime_ns,
+            file_stat.st_size,
+        )
+        with self._lock:
+            document = self._documents.pop(document_key, None)
+            if document is None:
+                document = PdfDocument(
+                    file_path=file_path,
+                    file_size=file_stat.st_size,
+                    extraction_cache=self.extraction_cache,
+                )
+            self._documents[document_key] = document
+            self._evict()
+            return document
+
+    def clear(self) -> None:
+        """Removes every cached document."""
+        with self._lock:
+            self._documents = {}
+
+    def _evict(self) -> None:
+        """Evicts the least recently used documents until they fit in max_bytes."""
+        total_bytes = sum(
+            document.estimated_bytes for document in self._documents.values()
+        )
+        while len(self._documents) > 1 and total_bytes > self.max_bytes:
+            total_bytes -= self._documents.pop(
+                next(iter(self._documents))
+            ).estimated_bytes
+
+
+PDF_DOCUMENT_CACHE = PdfDocumentCache(extraction_cache=ExtractionCache())
+
+
+def load_pdf_document(file_path: str) -> PdfDocument:
+    """
+    Reads in a statement through the per run document cache.
+    Args:
+        file_path (str): statement filepath.
+
+    Returns:
+        the parsed statement.
+    """
+    return PDF_DOCUMENT_CACHE.get(file_path=file_path)
+
+
+def load_pdf_page_texts(
+    file_path: str, page_selection: PageSelection
+) -> Iterator[Tuple[int, str]]:
+    """
+    Reads in the text of selected statement pages.
+    Args:
+        file_path (str): statement filepath.
+        page_selection (PageSelection): a single page, a set of pages or a range
+        of pages, page one is 0.
+
+    Returns:
+        an iterator of page number and page text pairs in page order.
+    """
+    return load_pdf_document(file_path=file_path).page_texts(
+        page_selection=page_selection
+    )
+
+
+def find_fund_pages(file_path: str, fund_names: Iterable[str]) -> Set[int]:
+    """
+    Finds the statement pages that mention any of the fund names.
+    Args:
+        file_path (str): statement filepath.
+        fund_names (Iterable[str]): the fund names to look for.
+
+    Returns:
+        the page numbers with at least one fund name, page one is 0.
+    """
+    return {
+        page_num
+        for locations in load_pdf_document(file_path=file_path)
+        .fund_locations(fund_names=fund_names)
+        .values()
+        for page_num, _ in locations
+    }
+
+
+def load_pdf_text_lines(
+    file_path: str, page_selection: PageSelection
+) -> Iterator[TextLine]:
+    """
+    Streams the text lines of selected statement pages.
+    Args:
+        file_path (str): statement filepath.
+        page_selection (PageSelection): a single page, a set of pages or a range
+        of pages, page one is 0.
+
+    Returns:
+        an iterator of (page number, line number, line) in page order, line one
+        is 0.
+    """
+    return load_pdf_document(file_path=file_path).text_lines(
+        page_selection=page_selection
+    )
+
+
+def load_pdf_statements(file_path: str) -> Sequence[PageObject]:
     """
     Reads in statements in pdf formats.
     Args:
@@ -18,8 +537,32 @@ def load_pdf_statements(file_path: str) -> List[PageObject]:
         a virtual list of page objects.
     """
 
-    loaded_pdf = PyPDF2.PdfReader(stream=file_path)
-    return loaded_pdf.pages
+    return load_pdf_document(file_path=file_path).pages
+
+
+def read_pdf_tables(
+    file_path: str, table_requests: Iterable[TableRequest]
+) -> List[List[pd.DataFrame]]:
+    """
+    Reads in the tables of several statement pages. Every distinct page and
+    parse options pair is one tabula call, repeated pairs are read once.
+    Args:
+        file_path (str): statement filepath.
+        table_requests (Iterable[TableRequest]): the pages and parse options to
+        read, can contain duplicates.
+
+    Returns:
+        the parsed PDF tables of every table request, in request order.
+    """
+    loaded_pdf_document = load_pdf_document(file_path=file_path)
+    return [
+        loaded_pdf_document.tables(
+            page_num=table_request.page_num,
+            pandas_options=table_request.pandas_options,
+            multiple_table_flag=table_request.multiple_table_flag,
+        )
+        for table_request in table_requests
+    ]
 
 
 def parse_pdf_tables(
@@ -42,11 +585,16 @@ def parse_pdf_tables(
         multiple_table_flag (bool): only one table or multiple table in the page.
 
     Returns:
-        a pandas dataframe with the parsed PDF table.
+        a pandas dataframe with the parsed PDF table. It is a copy, so the cached
+        table is never changed by the caller.
     """
-    return tabula.read_pdf(
-        input_path=file_path,
-        multiple_tables=multiple_table_flag,
-        pages=page_num,
-        pandas_options=pandas_options,
-    )[table_index_number]
+    return read_pdf_tables(
+        file_path=file_path,
+        table_requests=[
+            TableRequest(
+                page_num=page_num,
+                pandas_options=pandas_options,
+                multiple_table_flag=multiple_table_flag,
+            )
+        ],
+    )[0][table_index_number].copy()
@@ -0,0 +1,416 @@
+"""This module plans the fund level trades that rebalance a household towards
+target asset class percentages. The asset classes already split stocks by region,
+so a target per asset class is a target per asset class and region.
+
+A vectorized screening pass scores thousands of candidate target mixes at once
+with lower bounds on the trades and the remaining deviation every plan needs.
+A linear program then solves the trades with the least dollar turnover for a
+chosen mix exactly, respecting per account constraints such as no selling in
+taxable accounts. The turnover is the traded US dollars, not the number of
+trades."""
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+
+from portfolio_allocation.allocation_engine import (
+    FundHolding,
+    portfolio_from_vector,
+    portfolio_vector,
+    stack_asset_allocations,
+)
+
+TARGET_PERCENTAGE_TOTAL: float = 100.0
+TARGET_PERCENTAGE_TOLERANCE: float = 1e-6
+LP_METHOD: str = "highs"
+TRACKING_ERROR_TOLERANCE: float = 1e-9
+MIN_TRADE_AMOUNT: float = 0.005
+CENTS_PER_DOLLAR: float = 100.0
+
+Bound = Tuple[float, Optional[float]]
+
+
+class AccountConstraint(NamedTuple):
+    """
+    The trading rules of an account. The trades of an account add up to its cash
+    flow, so money never moves between accounts.
+    """
+
+    allow_sell: bool = True
+    cash_flow: float = 0.0
+
+
+class Trade(NamedTuple):
+    """A fund trade in US dollars, positive amounts buy and negative amounts sell."""
+
+    account: str
+    fund_name: str
+    amount: float
+
+
+class RebalancePlan(NamedTuple):
+    """The trades of a rebalance and the portfolio they lead to."""
+
+    trades: List[Trade]
+    portfolio: Dict[str, float]
+    tracking_error: float
+    turnover: float
+
+
+class LinearProgram(NamedTuple):
+    """The <= constraints, == constraints and variable bounds of a linear program."""
+
+    upper_bound_matrix: np.ndarray
+    upper_bound_vector: np.ndarray
+    equality_matrix: np.ndarray
+    equality_vector: np.ndarray
+    bounds: List[Bound]
+
+
+class TargetScreen(NamedTuple):
+    """
+    Lower bounds for every screened target mix: the US dollars a plan has to
+    trade to reach the target, so the turnover plus the tracking error of any plan
+    is at least min_turnover, and the US dollars of deviation from the target no
+    plan can avoid because of accounts that cannot sell.
+    """
+
+    min_turnover: np.ndarray
+    min_tracking_error: np.ndarray
+
+
+def load_target_percentages(file_path: Path) -> Dict[str, float]:
+    """
+    Loads target asset class percentages from a JSON file.
+    Args:
+        file_path (Path): the JSON file with the target percentage of every
+        asset class, e.g. {"us_stock": 60, "fixed_income": 40}.
+
+    Returns:
+        the target percentage of every asset class.
+    """
+    with open(file_path, encoding="utf-8") as file:
+        return {
+            asset_class: float(target_percentage)
+            for asset_class, target_percentage in json.load(file).items()
+        }
+
+
+def target_vector(target_percentages: Dict[str, float]) -> np.ndarray:
+    """
+    Converts target percentages into fractions along ASSET_CLASSES.
+    Args:
+        target_percentages (Dict[str, float]): the target percentage of every
+        asset class, missing asset classes are 0.
+
+    Returns:
+        the target fraction of every asset class.
+
+    Raises:
+        ValueError: the percentages do not add up to 100 or an asset class is
+        unknown.
+    """
+    target = portfolio_vector(portfolio=target_percentages)
+    if abs(target.sum() - TARGET_PERCENTAGE_TOTAL) > TARGET_PERCENTAGE_TOLERANCE:
+        raise ValueError(f"Target percentages add up to {target.sum()}, not 100.")
+    return target / TARGET_PERCENTAGE_TOTAL
+
+
+def screen_target_mixes(
+    holdings: Sequence[FundHolding],
+    target_mixes: np.ndarray,
+    account_constraints: Optional[Dict[str, AccountConstraint]] = None,
+) -> TargetScreen:
+    """
+    Scores many candidate target mixes at once without solving a linear program
+    per mix. Every dollar bought adds one dollar of asset class exposure and every
+    dollar sold removes one, so the exposure gap to a target bounds the turnover
+    of reaching it from below. Exposure can only be removed by selling, so a gap
+    larger than the exposure held in sellable accounts is deviation no plan can
+    avoid.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        target_mixes (np.ndarray): one row of target percentages along
+        ASSET_CLASSES per candidate mix.
+        account_constraints (Optional[Dict[str, AccountConstraint]]): the trading
+        rules by account name, accounts without an entry can buy and sell.
+
+    Returns:
+        the turnover and tracking error lower bounds of every candidate mix.
+    """
+    account_constraints = account_constraints or {}
+    fund_values, fund_allocations = _holding_arrays(holdings=holdings)
+    sellable = np.array(
+        [
+            account_constraints.get(holding.account, AccountConstraint()).allow_sell
+            for holding in holdings
+        ],
+        dtype=bool,
+    )
+    exposure = fund_values @ fund_allocations
+    sellable_exposure = (fund_values * sellable) @ fund_allocations
+    total_value = fund_values.sum() + _total_cash_flow(
+        holdings=holdings, account_constraints=account_constraints
+    )
+    target_exposures = (
+        np.asarray(target_mixes, dtype=float) / TARGET_PERCENTAGE_TOTAL * total_value
+    )
+    exposure_gaps = target_exposures - exposure
+    return TargetScreen(
+        min_turnover=np.abs(exposure_gaps).sum(axis=1),
+        min_tracking_error=np.maximum(-exposure_gaps - sellable_exposure, 0).sum(
+            axis=1
+        ),
+    )
+
+
+def rebalance(
+    holdings: Sequence[FundHolding],
+    target_percentages: Dict[str, float],
+    account_constraints: Optional[Dict[str, AccountConstraint]] = None,
+) -> RebalancePlan:
+    """
+    Solves the fund level trades that bring the household closest to the target.
+    The first linear program minimizes the deviation from the target, the second
+    one minimizes the dollar turnover without giving up that deviation. It does
+    not minimize the number of trades, so equally cheap plans can spread the
+    turnover over more funds. Trade amounts are rounded to cents, keeping the
+    cash flow of every account, and trades below MIN_TRADE_AMOUNT are dropped.
+    Funds can only be bought in accounts that hold them, add a holding with
+    value 0 to allow buying a new fund.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        target_percentages (Dict[str, float]): the target percentage of every
+        asset class.
+        account_constraints (Optional[Dict[str, AccountConstraint]]): the trading
+        rules by account name, accounts without an entry can buy and sell.
+
+    Returns:
+        the trades, the resulting portfolio, its deviation from the target and the
+        traded US dollars.
+
+    Raises:
+        ValueError: the target is invalid or the account cash flows cannot be
+        traded.
+    """
+    account_constraints = account_constraints or {}
+    fund_values, fund_allocations = _holding_arrays(holdings=holdings)
+    fund_count, asset_class_count = fund_allocations.shape
+    target_exposure = target_vector(target_percentages=target_percentages) * (
+        fund_values.sum() + _total_cash_flow(holdings, account_constraints)
+    )
+    program = _build_rebalance_program(
+        holdings=holdings,
+        fund_values=fund_values,
+        fund_allocations=fund_allocations,
+        target_exposure=target_exposure,
+        account_constraints=account_constraints,
+    )
+    tracking_costs = np.concatenate(
+        [np.zeros(2 * fund_count), np.ones(asset_class_count)]
+    )
+    tracking_error = float(
+        _solve_linear_program(program=program, costs=tracking_costs) @ tracking_costs
+    )
+    solution = _solve_linear_program(
+        program=program._replace(
+            upper_bound_matrix=np.vstack([program.upper_bound_matrix, tracking_costs]),
+            upper_bound_vector=np.append(
+                program.upper_bound_vector,
+                tracking_error + TRACKING_ERROR_TOLERANCE * max(1.0, tracking_error),
+            ),
+        ),
+        costs=np.concatenate([np.ones(2 * fund_count), np.zeros(asset_class_count)]),
+    )
+    trade_amounts = _round_trade_amounts(
+        trade_amounts=solution[:fund_count] - solution[fund_count : 2 * fund_count],
+        fund_values=fund_values,
+        holdings=holdings,
+        account_constraints=account_constraints,
+    )
+    exposure = (fund_values + trade_amounts) @ fund_allocations
+    return RebalancePlan(
+        trades=[
+            Trade(
+                account=holding.account,
+                fund_name=holding.fund_name,
+                amount=float(trade_amount),
+            )
+            for holding, trade_amount in zip(holdings, trade_amounts)
+            if trade_amount != 0
+        ],
+        portfolio=portfolio_from_vector(exposure),
+        tracking_error=float(np.abs(exposure - target_exposure).sum()),
+        turnover=float(np.abs(trade_amounts).sum()),
+    )
+
+
+def _build_rebalance_program(
+    holdings: Sequence[FundHolding],
+    fund_values: np.ndarray,
+    fund_allocations: np.ndarray,
+    target_exposure: np.ndarray,
+    account_constraints: Dict[str, AccountConstraint],
+) -> LinearProgram:
+    """
+    Creates the constraints of a rebalance. The variables are the US dollars
+    bought of every holding, the US dollars sold of every holding and the
+    deviation from the target of every asset class.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        fund_values (np.ndarray): the value of every holding.
+        fund_allocations (np.ndarray): the holding by asset class allocation
+        matrix.
+        target_exposure (np.ndarray): the target US dollars of every asset class.
+        account_constraints (Dict[str, AccountConstraint]): the trading rules by
+        account name.
+
+    Returns:
+        the constraints and variable bounds.
+    """
+    asset_class_count = fund_allocations.shape[1]
+    exposure_gap = target_exposure - fund_values @ fund_allocations
+    accounts = list(dict.fromkeys(holding.account for holding in holdings))
+    account_matrix = np.array(
+        [[holding.account == account for holding in holdings] for account in accounts],
+        dtype=float,
+    ).reshape(len(accounts), len(holdings))
+    sell_limits = [
+        value
+        if account_constraints.get(holding.account, AccountConstraint()).allow_sell
+        else 0.0
+        for holding, value in zip(holdings, fund_values)
+    ]
+    return LinearProgram(
+        upper_bound_matrix=np.block(
+            [
+                [fund_allocations.T, -fund_allocations.T, -np.eye(asset_class_count)],
+                [-fund_allocations.T, fund_allocations.T, -np.eye(asset_class_count)],
+            ]
+        ),
+        upper_bound_vector=np.concatenate([exposure_gap, -exposure_gap]),
+        equality_matrix=np.hstack(
+            [
+                account_matrix,
+                -account_matrix,
+                np.zeros((len(accounts), asset_class_count)),
+            ]
+        ),
+        equality_vector=np.array(
+            [
+                account_constraints.get(account, AccountConstraint()).cash_flow
+                for account in accounts
+            ]
+        ),
+        bounds=[
+            *[(0.0, None)] * len(holdings),
+            *[(0.0, sell_limit) for sell_limit in sell_limits],
+            *[(0.0, None)] * asset_class_count,
+        ],
+    )
+
+
+def _round_trade_amounts(
+    trade_amounts: np.ndarray,
+    fund_values: np.ndarray,
+    holdings: Sequence[FundHolding],
+    account_constraints: Dict[str, AccountConstraint],
+) -> np.ndarray:
+    """
+    Rounds the solver trade amounts to cents. Amounts below MIN_TRADE_AMOUNT are
+    solver noise and become 0, and sells never exceed the value held. The
+    rounding residual of every account goes to its largest trade, so the trades
+    of an account still add up to its cash flow in cents.
+    Args:
+        trade_amounts (np.ndarray): the US dollars traded of every holding.
+        fund_values (np.ndarray): the value of every holding.
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        account_constraints (Dict[str, AccountConstraint]): the trading rules by
+        account name.
+
+    Returns:
+        the rounded US dollars traded of every holding.
+    """
+    trade_amounts = np.where(
+        np.abs(trade_amounts) < MIN_TRADE_AMOUNT, 0.0, trade_amounts
+    )
+    trade_cents = np.maximum(
+        np.round(trade_amounts * CENTS_PER_DOLLAR),
+        -np.floor(fund_values * CENTS_PER_DOLLAR),
+    )
+    accounts = np.array([holding.account for holding in holdings])
+    for account in dict.fromkeys(accounts.tolist()):
+        account_rows = np.flatnonzero(accounts == account)
+        cash_flow = account_constraints.get(account, AccountConstraint()).cash_flow
+        residual_cents = np.round(cash_flow * CENTS_PER_DOLLAR)
+        residual_cents -= trade_cents[account_rows].sum()
+        if residual_cents:
+            trade_cents[
+                account_rows[np.argmax(np.abs(trade_cents[account_rows]))]
+            ] += residual_cents
+    return trade_cents / CENTS_PER_DOLLAR
+
+
+def _holding_arrays(holdings: Sequence[FundHolding]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stacks the holdings into arrays.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+
+    Returns:
+        the value of every holding and the holding by asset class allocation
+        matrix.
+    """
+    fund_values = np.array([holding.value for holding in holdings], dtype=float)
+    fund_allocations = stack_asset_allocations(
+        asset_allocations=[holding.asset_allocation for holding in holdings]
+    )
+    return fund_values, fund_allocations
+
+
+def _total_cash_flow(
+    holdings: Sequence[FundHolding], account_constraints: Dict[str, AccountConstraint]
+) -> float:
+    """
+    Adds up the cash flows of the accounts with holdings.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        account_constraints (Dict[str, AccountConstraint]): the trading rules by
+        account name.
+
+    Returns:
+        the US dollars added to the household by the trades.
+    """
+    return sum(
+        account_constraints.get(account, AccountConstraint()).cash_flow
+        for account in dict.fromkeys(holding.account for holding in holdings)
+    )
+
+
+def _solve_linear_program(program: LinearProgram, costs: np.ndarray) -> np.ndarray:
+    """
+    Minimizes a linear program with scipy.
+    Args:
+        program (LinearProgram): the constraints and variable bounds.
+        costs (np.ndarray): the cost of every variable.
+
+    Returns:
+        the optimal variables.
+
+    Raises:
+        ValueError: the linear program has no solution.
+    """
+    result = linprog(
+        c=costs,
+        A_ub=program.upper_bound_matrix,
+        b_ub=program.upper_bound_vector,
+        A_eq=program.equality_matrix,
+        b_eq=program.equality_vector,
+        bounds=program.bounds,
+        method=LP_METHOD,
+    )
+    if not result.success:
+        raise ValueError(f"Cannot rebalance the holdings: {result.message}")
+    return result.x
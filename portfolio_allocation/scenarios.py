@@ -0,0 +1,242 @@
+"""This module evaluates what if scenarios on already computed fund holdings and
+fund asset allocations, such as moving money between funds or a drop of the house
+value. Nothing is fetched or parsed again, every scenario is a set of deltas on
+the holding values, fund asset allocations and asset values, and all scenarios
+are computed in one vectorized pass.
+
+Scenarios can be loaded from a JSON list, holding_deltas is given as a list of
+[account, fund name, delta] entries:
+
+    [{"name": "move to bonds", "holding_deltas": [["401k", "fund_A", -1000.0],
+      ["401k", "fund_B", 1000.0]], "asset_value_scales": {"mortgage": 0.9}}]
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolio_allocation import ALL_ASSET_CLASSES, ASSET_CLASSES, Portfolio
+from portfolio_allocation.allocation_engine import (
+    FundHolding,
+    stack_asset_allocations,
+)
+from portfolio_allocation.combined_asset_allocation import (
+    generate_asset_allocation_tables,
+)
+
+HoldingKey = Tuple[str, str]
+
+
+class Scenario(NamedTuple):
+    """
+    A what if change of the household. holding_deltas change the US dollars held
+    of (account, fund name) holdings, fund_allocations replace the asset
+    allocation of funds by fund name, and asset_value_scales and
+    asset_value_deltas change the total US dollars of asset classes after the
+    funds and other asset values are added up.
+    """
+
+    name: str
+    holding_deltas: Optional[Dict[HoldingKey, float]] = None
+    fund_allocations: Optional[Dict[str, Dict[str, float]]] = None
+    asset_value_scales: Optional[Dict[str, float]] = None
+    asset_value_deltas: Optional[Dict[str, float]] = None
+
+
+class ScenarioResult(NamedTuple):
+    """The asset allocation tables of a scenario."""
+
+    name: str
+    asset_allocation_by_asset_class_table: pd.DataFrame
+    asset_allocation_by_region_and_asset_class_table: pd.DataFrame
+
+
+def load_scenarios(file_path: Path) -> List[Scenario]:
+    """
+    Loads scenarios from a JSON file.
+    Args:
+        file_path (Path): the JSON file with a list of scenarios.
+
+    Returns:
+        the scenarios in file order.
+    """
+    with open(file_path, encoding="utf-8") as file:
+        scenario_entries = json.load(file)
+    return [
+        Scenario(
+            name=scenario_entry["name"],
+            holding_deltas={
+                (account, fund_name): float(holding_delta)
+                for account, fund_name, holding_delta in scenario_entry[
+                    "holding_deltas"
+                ]
+            }
+            if "holding_deltas" in scenario_entry
+            else None,
+            fund_allocations=scenario_entry.get("fund_allocations"),
+            asset_value_scales=scenario_entry.get("asset_value_scales"),
+            asset_value_deltas=scenario_entry.get("asset_value_deltas"),
+        )
+        for scenario_entry in scenario_entries
+    ]
+
+
+def evaluate_scenarios(
+    holdings: Sequence[FundHolding],
+    asset_values: Dict[str, float],
+    scenarios: Sequence[Scenario],
+) -> List[ScenarioResult]:
+    """
+    Evaluates a batch of what if scenarios.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        asset_values (Dict[str, float]): the US dollars of assets that are not
+        fund holdings, such as the non blend fund accounts and the mortgage.
+        Asset types outside of ALL_ASSET_CLASSES keep their own row.
+        scenarios (Sequence[Scenario]): the scenarios to evaluate.
+
+    Returns:
+        the asset allocation tables of every scenario in scenarios order.
+
+    Raises:
+        ValueError: a scenario changes an unknown holding, fund or asset class.
+    """
+    scenario_asset_values = scenario_asset_value_matrix(
+        holdings=holdings, asset_values=asset_values, scenarios=scenarios
+    )
+    return [
+        ScenarioResult(
+            name=scenario.name,
+            asset_allocation_by_asset_class_table=asset_class_table,
+            asset_allocation_by_region_and_asset_class_table=region_table,
+        )
+        for scenario, (asset_class_table, region_table) in zip(
+            scenarios,
+            generate_asset_allocation_tables(
+                asset_values=scenario_asset_values,
+                asset_types=_scenario_asset_classes(asset_values=asset_values),
+            ),
+        )
+    ]
+
+
+def scenario_asset_value_matrix(
+    holdings: Sequence[FundHolding],
+    asset_values: Dict[str, float],
+    scenarios: Sequence[Scenario],
+) -> np.ndarray:
+    """
+    Computes the US dollars of every asset class in every scenario.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        asset_values (Dict[str, float]): the US dollars of assets that are not
+        fund holdings.
+        scenarios (Sequence[Scenario]): the scenarios to evaluate.
+
+    Returns:
+        a scenario by asset class matrix of US dollars, along ALL_ASSET_CLASSES
+        followed by the other asset types of asset_values.
+
+    Raises:
+        ValueError: a scenario changes an unknown holding, fund or asset class.
+    """
+    asset_classes = _scenario_asset_classes(asset_values=asset_values)
+    fund_allocations = stack_asset_allocations(
+        asset_allocations=[holding.asset_allocation for holding in holdings]
+    )
+    holding_values = _scenario_holding_values(holdings=holdings, scenarios=scenarios)
+    fund_exposures = holding_values @ fund_allocations
+    for scenario_index, scenario in enumerate(scenarios):
+        for fund_name, fund_allocation in (scenario.fund_allocations or {}).items():
+            fund_rows = [
+                index
+                for index, holding in enumerate(holdings)
+                if holding.fund_name == fund_name
+            ]
+            if not fund_rows:
+                raise ValueError(f"Unknown fund {fund_name} in {scenario.name}.")
+            replacement_allocation = stack_asset_allocations(
+                asset_allocations=[fund_allocation]
+            )
+            allocation_changes = replacement_allocation - fund_allocations[fund_rows]
+            fund_exposures[scenario_index] += (
+                holding_values[scenario_index, fund_rows] @ allocation_changes
+            )
+    scenario_asset_values = np.zeros((len(scenarios), len(asset_classes)))
+    scenario_asset_values[
+        :, [asset_classes.index(asset_class) for asset_class in ASSET_CLASSES]
+    ] = fund_exposures
+    scenario_asset_values += Portfolio.from_dict(
+        portfolio=asset_values, asset_classes=asset_classes
+    ).values
+    scenario_asset_values *= np.array(
+        [
+            Portfolio.from_dict(
+                portfolio={
+                    **dict.fromkeys(asset_classes, 1.0),
+                    **(scenario.asset_value_scales or {}),
+                },
+                asset_classes=asset_classes,
+            ).values
+            for scenario in scenarios
+        ]
+    ).reshape(len(scenarios), len(asset_classes))
+    scenario_asset_values += np.array(
+        [
+            Portfolio.from_dict(
+                portfolio=scenario.asset_value_deltas or {},
+                asset_classes=asset_classes,
+            ).values
+            for scenario in scenarios
+        ]
+    ).reshape(len(scenarios), len(asset_classes))
+    return scenario_asset_values
+
+
+def _scenario_asset_classes(asset_values: Dict[str, float]) -> Tuple[str, ...]:
+    """
+    Grows ALL_ASSET_CLASSES with the asset types of asset_values that are not on
+    it, such as the asset type of a non blend fund account.
+    Args:
+        asset_values (Dict[str, float]): the US dollars of assets that are not
+        fund holdings.
+
+    Returns:
+        the asset class axis of the scenarios.
+    """
+    return tuple(dict.fromkeys((*ALL_ASSET_CLASSES, *asset_values)))
+
+
+def _scenario_holding_values(
+    holdings: Sequence[FundHolding], scenarios: Sequence[Scenario]
+) -> np.ndarray:
+    """
+    Applies the holding deltas of every scenario to the holding values.
+    Args:
+        holdings (Sequence[FundHolding]): the fund holdings of every account.
+        scenarios (Sequence[Scenario]): the scenarios to evaluate.
+
+    Returns:
+        a scenario by holding matrix of US dollars.
+
+    Raises:
+        ValueError: a scenario changes an unknown holding.
+    """
+    holding_indices = {
+        (holding.account, holding.fund_name): index
+        for index, holding in enumerate(holdings)
+    }
+    holding_values = np.tile(
+        np.array([holding.value for holding in holdings], dtype=float),
+        (len(scenarios), 1),
+    )
+    for scenario_index, scenario in enumerate(scenarios):
+        for holding_key, holding_delta in (scenario.holding_deltas or {}).items():
+            if holding_key not in holding_indices:
+                raise ValueError(f"Unknown holding {holding_key} in {scenario.name}.")
+            holding_values[
+                scenario_index, holding_indices[holding_key]
+            ] += holding_delta
+    return holding_values
@@ -0,0 +1,93 @@
+"""This module tests all functions from module allocation_engine."""
+import numpy as np
+import pytest
+
+from portfolio_allocation import PORTFOLIO_BREAKDOWN, combine_portfolios
+from portfolio_allocation.allocation_engine import (
+    ASSET_CLASSES,
+    allocate_holdings,
+    allocation_matrix,
+    portfolio_from_vector,
+    portfolio_vector,
+    sum_portfolio_vectors,
+    sum_portfolios,
+)
+
+
+def test_allocation_matrix_follows_asset_class_axis() -> None:
+    """Test allocation_matrix ignores unknown and fills missing asset types."""
+    fund_mapping = {
+        "fund_A": {"us_stock": 0.6, "fixed_income": 0.4, "unknown": 1.0},
+        "fund_B": {"cash": 1.0},
+    }
+
+    actual = allocation_matrix(
+        fund_names=["fund_B", "fund_A", "fund_B"], fund_mapping=fund_mapping
+    )
+
+    assert actual.shape == (3, len(ASSET_CLASSES))
+    assert portfolio_from_vector(actual[1]) == {
+        **PORTFOLIO_BREAKDOWN,
+        "us_stock": 0.6,
+        "fixed_income": 0.4,
+    }
+    np.testing.assert_array_equal(actual[0], actual[2])
+
+
+def test_allocate_holdings_matches_per_fund_dictionaries() -> None:
+    """Test allocate_holdings against combining one dictionary per fund."""
+    fund_mapping = {
+        "fund_A": {"us_stock": 0.6, "fixed_income": 0.3, "cash": 0.1},
+        "fund_B": {"international_stock": 0.9, "other": 0.1},
+    }
+    fund_values = {"fund_A": 1000.0, "fund_B": 250.0}
+    expected: dict = {}
+    for fund_name, fund_value in fund_values.items():
+        expected = combine_portfolios(
+            portfolio_a=expected,
+            portfolio_b={
+                asset_type: fund_mapping[fund_name].get(asset_type, 0) * fund_value
+                for asset_type in PORTFOLIO_BREAKDOWN
+            },
+        )
+
+    actual = allocate_holdings(
+        fund_names=list(fund_values),
+        fund_values=list(fund_values.values()),
+        fund_mapping=fund_mapping,
+    )
+
+    assert portfolio_from_vector(actual) == pytest.approx(expected)
+
+
+def test_allocate_holdings_without_funds_is_empty_portfolio() -> None:
+    """Test allocate_holdings with no held funds."""
+    actual = allocate_holdings(fund_names=[], fund_values=[], fund_mapping={})
+
+    assert portfolio_from_vector(actual) == PORTFOLIO_BREAKDOWN
+
+
+def test_portfolio_vector_rejects_unknown_asset_type() -> None:
+    """Test portfolio_vector does not silently drop asset types."""
+    with pytest.raises(ValueError):
+        portfolio_vector(portfolio={"mortgage": 1.0})
+
+
+def test_sum_portfolios_succeeds() -> None:
+    """Test sum_portfolios and sum_portfolio_vectors."""
+    actual = sum_portfolios(
+        portfolios=[{"cash": 1.0, "us_stock": 2.0}, {"cash": 3.0}, {}]
+    )
+
+    assert actual == {**PORTFOLIO_BREAKDOWN, "cash": 4.0, "us_stock": 2.0}
+    assert portfolio_from_vector(sum_portfolio_vectors([])) == PORTFOLIO_BREAKDOWN
+
+
+def test_sum_portfolios_keeps_asset_types_outside_portfolio_breakdown() -> None:
+    """Test sum_portfolios accepts the asset types combine_portfolios accepts."""
+    actual = sum_portfolios(
+        portfolios=iter([{"cash": 1.0, "mortgage": -2.0}, {"mortgage": -3.0}])
+    )
+
+    assert actual == {**PORTFOLIO_BREAKDOWN, "cash": 1.0, "mortgage": -5.0}
+    assert list(actual)[-1] == "mortgage"
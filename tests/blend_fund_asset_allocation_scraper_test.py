@@ -1,16 +1,61 @@
+# pylint: disable = redefined-outer-name
 """This module tests all functions from module blend_fund_asset_allocation scraper."""
 from unittest.mock import call
 
 import pytest
 from requests.exceptions import RequestException
 
+from portfolio_allocation import blend_fund_asset_allocation_scraper, http_session
 from portfolio_allocation.blend_fund_asset_allocation_scraper import (
     _create_api_url_for_asset_allocation,
+    _fetch_security_id,
     _get_asset_allocation,
+    _get_cached_asset_allocation,
     _process_asset_allocation,
+    _resolve_security_id,
+    _stream_security_id,
     blend_fund_asset_allocation_generator,
-    requests,
+    resilient_fund_asset_allocation_generator,
+    unique_fund_asset_allocation_generator,
+    wait_for_background_refreshes,
 )
+from portfolio_allocation.morningstar_cache import JsonFileCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_security_id_cache(tmp_path, monkeypatch) -> JsonFileCache:
+    """Keeps the security id cache of every test inside a temporary folder."""
+    security_id_cache = JsonFileCache(file_path=tmp_path / "security_ids.json")
+    monkeypatch.setattr(
+        blend_fund_asset_allocation_scraper, "SECURITY_ID_CACHE", security_id_cache
+    )
+    return security_id_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_allocation_cache(tmp_path, monkeypatch) -> JsonFileCache:
+    """Keeps the asset allocation cache of every test inside a temporary folder."""
+    allocation_cache = JsonFileCache(
+        file_path=tmp_path / "asset_allocations.json", ttl_seconds=60
+    )
+    monkeypatch.setattr(
+        blend_fund_asset_allocation_scraper, "ALLOCATION_CACHE", allocation_cache
+    )
+    return allocation_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_last_known_allocation_cache(tmp_path, monkeypatch) -> JsonFileCache:
+    """Keeps the last known asset allocation cache inside a temporary folder."""
+    last_known_allocation_cache = JsonFileCache(
+        file_path=tmp_path / "last_known_asset_allocations.json"
+    )
+    monkeypatch.setattr(
+        blend_fund_asset_allocation_scraper,
+        "LAST_KNOWN_ALLOCATION_CACHE",
+        last_known_allocation_cache,
+    )
+    return last_known_allocation_cache
 
 
 def test__create_api_url_for_asset_allocation_succeeds(mocker) -> None:
@@ -27,8 +72,12 @@ def test__create_api_url_for_asset_allocation_succeeds(mocker) -> None:
         "component=sal-components-mip-asset-allocation&version=3.79.0"
     )
     mock_response = mocker.Mock()
-    mock_response.content = content
-    mocker.patch.object(requests, "get", return_value=mock_response)
+    mock_response.encoding = "utf-8"
+    mock_response.iter_content.return_value = [
+        content.encode()[:30],
+        content.encode()[30:],
+    ]
+    mocker.patch.object(http_session.HTTP_CLIENT, "get", return_value=mock_response)
 
     actual = _create_api_url_for_asset_allocation(
         fund_ticker=fund_ticker,
@@ -36,6 +85,141 @@ def test__create_api_url_for_asset_allocation_succeeds(mocker) -> None:
     )
 
     assert actual == expected
+    mock_response.close.assert_called_once()
+
+
+def test_stream_security_id_stops_after_security_id(mocker) -> None:
+    """Test _stream_security_id stops reading once the security id was seen."""
+    consumed_chunks = []
+
+    def iter_content(chunk_size):
+        assert chunk_size > 0
+        for chunk in [b"<html><sal-comp", b'onents security-id="F0"', b">", b"x" * 10]:
+            consumed_chunks.append(chunk)
+            yield chunk
+
+    mock_response = mocker.Mock()
+    mock_response.encoding = None
+    mock_response.iter_content.side_effect = iter_content
+
+    actual = _stream_security_id(response=mock_response)
+
+    assert actual == ("F0", b"")
+    assert len(consumed_chunks) == 3
+
+
+def test_fetch_security_id_falls_back_to_full_parse(mocker) -> None:
+    """Test _fetch_security_id parses the whole page when streaming misses."""
+    page_content = b'<div><sal-components security-id="id"></sal-components></div>'
+    mock_response = mocker.Mock()
+    mocker.patch.object(http_session.HTTP_CLIENT, "get", return_value=mock_response)
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper._stream_security_id",
+        return_value=(None, page_content),
+    )
+
+    actual = _fetch_security_id(fund_ticker="ticker", mid_url="funds/xnas")
+
+    assert actual == "id"
+    mock_response.close.assert_called_once()
+
+
+def test_resolve_security_id_uses_cache(isolated_security_id_cache, mocker) -> None:
+    """Test _resolve_security_id only fetches the security id once."""
+    fetch_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper._fetch_security_id",
+        return_value="id",
+    )
+
+    first = _resolve_security_id(fund_ticker="ticker", mid_url="funds/xnas")
+    second = _resolve_security_id(fund_ticker="ticker", mid_url="funds/xnas")
+
+    assert first == second == "id"
+    fetch_mock.assert_called_once_with(fund_ticker="ticker", mid_url="funds/xnas")
+    assert isolated_security_id_cache.get(key="funds/xnas|ticker") == "id"
+
+
+def test_resolve_security_id_force_refresh_skips_cache(
+    isolated_security_id_cache, mocker
+) -> None:
+    """Test _resolve_security_id refetches the security id on a forced refresh."""
+    isolated_security_id_cache.set(key="funds/xnas|ticker", value="old_id")
+    fetch_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper._fetch_security_id",
+        return_value="new_id",
+    )
+
+    cached = _resolve_security_id(fund_ticker="ticker", mid_url="funds/xnas")
+    refreshed = _resolve_security_id(
+        fund_ticker="ticker", mid_url="funds/xnas", force_refresh=True
+    )
+
+    assert cached == "old_id"
+    assert refreshed == "new_id"
+    fetch_mock.assert_called_once()
+    assert isolated_security_id_cache.get(key="funds/xnas|ticker") == "new_id"
+
+
+def test_get_cached_asset_allocation_fetches_missing_allocation(
+    isolated_allocation_cache, mocker
+) -> None:
+    """Test _get_cached_asset_allocation stores a freshly fetched allocation."""
+    refresh_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_get_asset_allocation",
+        return_value={"AssetAllocCash": {"netAllocation": "100.0"}},
+    )
+
+    first = _get_cached_asset_allocation(security_id="id", mid_url="funds/xnas")
+    second = _get_cached_asset_allocation(security_id="id", mid_url="funds/xnas")
+
+    assert first == second
+    assert first["cash"] == 1.0
+    refresh_mock.assert_called_once()
+    assert isolated_allocation_cache.get(key="id") == first
+
+
+def test_get_cached_asset_allocation_serves_stale_and_revalidates(
+    isolated_allocation_cache, mocker
+) -> None:
+    """Test _get_cached_asset_allocation serves an expired allocation right away."""
+    isolated_allocation_cache.set(key="id", value={"cash": 1.0})
+    mocker.patch.object(isolated_allocation_cache, "ttl_seconds", -1)
+    refresh_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_get_asset_allocation",
+        return_value={"AssetAllocUSEquity": {"netAllocation": "100.0"}},
+    )
+
+    actual = _get_cached_asset_allocation(
+        security_id="id", mid_url="funds/xnas", stale_while_revalidate=True
+    )
+    pending = wait_for_background_refreshes(timeout=5)
+
+    assert actual == {"cash": 1.0}
+    assert not pending
+    refresh_mock.assert_called_once()
+    assert isolated_allocation_cache.get_with_expiry(key="id")[0]["us_stock"] == 1.0
+
+
+def test_get_cached_asset_allocation_without_stale_while_revalidate(
+    isolated_allocation_cache, mocker
+) -> None:
+    """Test _get_cached_asset_allocation refetches an expired allocation inline."""
+    isolated_allocation_cache.set(key="id", value={"cash": 1.0})
+    mocker.patch.object(isolated_allocation_cache, "ttl_seconds", -1)
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_get_asset_allocation",
+        return_value={"AssetAllocUSEquity": {"netAllocation": "100.0"}},
+    )
+
+    actual = _get_cached_asset_allocation(
+        security_id="id", mid_url="funds/xnas", stale_while_revalidate=False
+    )
+
+    assert actual["us_stock"] == 1.0
+    assert actual["cash"] == 0
 
 
 def test_get_asset_allocation_succeeds(mocker) -> None:
@@ -47,7 +231,7 @@ def test_get_asset_allocation_succeeds(mocker) -> None:
 
     mock_response = mocker.Mock()
     mock_response.text = text
-    mocker.patch.object(requests, "get", return_value=mock_response)
+    mocker.patch.object(http_session.HTTP_CLIENT, "get", return_value=mock_response)
 
     actual = _get_asset_allocation(
         morningstar_asset_allocation_url=asset_allocation_url,
@@ -57,11 +241,27 @@ def test_get_asset_allocation_succeeds(mocker) -> None:
     assert actual == expected
 
 
+def test_get_asset_allocation_reads_api_key_from_environment(
+    mocker, monkeypatch
+) -> None:
+    """Test function get_asset_allocation without an api_key."""
+    monkeypatch.setenv("MORNINGSTAR_API_KEY", "environment_key")
+    mock_response = mocker.Mock()
+    mock_response.text = '{"allocationMap": "test"}'
+    get_mock = mocker.patch.object(
+        http_session.HTTP_CLIENT, "get", return_value=mock_response
+    )
+
+    _get_asset_allocation(morningstar_asset_allocation_url="test_url")
+
+    assert get_mock.call_args.kwargs["headers"] == {"apikey": "environment_key"}
+
+
 def test_get_asset_allocation_raises_request_exception(mocker, caplog) -> None:
     """Test function get_asset_allocation."""
     asset_allocation_url = "test_url"
     api_key = "test_key"
-    mocker.patch.object(requests, "get", side_effect=RequestException)
+    mocker.patch.object(http_session.HTTP_CLIENT, "get", side_effect=RequestException)
     expected_log = (
         "Please go to morningstar to retrieve an updated api key "
         "for asset allocation and update default api key."
@@ -102,7 +302,9 @@ def test_process_asset_allocation_succeeds() -> None:
     assert actual == expected
 
 
+@pytest.mark.parametrize("max_workers", [1, 4])
 def test_blend_fund_asset_allocation_generator_succeeds(
+    max_workers,
     mocker,
 ) -> None:
     """Test blend_fund_asset_allocation_generator"""
@@ -119,9 +321,14 @@ def test_blend_fund_asset_allocation_generator_succeeds(
         "AssetAllocUSEquity": {"netAllocation": "50.0"},
         "AssetAllocBond": {"netAllocation": "25.0"},
     }
+    mock_security_id = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_resolve_security_id",
+        side_effect=lambda fund_ticker, mid_url, force_refresh: f"id_{fund_ticker}",
+    )
     mock_url = mocker.patch(
         "portfolio_allocation.blend_fund_asset_allocation_scraper."
-        "_create_api_url_for_asset_allocation",
+        "_build_api_url_for_asset_allocation",
         return_value="output_url",
     )
     mock_mapping = mocker.patch(
@@ -151,14 +358,24 @@ def test_blend_fund_asset_allocation_generator_succeeds(
     actual = blend_fund_asset_allocation_generator(
         fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
         mid_url=mid_url,
+        max_workers=max_workers,
     )
 
     assert actual == expected
+    assert list(actual) == ["A", "B"]
+    mock_security_id.assert_has_calls(
+        [
+            call(fund_ticker="a", mid_url="test_url", force_refresh=False),
+            call(fund_ticker="b", mid_url="test_url", force_refresh=False),
+        ],
+        any_order=True,
+    )
     mock_url.assert_has_calls(
         [
-            call(fund_ticker="a", mid_url="test_url"),
-            call(fund_ticker="b", mid_url="test_url"),
-        ]
+            call(security_id="id_a", mid_url="test_url"),
+            call(security_id="id_b", mid_url="test_url"),
+        ],
+        any_order=True,
     )
     mock_mapping.assert_has_calls(
         [
@@ -166,3 +383,142 @@ def test_blend_fund_asset_allocation_generator_succeeds(
             call(morningstar_asset_allocation_url="output_url"),
         ]
     )
+
+
+def test_blend_fund_asset_allocation_generator_logs_failed_ticker(
+    mocker, caplog
+) -> None:
+    """Test blend_fund_asset_allocation_generator reports the failing ticker."""
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_resolve_security_id",
+        side_effect=RequestException,
+    )
+
+    with pytest.raises(RequestException):
+        blend_fund_asset_allocation_generator(
+            fund_name_to_ticker_mapping={"A": "a", "B": "b"},
+            mid_url="test_url",
+            max_workers=2,
+        )
+    assert "Failed to retrieve asset allocation for ticker a from test_url." in (
+        caplog.text
+    )
+
+
+def test_unique_fund_asset_allocation_generator_fetches_each_fund_once(
+    mocker,
+) -> None:
+    """Test unique_fund_asset_allocation_generator deduplicates funds."""
+    fetch_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_fetch_fund_asset_allocation",
+        side_effect=lambda fund_ticker, **_: {
+            "us_stock": 1.0 if fund_ticker == "a" else 0.0
+        },
+    )
+
+    actual = unique_fund_asset_allocation_generator(
+        fund_keys=[("a", "etfs/arcx"), ("b", "funds/xnas"), ("a", "etfs/arcx")],
+        max_workers=2,
+    )
+
+    assert actual == {
+        ("a", "etfs/arcx"): {"us_stock": 1.0},
+        ("b", "funds/xnas"): {"us_stock": 0.0},
+    }
+    assert fetch_mock.call_count == 2
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_resilient_fund_asset_allocation_generator_falls_back_to_last_known(
+    isolated_last_known_allocation_cache, max_workers, mocker
+) -> None:
+    """Test resilient_fund_asset_allocation_generator degrades failing funds."""
+    isolated_last_known_allocation_cache.set(
+        key="funds/xnas|b", value={"fixed_income": 1.0}
+    )
+
+    def fetch(fund_ticker, **_):
+        if fund_ticker == "a":
+            return {"us_stock": 1.0}
+        raise RequestException
+
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_fetch_fund_asset_allocation",
+        side_effect=fetch,
+    )
+
+    actual = resilient_fund_asset_allocation_generator(
+        fund_keys=[("a", "funds/xnas"), ("b", "funds/xnas"), ("c", "funds/xnas")],
+        max_workers=max_workers,
+    )
+
+    assert actual.fund_asset_allocations == {
+        ("a", "funds/xnas"): {"us_stock": 1.0},
+        ("b", "funds/xnas"): {"fixed_income": 1.0},
+    }
+    assert actual.stale_fund_keys == [("b", "funds/xnas")]
+    assert actual.failed_fund_keys == [("c", "funds/xnas")]
+
+
+def test_fetch_fund_asset_allocation_remembers_fetched_allocation_only(
+    isolated_last_known_allocation_cache, mocker
+) -> None:
+    """Test only a fetched asset allocation is stored as the last known one."""
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_resolve_security_id",
+        return_value="id",
+    )
+    get_asset_allocation_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_get_asset_allocation",
+        return_value={"AssetAllocUSEquity": {"netAllocation": "100.0"}},
+    )
+    set_mock = mocker.spy(isolated_last_known_allocation_cache, "set")
+
+    for _ in range(2):
+        resilient_fund_asset_allocation_generator(
+            fund_keys=[("a", "funds/xnas")], fund_deadline_seconds=1.0
+        )
+
+    get_asset_allocation_mock.assert_called_once()
+    set_mock.assert_called_once()
+    assert isolated_last_known_allocation_cache.get(key="funds/xnas|a")[
+        "us_stock"
+    ] == pytest.approx(1.0)
+
+
+def test_background_refresh_keeps_the_request_deadline(
+    isolated_allocation_cache, isolated_last_known_allocation_cache, mocker
+) -> None:
+    """Test a background refresh runs within the deadline of the fund."""
+    isolated_allocation_cache.set(key="id", value={"cash": 1.0})
+    mocker.patch.object(isolated_allocation_cache, "ttl_seconds", -1)
+    remaining_request_times = []
+
+    def get_asset_allocation(**_):
+        remaining_request_times.append(http_session.remaining_request_time())
+        return {"AssetAllocUSEquity": {"netAllocation": "100.0"}}
+
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation_scraper."
+        "_get_asset_allocation",
+        side_effect=get_asset_allocation,
+    )
+
+    with http_session.request_deadline(seconds=30.0):
+        actual = _get_cached_asset_allocation(
+            security_id="id", mid_url="funds/xnas", last_known_key="funds/xnas|a"
+        )
+    pending = wait_for_background_refreshes(timeout=5)
+
+    assert actual == {"cash": 1.0}
+    assert not pending
+    assert len(remaining_request_times) == 1
+    remaining_request_time = remaining_request_times[0]
+    assert remaining_request_time is not None
+    assert 0 < remaining_request_time <= 30.0
+    assert isolated_last_known_allocation_cache.get(key="funds/xnas|a") is not None
@@ -1,42 +1,41 @@
-# pylint: disable = too-many-locals, duplicate-code
+# pylint: disable = too-many-locals, duplicate-code, too-many-lines
 """This module tests all functions from module blend_fund_asset_allocation."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 import pytest
 
+from portfolio_allocation import blend_fund_asset_allocation
+from portfolio_allocation.allocation_engine import FundHolding, holdings_portfolio
+
+from portfolio_allocation.blend_fund_asset_allocation_scraper import (
+    FundAllocationResult,
+)
+from portfolio_allocation.morningstar_cache import JsonFileCache
+from portfolio_allocation.pdf_parser import PdfDocument, TableRequest
 from portfolio_allocation.blend_fund_asset_allocation import (
-    _relevant_page_filter,
     _process_fund_name_columns,
     _extract_dollar_amount,
+    _extract_dollar_amounts,
     _extract_fund_value_from_text_line,
     _process_blend_fund_texts,
     _process_blend_fund_tables,
-    _create_asset_allocation_from_pdf_tables,
+    _create_fund_holdings_from_pdf_tables,
     _create_blend_fund_asset_allocation,
     _process_all_pdf_table_funds,
     _process_all_text_funds,
+    _plan_unique_funds,
+    _process_blend_accounts,
+    _process_changed_blend_accounts,
+    Household,
+    generate_household_blend_fund_asset_allocations,
+    _get_sub_account_fund_asset_allocation,
     generate_combined_blend_fund_asset_allocation,
 )
 
 
-@pytest.mark.parametrize(
-    "page_num, target_page_num, expected",
-    [
-        (7, 5, False),
-        (7, {4, 5}, False),
-        (6, 6, True),
-        (6, {4, 5, 6}, True),
-    ],
-)
-def test_relevant_page_filter_succeeds(page_num, target_page_num, expected) -> None:
-    """Test relevant_page_filter function."""
-    actual = _relevant_page_filter(
-        page_number=page_num,
-        target_page_num=target_page_num,
-    )
-
-    assert expected == actual
-
-
 @pytest.mark.parametrize(
     "text_line, start_index , end_index, expected",
     [
@@ -76,6 +75,58 @@ def test_extract_dollar_amount_succeeds(asset_amount, chars_to_strip, expected)
     assert expected == actual
 
 
+@pytest.mark.parametrize(
+    "asset_amounts",
+    [
+        pd.Series(
+            ["$100,000", "USD125.00", "(1,000.50)", "-$6.25", "$(7)", ".25", " USD 3 "]
+        ),
+        np.array(
+            ["$100,000", "USD125.00", "(1,000.50)", "-$6.25", "$(7)", ".25", " USD 3 "]
+        ),
+    ],
+)
+def test_extract_dollar_amounts_succeeds(asset_amounts) -> None:
+    """Test _extract_dollar_amounts parses a whole column at once."""
+    actual = _extract_dollar_amounts(asset_amounts=asset_amounts)
+
+    assert actual.dtype == np.float64
+    np.testing.assert_array_equal(
+        actual, [100000.0, 125.0, -1000.5, -6.25, -7.0, 0.25, 3.0]
+    )
+
+
+def test_extract_dollar_amounts_keeps_negative_amounts() -> None:
+    """Test _extract_dollar_amounts with parentheses and trailing signs."""
+    actual = _extract_dollar_amounts(
+        asset_amounts=["(1,234)", "1,234-", "$1,234.50-", "(USD 5.00)", "1,234"]
+    )
+
+    np.testing.assert_array_equal(actual, [-1234.0, -1234.0, -1234.5, -5.0, 1234.0])
+
+
+@pytest.mark.parametrize(
+    "asset_amount",
+    [
+        "12-34",
+        "N/A",
+        "",
+        "$",
+        "(1,234",
+        "1.2.3",
+        "1,234)",
+        "--5",
+        "-(5)",
+        "(5-)",
+        "-$5-",
+    ],
+)
+def test_extract_dollar_amounts_rejects_malformed_amounts(asset_amount) -> None:
+    """Test _extract_dollar_amounts raises instead of returning NaN."""
+    with pytest.raises(ValueError, match="Cannot parse dollar amounts"):
+        _extract_dollar_amounts(asset_amounts=["$1.00", asset_amount])
+
+
 @pytest.mark.parametrize(
     "text_line, index_number , str_filter, expected",
     [
@@ -104,23 +155,204 @@ def test_process_blend_fund_texts_succeeds(
 ) -> None:
     """Test _process_blend_fund_texts"""
     mocker.patch(
-        "portfolio_allocation.blend_fund_asset_allocation.load_pdf_statements",
-        return_value=pdf_statement_pages,
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
     )
     fund_names = ["A", "B", "C", "E", "F"]
     target_page_nums = {1, 2}
     file_path = "test_file_path"
     fund_value_index_number = -1
 
+    actual = holdings_portfolio(
+        holdings=_process_blend_fund_texts(
+            blend_account="401k",
+            file_path=file_path,
+            target_page_num=target_page_nums,
+            blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+            fund_names=fund_names,
+            fund_value_index_number=fund_value_index_number,
+        )
+    )
+
+    assert expected_text_fund_asset_allocation == actual
+
+
+def test_process_blend_fund_texts_matches_funds_in_any_order(
+    pdf_statement_pages,
+    blend_fund_asset_allocation_text_fund,
+    expected_text_fund_asset_allocation,
+    mocker,
+    caplog,
+) -> None:
+    """Test _process_blend_fund_texts does not depend on the fund order."""
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
+    )
+
+    actual = holdings_portfolio(
+        holdings=_process_blend_fund_texts(
+            blend_account="401k",
+            file_path="test_file_path",
+            target_page_num={1, 2},
+            blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+            fund_names=["F", "C", "A", "E", "B", "G"],
+            fund_value_index_number=-1,
+        )
+    )
+
+    assert actual == pytest.approx(expected_text_fund_asset_allocation)
+    assert "Funds ['G'] were not found in test_file_path." in caplog.text
+
+
+@pytest.mark.parametrize("target_page_num", [None, 0, {0, 1}])
+def test_process_blend_fund_texts_finds_pages_through_fund_index(
+    pdf_statement_pages,
+    blend_fund_asset_allocation_text_fund,
+    expected_text_fund_asset_allocation,
+    target_page_num,
+    mocker,
+) -> None:
+    """Test _process_blend_fund_texts without pages or with moved funds."""
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
+    )
+
+    actual = holdings_portfolio(
+        holdings=_process_blend_fund_texts(
+            blend_account="401k",
+            file_path="test_file_path",
+            target_page_num=target_page_num,
+            blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+            fund_names=["A", "B", "C", "E", "F"],
+            fund_value_index_number=-1,
+        )
+    )
+
+    assert actual == pytest.approx(expected_text_fund_asset_allocation)
+
+
+def test_process_blend_fund_texts_stops_once_all_funds_are_found(
+    pdf_statement_pages,
+    blend_fund_asset_allocation_text_fund,
+    mocker,
+) -> None:
+    """Test _process_blend_fund_texts skips the pages after the last fund."""
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
+    )
+
+    actual = holdings_portfolio(
+        holdings=_process_blend_fund_texts(
+            blend_account="401k",
+            file_path="test_file_path",
+            target_page_num=range(0, 3),
+            blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+            fund_names=["A", "B"],
+            fund_value_index_number=-1,
+        )
+    )
+
+    assert actual["us_stock"] == 250.27
+    pdf_statement_pages[2].extract_text.assert_not_called()
+
+
+def test_process_blend_fund_texts_sums_every_lot_of_a_fund_listed_twice(
+    blend_fund_asset_allocation_text_fund, mocker
+) -> None:
+    """Test _process_blend_fund_texts with a fund configured twice."""
+    page = mocker.Mock()
+    page.extract_text.return_value = """
+    fund_A employee_deferral $100.00
+    fund_A employer_match $50.00
+    """
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=[page]),
+    )
+
     actual = _process_blend_fund_texts(
-        file_path=file_path,
-        target_page_num=target_page_nums,
+        blend_account="401k",
+        file_path="test_file_path",
+        target_page_num=0,
         blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
-        fund_names=fund_names,
-        fund_value_index_number=fund_value_index_number,
+        fund_names=["A", "A"],
+        fund_value_index_number=-1,
     )
 
-    assert expected_text_fund_asset_allocation == actual
+    assert actual == [
+        FundHolding(
+            account="401k",
+            fund_name="A",
+            value=150.0,
+            asset_allocation=blend_fund_asset_allocation_text_fund["A"],
+        )
+    ]
+
+
+def test_process_blend_fund_texts_leaves_out_funds_without_asset_allocation(
+    blend_fund_asset_allocation_text_fund, mocker, caplog
+) -> None:
+    """Test _process_blend_fund_texts with a fund whose fetch failed."""
+    page = mocker.Mock()
+    page.extract_text.return_value = "fund_A $100.00\nfund_Z $50.00"
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=[page]),
+    )
+
+    actual = _process_blend_fund_texts(
+        blend_account="401k",
+        file_path="test_file_path",
+        target_page_num=0,
+        blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+        fund_names=["A", "Z"],
+        fund_value_index_number=-1,
+    )
+
+    assert [holding.fund_name for holding in actual] == ["A"]
+    assert "Fund Z of 401k has no asset allocation" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "activity_text, expected_us_stock",
+    [
+        ("Sold fund_C on 03/01\nfund_C sold $1,000.00", 100.0),
+        (
+            "Sold fund_C on 03/01\nfund_C sold $1,000.00\nfund_C info_1 info_2 $40",
+            120.0,
+        ),
+    ],
+)
+def test_process_blend_fund_texts_skips_funds_named_outside_holdings_lines(
+    activity_text, expected_us_stock, blend_fund_asset_allocation_text_fund, mocker
+) -> None:
+    """Test _process_blend_fund_texts only uses discovered holdings lines."""
+    holdings_page = mocker.Mock()
+    holdings_page.extract_text.return_value = "fund_A info_1 info_2 $100.00"
+    activity_page = mocker.Mock()
+    activity_page.extract_text.return_value = activity_text
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(
+            file_path="test_file_path", pages=[holdings_page, activity_page]
+        ),
+    )
+
+    actual = holdings_portfolio(
+        holdings=_process_blend_fund_texts(
+            blend_account="401k",
+            file_path="test_file_path",
+            target_page_num=0,
+            blend_fund_asset_allocation=blend_fund_asset_allocation_text_fund,
+            fund_names=["A", "C"],
+            fund_value_index_number=-1,
+        )
+    )
+
+    assert actual["us_stock"] == pytest.approx(expected_us_stock)
 
 
 def test_process_blend_fund_tables_without_col_parse_function_succeeds(
@@ -198,25 +430,27 @@ def test_process_blend_fund_tables_with_col_parse_function_succeeds(
     pd.testing.assert_series_equal(left=actual, right=blend_fund_table_two_output)
 
 
-def test_create_asset_allocation_from_pdf_tables_succeeds(
+def test_create_fund_holdings_from_pdf_tables_succeeds(
     blend_fund_asset_allocation_table_fund,
     expected_table_fund_asset_allocation,
     blend_fund_table_one_output,
     blend_fund_table_two_output,
 ) -> None:
     """
-    Test create_asset_allocation_from_pdf_tables.
+    Test create_fund_holdings_from_pdf_tables.
     """
     fund_list = [blend_fund_table_one_output, blend_fund_table_two_output]
     vested_pct = 0.8
 
-    actual = _create_asset_allocation_from_pdf_tables(
+    actual = _create_fund_holdings_from_pdf_tables(
+        blend_account="401k",
         blend_fund_asset_allocation=blend_fund_asset_allocation_table_fund,
         fund_list=fund_list,
         vested_pct=vested_pct,
     )
 
-    assert expected_table_fund_asset_allocation == actual
+    assert {holding.account for holding in actual} == {"401k"}
+    assert expected_table_fund_asset_allocation == holdings_portfolio(holdings=actual)
 
 
 @pytest.mark.parametrize(
@@ -291,6 +525,9 @@ def test_process_all_pdf_table_funds_succeeds(
         "portfolio_allocation.blend_fund_asset_allocation._process_blend_fund_tables",
         return_value=blend_fund_table_two_output,
     )
+    read_pdf_tables_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation.read_pdf_tables",
+    )
     expected = {
         "international_stock": 151.2,
         "cash": 86.0,
@@ -300,16 +537,47 @@ def test_process_all_pdf_table_funds_succeeds(
         "other": 0.0,
     }
 
-    actual = _process_all_pdf_table_funds(
-        asset_information=asset_information,
-        fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
-        mid_url=mid_url,
-        file_path=file_path,
-        page_nums=page_nums,
-        fund_name_lists=fund_name_lists,
+    actual = holdings_portfolio(
+        holdings=_process_all_pdf_table_funds(
+            blend_account="401k",
+            asset_information=asset_information,
+            fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
+            mid_url=mid_url,
+            file_path=file_path,
+            page_nums=page_nums,
+            fund_name_lists=fund_name_lists,
+        )
     )
 
     assert actual == expected
+    read_pdf_tables_mock.assert_called_once_with(
+        file_path=file_path,
+        table_requests=[
+            TableRequest(page_num=0, pandas_options={}, multiple_table_flag=False)
+        ],
+    )
+
+
+@pytest.mark.parametrize("page_nums", [None, [0]])
+def test_process_all_pdf_table_funds_requires_a_page_per_sub_account(
+    page_nums, mocker
+) -> None:
+    """Test process_all_pdf_table_funds rejects sub accounts without a page."""
+    read_pdf_tables_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation.read_pdf_tables",
+    )
+
+    with pytest.raises(ValueError, match="needs page_nums"):
+        _process_all_pdf_table_funds(
+            blend_account="401k",
+            asset_information={},
+            fund_name_to_ticker_mapping=[{}, {}],
+            mid_url=["url", "url"],
+            file_path="test_file_path",
+            page_nums=page_nums,
+            fund_name_lists=[["fund_a"], ["fund_b"]],
+        )
+    read_pdf_tables_mock.assert_not_called()
 
 
 def test_process_all_text_funds_without_asset_allocation_field_succeeds(
@@ -334,22 +602,60 @@ def test_process_all_text_funds_without_asset_allocation_field_succeeds(
         return_value=blend_fund_asset_allocation_text_fund,
     )
     mocker.patch(
-        "portfolio_allocation.blend_fund_asset_allocation.load_pdf_statements",
-        return_value=pdf_statement_pages,
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
     )
 
-    actual = _process_all_text_funds(
-        asset_information=asset_information,
-        fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
-        mid_url=mid_url,
-        file_path=file_path,
-        page_nums=page_nums,
-        fund_name_lists=fund_name_lists,
+    actual = holdings_portfolio(
+        holdings=_process_all_text_funds(
+            blend_account="401k",
+            asset_information=asset_information,
+            fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
+            mid_url=mid_url,
+            file_path=file_path,
+            page_nums=page_nums,
+            fund_name_lists=fund_name_lists,
+        )
     )
 
     assert actual == expected_text_fund_asset_allocation
 
 
+def test_process_all_text_funds_finds_pages_of_sub_accounts_without_page(
+    pdf_statement_pages,
+    blend_fund_asset_allocation_text_fund,
+    expected_text_fund_asset_allocation,
+    mocker,
+) -> None:
+    """Test process_all_text_funds with fewer page_nums than sub accounts."""
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation."
+        "blend_fund_asset_allocation_generator",
+        return_value=blend_fund_asset_allocation_text_fund,
+    )
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
+    )
+
+    actual = holdings_portfolio(
+        holdings=_process_all_text_funds(
+            blend_account="401k",
+            asset_information={
+                "fund_value_index_number": [0, 3],
+                "amount_str_filter": ["$", None],
+            },
+            fund_name_to_ticker_mapping=[{"A": "ticker_A"}, {"E": "ticker_E"}],
+            mid_url=["url", "url"],
+            file_path="test_file_path",
+            page_nums=[1],
+            fund_name_lists=[["A", "B", "C"], ["E", "F"]],
+        )
+    )
+
+    assert actual == pytest.approx(expected_text_fund_asset_allocation)
+
+
 def test_process_all_text_funds_with_asset_allocation_field_succeeds(
     pdf_statement_pages,
     expected_text_fund_asset_allocation,
@@ -382,17 +688,20 @@ def test_process_all_text_funds_with_asset_allocation_field_succeeds(
         },
     )
     mocker.patch(
-        "portfolio_allocation.blend_fund_asset_allocation.load_pdf_statements",
-        return_value=pdf_statement_pages,
+        "portfolio_allocation.pdf_parser.load_pdf_document",
+        return_value=PdfDocument(file_path="test_file_path", pages=pdf_statement_pages),
     )
 
-    actual = _process_all_text_funds(
-        asset_information=asset_information,
-        fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
-        mid_url=mid_url,
-        file_path=file_path,
-        page_nums=page_nums,
-        fund_name_lists=fund_name_lists,
+    actual = holdings_portfolio(
+        holdings=_process_all_text_funds(
+            blend_account="401k",
+            asset_information=asset_information,
+            fund_name_to_ticker_mapping=fund_name_to_ticker_mapping,
+            mid_url=mid_url,
+            file_path=file_path,
+            page_nums=page_nums,
+            fund_name_lists=fund_name_lists,
+        )
     )
 
     assert actual == expected_text_fund_asset_allocation
@@ -404,13 +713,22 @@ def test_generate_combined_blend_fund_asset_allocation_succeeds(
     mocker,
 ) -> None:
     """Test generate_combined_blend_fund_asset_allocation."""
+    resilient_fund_generator_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation."
+        "resilient_fund_asset_allocation_generator",
+        return_value=FundAllocationResult({}, [], []),
+    )
     process_all_text_funds_mock = mocker.patch(
         "portfolio_allocation.blend_fund_asset_allocation._process_all_text_funds",
-        return_value=expected_text_fund_asset_allocation,
+        return_value=[
+            FundHolding("text", "fund", 1.0, expected_text_fund_asset_allocation)
+        ],
     )
     process_all_table_funds_mock = mocker.patch(
         "portfolio_allocation.blend_fund_asset_allocation._process_all_pdf_table_funds",
-        return_value=expected_table_fund_asset_allocation,
+        return_value=[
+            FundHolding("table", "fund", 1.0, expected_table_fund_asset_allocation)
+        ],
     )
     expected_output = {
         "cash": 72.8,
@@ -421,13 +739,347 @@ def test_generate_combined_blend_fund_asset_allocation_succeeds(
         "us_stock": 470969.83,
     }
 
-    actual = generate_combined_blend_fund_asset_allocation()
+    blend_fund_allocation = generate_combined_blend_fund_asset_allocation()
+    assert blend_fund_allocation.stale_fund_keys == []
+    assert blend_fund_allocation.failed_fund_keys == []
     actual = {
         asset_class: round(asset_value, 2)
-        for asset_class, asset_value in actual.items()
+        for asset_class, asset_value in blend_fund_allocation.asset_allocation.items()
     }
 
     process_all_table_funds_mock.assert_called_once()
     process_all_text_funds_mock.has_calls()
+    resilient_fund_generator_mock.assert_called_once()
+    assert process_all_table_funds_mock.call_args.kwargs["fund_asset_allocations"] == {}
 
     assert actual == expected_output
+    assert {holding.account for holding in blend_fund_allocation.holdings} == {
+        "text",
+        "table",
+    }
+
+
+def test_generate_combined_blend_fund_asset_allocation_reports_failed_funds(
+    mocker,
+) -> None:
+    """Test generate_combined_blend_fund_asset_allocation with a failed fund."""
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation."
+        "resilient_fund_asset_allocation_generator",
+        return_value=FundAllocationResult({}, [], [("ticker", "funds/xnas")]),
+    )
+    mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation._process_blend_accounts",
+        return_value=[[FundHolding("401k", "A", 1.0, {"cash": 1.0})]],
+    )
+
+    actual = generate_combined_blend_fund_asset_allocation()
+
+    assert actual.asset_allocation["cash"] == 1.0
+    assert actual.stale_fund_keys == []
+    assert actual.failed_fund_keys == [("ticker", "funds/xnas")]
+
+
+def test_get_sub_account_fund_asset_allocation_leaves_out_failed_funds() -> None:
+    """Test _get_sub_account_fund_asset_allocation with a failed fund."""
+    actual = _get_sub_account_fund_asset_allocation(
+        fund_name_to_ticker_mapping={"A": "ticker_a", "B": "ticker_b"},
+        mid_url="funds/xnas",
+        fund_asset_allocations={("ticker_a", "funds/xnas"): {"cash": 1.0}},
+    )
+
+    assert actual == {"A": {"cash": 1.0}}
+
+
+def test_process_blend_accounts_keeps_account_order_in_parallel(mocker) -> None:
+    """Test _process_blend_accounts returns results in account order."""
+    process_pool_mock = mocker.patch.object(
+        blend_fund_asset_allocation,
+        "ProcessPoolExecutor",
+        side_effect=lambda max_workers, mp_context: ThreadPoolExecutor(
+            max_workers=max_workers
+        ),
+    )
+
+    def process_blend_account(blend_account, fund_asset_allocations, **_):
+        time.sleep(0.01 * (3 - int(blend_account)))
+        return [FundHolding(blend_account, "fund", 1.0, fund_asset_allocations)]
+
+    mocker.patch.object(
+        blend_fund_asset_allocation,
+        "_process_blend_account",
+        side_effect=process_blend_account,
+    )
+
+    actual = _process_blend_accounts(
+        blend_accounts=["1", "2", "3"],
+        fund_asset_allocations={},
+        jobs=4,
+        account_mapping={"1": {}, "2": {}, "3": {}},
+    )
+
+    assert [[holding.account for holding in holdings] for holdings in actual] == [
+        ["1"],
+        ["2"],
+        ["3"],
+    ]
+    assert process_pool_mock.call_args.kwargs["max_workers"] == 3
+
+
+def _write_text_pdf(file_path, text_lines) -> None:
+    """Writes a one page PDF statement with one text line per holding."""
+    content = " ".join(f"({text_line}) Tj T*" for text_line in text_lines)
+    content = f"BT /F1 12 Tf 14 TL 72 720 Td {content} ET"
+    pdf_objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        " /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf_bytes = b"%PDF-1.4\n"
+    object_offsets = []
+    for object_num, pdf_object in enumerate(pdf_objects, start=1):
+        object_offsets.append(len(pdf_bytes))
+        pdf_bytes += f"{object_num} 0 obj\n{pdf_object}\nendobj\n".encode()
+    xref_offset = len(pdf_bytes)
+    pdf_bytes += f"xref\n0 {len(pdf_objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf_bytes += "".join(
+        f"{offset:010d} 00000 n \n" for offset in object_offsets
+    ).encode()
+    pdf_bytes += (
+        f"trailer\n<< /Size {len(pdf_objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    file_path.write_bytes(pdf_bytes)
+
+
+def test_process_blend_accounts_parses_statements_in_spawned_processes(
+    tmp_path,
+) -> None:
+    """Test _process_blend_accounts with a real spawn process pool."""
+    account_mapping = {}
+    for blend_account, fund_value in [("401k", "$250.27"), ("ira", "$1,036.28")]:
+        file_path = tmp_path / f"{blend_account}.pdf"
+        _write_text_pdf(
+            file_path=file_path,
+            text_lines=[f"fund_A info_1 info_2 {fund_value}", "fund_B info_1 $5.00"],
+        )
+        account_mapping[blend_account] = {
+            "file_path": str(file_path),
+            "pdf_table_parse": False,
+            "fund_name_to_ticker_mapping": [{"A": "ticker_a"}],
+            "mid_url": ["funds/xnas"],
+            "page_nums": [0],
+            "fund_name_lists": [["A"]],
+            "fund_value_index_number": [-1],
+        }
+
+    actual = _process_blend_accounts(
+        blend_accounts=["401k", "ira"],
+        fund_asset_allocations={("ticker_a", "funds/xnas"): {"us_stock": 1.0}},
+        jobs=2,
+        account_mapping=account_mapping,
+    )
+
+    assert actual == [
+        [FundHolding("401k", "A", 250.27, {"us_stock": 1.0})],
+        [FundHolding("ira", "A", 1036.28, {"us_stock": 1.0})],
+    ]
+
+
+def test_process_changed_blend_accounts_only_recomputes_changed_inputs(
+    tmp_path, mocker
+) -> None:
+    """Test _process_changed_blend_accounts reuses unchanged account results."""
+    account_mapping = {}
+    for blend_account in ["a", "b"]:
+        file_path = tmp_path / f"{blend_account}.pdf"
+        file_path.write_bytes(b"statement")
+        account_mapping[blend_account] = {
+            "file_path": str(file_path),
+            "pdf_table_parse": False,
+            "fund_name_to_ticker_mapping": [{"fund": f"ticker_{blend_account}"}],
+            "mid_url": ["funds/xnas"],
+            "page_nums": [{0, 1}],
+        }
+
+    def process_blend_account(blend_account, **_):
+        return [
+            FundHolding(
+                account=blend_account,
+                fund_name="fund",
+                value=float(process_blend_account_mock.call_count),
+                asset_allocation={"cash": 1.0},
+            )
+        ]
+
+    process_blend_account_mock = mocker.patch.object(
+        blend_fund_asset_allocation,
+        "_process_blend_account",
+        side_effect=process_blend_account,
+    )
+    account_portfolio_cache = JsonFileCache(file_path=tmp_path / "accounts.json")
+    fund_asset_allocations = {
+        ("ticker_a", "funds/xnas"): {"cash": 1.0},
+        ("ticker_b", "funds/xnas"): {"cash": 1.0},
+    }
+
+    def process_changed_blend_accounts():
+        process_blend_account_mock.reset_mock()
+        return [
+            holdings_portfolio(holdings=holdings)["cash"]
+            for holdings in _process_changed_blend_accounts(
+                blend_accounts=["a", "b"],
+                fund_asset_allocations=fund_asset_allocations,
+                account_mapping=account_mapping,
+                account_portfolio_cache=account_portfolio_cache,
+            )
+        ]
+
+    assert process_changed_blend_accounts() == [1.0, 2.0]
+    assert process_changed_blend_accounts() == [1.0, 2.0]
+    process_blend_account_mock.assert_not_called()
+
+    (tmp_path / "b.pdf").write_bytes(b"replaced statement")
+    assert process_changed_blend_accounts() == [1.0, 1.0]
+    assert process_blend_account_mock.call_args.kwargs["blend_account"] == "b"
+
+    fund_asset_allocations[("ticker_a", "funds/xnas")] = {"us_stock": 1.0}
+    assert process_changed_blend_accounts() == [1.0, 1.0]
+    assert process_blend_account_mock.call_args.kwargs["blend_account"] == "a"
+
+    account_mapping["b"]["page_nums"] = [{1}]
+    process_changed_blend_accounts()
+    assert process_blend_account_mock.call_args.kwargs["blend_account"] == "b"
+    assert process_blend_account_mock.call_count == 1
+
+
+def test_generate_household_blend_fund_asset_allocations_shares_funds(
+    mocker,
+) -> None:
+    """Test every shared fund is fetched once for all households."""
+    asset_information = {
+        "pdf_table_parse": False,
+        "fund_name_to_ticker_mapping": [{"fund_A": "ticker_a"}],
+        "mid_url": ["funds/xnas"],
+    }
+    households = [
+        Household(
+            name="lee",
+            blend_accounts=["401k", "ira"],
+            account_mapping={"401k": asset_information, "ira": asset_information},
+        ),
+        Household(
+            name="kim",
+            blend_accounts=["401k"],
+            account_mapping={
+                "401k": dict(
+                    asset_information,
+                    fund_name_to_ticker_mapping=[{"fund_B": "ticker_b"}],
+                )
+            },
+        ),
+    ]
+    resilient_fund_generator_mock = mocker.patch.object(
+        blend_fund_asset_allocation,
+        "resilient_fund_asset_allocation_generator",
+        return_value=FundAllocationResult({}, [("ticker_b", "funds/xnas")], []),
+    )
+    process_blend_account_mock = mocker.patch.object(
+        blend_fund_asset_allocation,
+        "_process_blend_account",
+        side_effect=lambda blend_account, fund_asset_allocations, asset_information: [
+            FundHolding(
+                account=blend_account,
+                fund_name="fund",
+                value=1.0 if blend_account.startswith("lee/") else 5.0,
+                asset_allocation={"cash": 1.0},
+            )
+        ],
+    )
+
+    actual = generate_household_blend_fund_asset_allocations(households=households)
+
+    resilient_fund_generator_mock.assert_called_once_with(
+        fund_keys=[("ticker_a", "funds/xnas"), ("ticker_b", "funds/xnas")]
+    )
+    assert [
+        call.kwargs["blend_account"]
+        for call in process_blend_account_mock.call_args_list
+    ] == ["lee/401k", "lee/ira", "kim/401k"]
+    assert list(actual) == ["lee", "kim"]
+    assert actual["lee"].asset_allocation["cash"] == 2.0
+    assert actual["kim"].asset_allocation["cash"] == 5.0
+    assert [holding.account for holding in actual["lee"].holdings] == ["401k", "ira"]
+    assert actual["lee"].stale_fund_keys == []
+    assert actual["kim"].stale_fund_keys == [("ticker_b", "funds/xnas")]
+    assert actual["kim"].failed_fund_keys == []
+
+
+def test_generate_household_blend_fund_asset_allocations_fails_on_same_name() -> None:
+    """Test households need unique names."""
+    household = Household(name="lee", blend_accounts=[], account_mapping={})
+
+    with pytest.raises(ValueError):
+        generate_household_blend_fund_asset_allocations(
+            households=[household, household]
+        )
+
+
+def test_plan_unique_funds_deduplicates_funds_across_accounts() -> None:
+    """Test _plan_unique_funds."""
+    account_mapping = {
+        "text_account": {
+            "pdf_table_parse": False,
+            "fund_name_to_ticker_mapping": [
+                {"A": "ticker_a", "B": "ticker_b"},
+                {"E": "ticker_e"},
+            ],
+            "mid_url": ["funds/xnas", "funds/xnas"],
+            "non_blend_fund_allocation": {"fund_allocation": {}, "fund_index": 1},
+        },
+        "table_account": {
+            "pdf_table_parse": True,
+            "fund_name_to_ticker_mapping": [{"fund_a": "ticker_a", "C": "ticker_c"}],
+            "mid_url": ["funds/xnas"],
+        },
+        "etf_account": {
+            "pdf_table_parse": False,
+            "fund_name_to_ticker_mapping": [{"A": "ticker_a"}],
+            "mid_url": ["etfs/arcx"],
+        },
+    }
+
+    actual = _plan_unique_funds(
+        blend_accounts=["text_account", "table_account", "etf_account"],
+        account_mapping=account_mapping,
+    )
+
+    assert actual == [
+        ("ticker_a", "funds/xnas"),
+        ("ticker_b", "funds/xnas"),
+        ("ticker_c", "funds/xnas"),
+        ("ticker_a", "etfs/arcx"),
+    ]
+
+
+def test_get_sub_account_fund_asset_allocation_fans_out_fetched_funds(
+    mocker,
+) -> None:
+    """Test _get_sub_account_fund_asset_allocation reuses fetched funds."""
+    generator_mock = mocker.patch(
+        "portfolio_allocation.blend_fund_asset_allocation."
+        "blend_fund_asset_allocation_generator",
+    )
+    fund_asset_allocations = {("ticker_a", "url"): {"us_stock": 1.0}}
+
+    actual = _get_sub_account_fund_asset_allocation(
+        fund_name_to_ticker_mapping={"A": "ticker_a", "A share": "ticker_a"},
+        mid_url="url",
+        fund_asset_allocations=fund_asset_allocations,
+    )
+
+    assert actual == {"A": {"us_stock": 1.0}, "A share": {"us_stock": 1.0}}
+    generator_mock.assert_not_called()
@@ -0,0 +1,165 @@
+"""This module tests all functions from module extraction_cache."""
+import os
+
+import pandas as pd
+
+from portfolio_allocation.extraction_cache import (
+    ExtractionCache,
+    file_sha256,
+    table_parameters_key,
+)
+from portfolio_allocation.pdf_parser import PdfDocument, PyPDF2, tabula
+
+
+def test_file_sha256_changes_with_content(tmp_path) -> None:
+    """Test file_sha256 addresses files by content."""
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"pdf")
+    first_digest = file_sha256(file_path=str(file_path))
+    file_path.write_bytes(b"other pdf")
+
+    assert file_sha256(file_path=str(file_path)) != first_digest
+
+
+def test_table_parameters_key_ignores_option_order() -> None:
+    """Test table_parameters_key."""
+    assert table_parameters_key(
+        page_num=1, pandas_options={"a": 1, "b": 2}, multiple_table_flag=True
+    ) == table_parameters_key(
+        page_num=1, pandas_options={"b": 2, "a": 1}, multiple_table_flag=True
+    )
+    assert table_parameters_key(
+        page_num=1, pandas_options={}, multiple_table_flag=True
+    ) != table_parameters_key(page_num=2, pandas_options={}, multiple_table_flag=True)
+
+
+def test_extraction_cache_round_trips_text_and_tables(
+    blend_fund_table_one, tmp_path
+) -> None:
+    """Test ExtractionCache reads back entries written by another instance."""
+    ExtractionCache(cache_dir=tmp_path).set_text(
+        file_digest="digest", name="page_0", text="fund_A $1.00"
+    )
+    ExtractionCache(cache_dir=tmp_path).set_tables(
+        file_digest="digest", parameters_key="key", tables=[blend_fund_table_one]
+    )
+    extraction_cache = ExtractionCache(cache_dir=tmp_path)
+
+    assert extraction_cache.get_text(file_digest="digest", name="page_0") == (
+        "fund_A $1.00"
+    )
+    assert extraction_cache.get_text(file_digest="digest", name="page_1") is None
+    cached_tables = extraction_cache.get_tables(
+        file_digest="digest", parameters_key="key"
+    )
+    assert cached_tables is not None
+    pd.testing.assert_frame_equal(left=cached_tables[0], right=blend_fund_table_one)
+
+
+def test_extraction_cache_ignores_corrupted_entry(tmp_path) -> None:
+    """Test ExtractionCache treats an unreadable entry as missing."""
+    (tmp_path / "digest").mkdir()
+    (tmp_path / "digest" / "page_0.txt.gz").write_bytes(b"not gzip")
+
+    actual = ExtractionCache(cache_dir=tmp_path).get_text(
+        file_digest="digest", name="page_0"
+    )
+
+    assert actual is None
+
+
+def test_extraction_cache_round_trips_mixed_tables(tmp_path) -> None:
+    """Test ExtractionCache keeps labels, dtypes and missing values of tables."""
+    table = pd.DataFrame(
+        {0: ["fund_A", None], 1: ["$1.00", "$2.00"], "total": [1.5, float("nan")]}
+    )
+    extraction_cache = ExtractionCache(cache_dir=tmp_path)
+    extraction_cache.set_tables(
+        file_digest="digest", parameters_key="key", tables=[table, pd.DataFrame()]
+    )
+
+    actual = extraction_cache.get_tables(file_digest="digest", parameters_key="key")
+
+    assert actual is not None
+    pd.testing.assert_frame_equal(left=actual[0], right=table)
+    assert actual[1].empty
+
+
+def test_extraction_cache_ignores_unreadable_tables(tmp_path) -> None:
+    """Test ExtractionCache treats tables that are not table JSON as missing."""
+    extraction_cache = ExtractionCache(cache_dir=tmp_path)
+    extraction_cache.set_text(
+        file_digest="digest", name="key.tables", text='{"not": "tables"'
+    )
+
+    assert extraction_cache.get_tables(file_digest="digest", parameters_key="key") is (
+        None
+    )
+
+
+def test_extraction_cache_evicts_least_recently_used(tmp_path) -> None:
+    """Test ExtractionCache stays within max_bytes."""
+    extraction_cache = ExtractionCache(cache_dir=tmp_path, max_bytes=10**6)
+    for page_num in range(3):
+        extraction_cache.set_text(
+            file_digest="digest", name=f"page_{page_num}", text="fund_A $1.00"
+        )
+        entry_path = tmp_path / "digest" / f"page_{page_num}.txt.gz"
+        os.utime(entry_path, (page_num, page_num))
+    extraction_cache.get_text(file_digest="digest", name="page_0")
+    entry_size = (tmp_path / "digest" / "page_0.txt.gz").stat().st_size
+    extraction_cache.max_bytes = 3 * entry_size - 1
+
+    extraction_cache.set_text(file_digest="digest", name="page_3", text="fund_A $1.00")
+
+    assert extraction_cache.get_text(file_digest="digest", name="page_0")
+    assert extraction_cache.get_text(file_digest="digest", name="page_2") is None
+
+
+def test_extraction_cache_only_scans_when_over_max_bytes(tmp_path, mocker) -> None:
+    """Test ExtractionCache keeps a running size instead of scanning every write."""
+    extraction_cache = ExtractionCache(cache_dir=tmp_path, max_bytes=10**6)
+    evict_spy = mocker.spy(extraction_cache, "_evict")
+
+    for page_num in range(20):
+        extraction_cache.set_text(
+            file_digest="digest", name=f"page_{page_num}", text="fund_A $1.00"
+        )
+    extraction_cache.set_text(file_digest="digest", name="page_0", text="fund_B")
+
+    assert evict_spy.call_count == 1
+    extraction_cache.max_bytes = sum(
+        file_path.stat().st_size for file_path in tmp_path.glob("*/*")
+    )
+    extraction_cache.set_text(file_digest="digest", name="page_20", text="fund_C")
+    assert evict_spy.call_count == 2
+    assert len(list(tmp_path.glob("*/*"))) < 21
+
+
+def test_pdf_document_skips_pdf_decoding_on_rerun(
+    pdf_statement_pages, blend_fund_table_one, tmp_path, mocker
+) -> None:
+    """Test a PdfDocument reuses text and tables extracted by an earlier run."""
+    pdfreader_return_mock = mocker.Mock()
+    pdfreader_return_mock.pages = pdf_statement_pages
+    pdfreader_mock_method = mocker.patch.object(
+        PyPDF2, "PdfReader", return_value=pdfreader_return_mock
+    )
+    tabula_read_pdf_mock_method = mocker.patch.object(
+        tabula, "read_pdf", return_value=[blend_fund_table_one]
+    )
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"pdf")
+    extraction_cache = ExtractionCache(cache_dir=tmp_path / "extractions")
+
+    page_texts = []
+    for _ in range(2):
+        document = PdfDocument(
+            file_path=str(file_path), extraction_cache=extraction_cache
+        )
+        page_texts.append(list(document.page_texts(page_selection={1, 2})))
+        document.tables(page_num=0, pandas_options={}, multiple_table_flag=False)
+
+    assert page_texts[0] == page_texts[1]
+    pdfreader_mock_method.assert_called_once()
+    tabula_read_pdf_mock_method.assert_called_once()
@@ -0,0 +1,79 @@
+"""This module tests all functions from module fund_name_matcher."""
+import pytest
+
+from portfolio_allocation.fund_name_matcher import FundNameMatcher
+
+
+@pytest.mark.parametrize(
+    "text_line, expected",
+    [
+        ("fund_B info $36.28", "B"),
+        ("Total Index Fund $1.00", "Total Index"),
+        ("Index Fund $1.00", "Index"),
+        ("Fund (a.b) $2.00", "Fund (a.b)"),
+        ("no match $3.00", None),
+    ],
+)
+def test_fund_name_matcher_match_line_succeeds(text_line, expected) -> None:
+    """Test FundNameMatcher match_line prefers the leftmost, longest name."""
+    matcher = FundNameMatcher(fund_names=["B", "Index", "Total Index", "Fund (a.b)"])
+
+    assert matcher.match_line(text_line=text_line) == expected
+
+
+def test_fund_name_matcher_match_lines_is_order_independent() -> None:
+    """Test FundNameMatcher match_lines reports duplicates and misses."""
+    text_lines = ["fund_C $3", "fund_A $1", "other", "fund_C $4", "fund_D $5"]
+
+    actual = FundNameMatcher(fund_names=["A", "B", "C", "A"]).match_lines(
+        text_lines=text_lines
+    )
+
+    assert actual.fund_lines == {"C": ["fund_C $3"], "A": ["fund_A $1"]}
+    assert actual.duplicate_fund_names == ["C"]
+    assert actual.missing_fund_names == ["A", "B"]
+
+
+def test_fund_name_matcher_match_lines_uses_one_line_per_listed_fund() -> None:
+    """Test FundNameMatcher match_lines keeps every lot of a fund listed twice."""
+    text_lines = ["fund_A $1", "fund_B $2", "fund_A $3", "fund_A $4"]
+
+    actual = FundNameMatcher(fund_names=["A", "B", "A"]).match_lines(
+        text_lines=text_lines
+    )
+
+    assert actual.fund_lines == {"A": ["fund_A $1", "fund_A $3"], "B": ["fund_B $2"]}
+    assert actual.duplicate_fund_names == []
+    assert actual.missing_fund_names == []
+
+
+def test_fund_name_matcher_match_lines_stops_once_all_funds_are_found() -> None:
+    """Test FundNameMatcher match_lines reads lazily."""
+    read_lines = []
+
+    def text_lines():
+        for text_line in ["fund_A $1", "fund_B $2", "fund_C $3"]:
+            read_lines.append(text_line)
+            yield text_line
+
+    actual = FundNameMatcher(fund_names=["B", "A"]).match_lines(text_lines=text_lines())
+
+    assert actual.missing_fund_names == []
+    assert read_lines == ["fund_A $1", "fund_B $2"]
+
+
+def test_fund_name_matcher_without_fund_names() -> None:
+    """Test FundNameMatcher with no fund names."""
+    actual = FundNameMatcher(fund_names=[]).match_lines(text_lines=["fund_A $1"])
+
+    assert actual.fund_lines == {}
+    assert actual.missing_fund_names == []
+
+
+def test_fund_name_matcher_find_all_succeeds() -> None:
+    """Test FundNameMatcher find_all returns every fund name in a line."""
+    matcher = FundNameMatcher(fund_names=["Index", "Total Index", "Bond"])
+
+    actual = matcher.find_all(text_line="Total Index to Bond and Index")
+
+    assert actual == ["Total Index", "Bond", "Index"]
@@ -8,6 +8,7 @@ from portfolio_allocation.generate_html_outputs import (
     webbrowser,
     _convert_df_to_html_table,
     _update_asset_allocation_table,
+    _update_stale_fund_notice,
     update_asset_allocation_html,
     AssetTableType,
 )
@@ -120,3 +121,30 @@ def test_update_asset_allocation_html(
     )
     mock_update_allocation_table.assert_called()
     mock_open_method.assert_called()
+
+
+def test_update_stale_fund_notice_replaces_the_notice() -> None:
+    """Test _update_stale_fund_notice keeps one notice before the body end."""
+    html_data = ["<body>\n", "\t<table></table>\n", "</body>\n"]
+
+    stale_html_data = _update_stale_fund_notice(
+        html_data=html_data, stale_funds=["vtsax", "vbtlx"]
+    )
+    actual = _update_stale_fund_notice(html_data=stale_html_data, stale_funds=["vtsax"])
+
+    assert actual[:2] == html_data[:2]
+    assert "last known asset allocation of: vtsax<" in actual[2]
+    assert actual[3:] == ["</body>\n"]
+    assert _update_stale_fund_notice(html_data=actual, stale_funds=[]) == html_data
+
+
+def test_update_stale_fund_notice_lists_failed_funds() -> None:
+    """Test _update_stale_fund_notice with funds left out."""
+    html_data = ["<body>\n", "</body>\n"]
+
+    actual = _update_stale_fund_notice(
+        html_data=html_data, stale_funds=[], failed_funds=["vtsax"]
+    )
+
+    assert "without an asset allocation: vtsax<" in actual[1]
+    assert "last known" not in actual[1]
@@ -0,0 +1,83 @@
+"""This module tests all functions from module household_batch."""
+import json
+import subprocess
+import sys
+
+from portfolio_allocation import ROOT_DIR, household_batch
+from portfolio_allocation.blend_fund_asset_allocation import BlendFundAllocation
+from portfolio_allocation.household_batch import Household, load_household, main
+
+
+def test_load_household_reads_configuration_module(tmp_path, monkeypatch) -> None:
+    """Test load_household."""
+    (tmp_path / "household_lee.py").write_text(
+        "ALL_CURRENT_BLEND_ACCOUNTS = ['401k']\n"
+        "BLEND_FUND_ACCOUNT_TO_ASSET_CALCULATION_MAPPING = {'401k': {'mid_url': []}}\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    actual = load_household(module_name="household_lee")
+
+    assert actual == Household(
+        name="household_lee",
+        blend_accounts=["401k"],
+        account_mapping={"401k": {"mid_url": []}},
+    )
+
+
+def test_household_batch_imports_without_default_configuration() -> None:
+    """Test household_batch does not need portfolio_allocation.configuration."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "sys.modules['portfolio_allocation.configuration'] = None\n"
+            "import portfolio_allocation.household_batch",
+        ],
+        cwd=ROOT_DIR,
+        check=True,
+    )
+
+
+def test_main_writes_one_result_per_household(tmp_path, mocker) -> None:
+    """Test main evaluates all households in one batch."""
+    mocker.patch.object(
+        household_batch,
+        "load_household",
+        side_effect=lambda module_name: Household(module_name, [], {}),
+    )
+    generate_mock = mocker.patch.object(
+        household_batch,
+        "generate_household_blend_fund_asset_allocations",
+        return_value={
+            "lee": BlendFundAllocation({"cash": 1.0}, [], [], []),
+            "kim": BlendFundAllocation(
+                {"cash": 2.0},
+                [],
+                [("ticker_b", "funds/xnas")],
+                [("ticker_c", "funds/xnas")],
+            ),
+        },
+    )
+    output_path = tmp_path / "households.json"
+
+    main(arguments=["lee", "kim", "--jobs", "3", "--output", str(output_path)])
+
+    generate_mock.assert_called_once_with(
+        households=[Household("lee", [], {}), Household("kim", [], {})],
+        jobs=3,
+        incremental=False,
+    )
+    assert json.loads(output_path.read_text()) == {
+        "lee": {
+            "asset_allocation": {"cash": 1.0},
+            "stale_funds": [],
+            "failed_funds": [],
+        },
+        "kim": {
+            "asset_allocation": {"cash": 2.0},
+            "stale_funds": ["ticker_b"],
+            "failed_funds": ["ticker_c"],
+        },
+    }
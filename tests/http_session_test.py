@@ -0,0 +1,346 @@
+"""This module tests all functions from module http_session."""
+import pytest
+import requests
+
+from portfolio_allocation import http_session
+from portfolio_allocation.http_session import (
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    PooledHttpClient,
+    configure_http_client,
+    remaining_request_time,
+    request_deadline,
+    time,
+)
+
+
+def _unlimited_rate_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(
+        rate_per_second=1000.0, min_rate_per_second=1000.0, burst_size=1000.0
+    )
+
+
+def _response(status_code: int, mocker, headers=None):
+    response = mocker.Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def test_pooled_http_client_session_mounts_pooled_adapters() -> None:
+    """Test PooledHttpClient shares one session with pooled adapters."""
+    client = PooledHttpClient(pool_connections=2, pool_maxsize=5)
+
+    session = client.session
+    adapter = session.get_adapter("https://www.morningstar.com")
+
+    assert client.session is session
+    assert adapter._pool_connections == 2  # pylint: disable=protected-access
+    assert adapter._pool_maxsize == 5  # pylint: disable=protected-access
+
+
+def test_pooled_http_client_get_retries_retryable_status(mocker) -> None:
+    """Test PooledHttpClient get retries 429 and 5xx responses with backoff."""
+    sleep_mock = mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(
+        max_retries=3,
+        backoff_factor=1.0,
+        max_backoff=1.5,
+        rate_limiter=_unlimited_rate_limiter(),
+    )
+    ok_response = _response(200, mocker)
+    session_get = mocker.patch.object(
+        client.session,
+        "get",
+        side_effect=[_response(429, mocker), _response(503, mocker), ok_response],
+    )
+
+    actual = client.get("url", headers={"apikey": "key"}, timeout=5)
+
+    assert actual is ok_response
+    assert session_get.call_count == 3
+    session_get.assert_called_with("url", headers={"apikey": "key"}, timeout=5)
+    delays = [sleep_call.args[0] for sleep_call in sleep_mock.call_args_list]
+    assert 1.0 <= delays[0] <= 1.5
+    assert delays[1] == 1.5
+
+
+def test_pooled_http_client_get_honors_retry_after(mocker) -> None:
+    """Test PooledHttpClient get waits as long as the Retry-After header asks."""
+    sleep_mock = mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(max_retries=1, rate_limiter=_unlimited_rate_limiter())
+    mocker.patch.object(
+        client.session,
+        "get",
+        side_effect=[
+            _response(429, mocker, headers={"Retry-After": "7"}),
+            _response(200, mocker),
+        ],
+    )
+
+    client.get("url")
+
+    sleep_mock.assert_called_once_with(7.0)
+
+
+def test_pooled_http_client_get_returns_last_response_after_retries(
+    mocker,
+) -> None:
+    """Test PooledHttpClient get gives up after max_retries."""
+    mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(max_retries=2, rate_limiter=_unlimited_rate_limiter())
+    last_response = _response(500, mocker)
+    session_get = mocker.patch.object(
+        client.session,
+        "get",
+        side_effect=[_response(500, mocker), _response(500, mocker), last_response],
+    )
+
+    actual = client.get("url")
+
+    assert actual is last_response
+    assert session_get.call_count == 3
+
+
+def test_pooled_http_client_get_does_not_retry_client_errors(mocker) -> None:
+    """Test PooledHttpClient get returns non retryable responses right away."""
+    client = PooledHttpClient()
+    not_found_response = _response(404, mocker)
+    session_get = mocker.patch.object(
+        client.session, "get", return_value=not_found_response
+    )
+
+    actual = client.get("url")
+
+    assert actual is not_found_response
+    session_get.assert_called_once()
+
+
+def test_pooled_http_client_get_raises_connection_error_after_retries(
+    mocker,
+) -> None:
+    """Test PooledHttpClient get retries connection errors before raising."""
+    mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(max_retries=1, rate_limiter=_unlimited_rate_limiter())
+    session_get = mocker.patch.object(
+        client.session, "get", side_effect=requests.ConnectionError
+    )
+
+    with pytest.raises(requests.ConnectionError):
+        client.get("url")
+    assert session_get.call_count == 2
+
+
+def test_configure_http_client_replaces_shared_client(monkeypatch) -> None:
+    """Test configure_http_client."""
+    monkeypatch.setattr(http_session, "HTTP_CLIENT", PooledHttpClient())
+
+    actual = configure_http_client(max_retries=0, pool_maxsize=32)
+
+    assert http_session.HTTP_CLIENT is actual
+    assert actual.max_retries == 0
+    assert actual.pool_maxsize == 32
+
+
+def test_adaptive_rate_limiter_paces_requests() -> None:
+    """Test AdaptiveRateLimiter only lets rate_per_second requests through."""
+    rate_limiter = AdaptiveRateLimiter(rate_per_second=50.0, burst_size=1.0)
+
+    start_time = time.monotonic()
+    for _ in range(4):
+        rate_limiter.acquire()
+        rate_limiter.release(status_code=200, elapsed_seconds=0.0)
+    elapsed_seconds = time.monotonic() - start_time
+
+    assert elapsed_seconds >= 0.05
+
+
+def test_adaptive_rate_limiter_backs_off_when_throttled() -> None:
+    """Test AdaptiveRateLimiter halves its limits on throttled responses."""
+    rate_limiter = AdaptiveRateLimiter(
+        rate_per_second=8.0, min_rate_per_second=3.0, max_concurrency=8
+    )
+
+    rate_limiter.acquire()
+    rate_limiter.release(status_code=429, elapsed_seconds=0.1)
+    first_rate, first_concurrency = (
+        rate_limiter.rate_per_second,
+        rate_limiter.concurrency,
+    )
+    rate_limiter.acquire()
+    rate_limiter.release(status_code=503, elapsed_seconds=0.1)
+
+    assert (first_rate, first_concurrency) == (4.0, 4)
+    assert (rate_limiter.rate_per_second, rate_limiter.concurrency) == (3.0, 2)
+
+
+def test_adaptive_rate_limiter_slows_down_on_slow_or_failed_requests() -> None:
+    """Test AdaptiveRateLimiter reduces its limits a little for slow responses."""
+    rate_limiter = AdaptiveRateLimiter(
+        rate_per_second=10.0, max_concurrency=10, slow_response_seconds=1.0
+    )
+
+    rate_limiter.acquire()
+    rate_limiter.release(status_code=200, elapsed_seconds=2.0)
+    rate_limiter.acquire()
+    rate_limiter.release(status_code=None, elapsed_seconds=0.0)
+
+    assert rate_limiter.rate_per_second == pytest.approx(6.4)
+    assert rate_limiter.concurrency == 6
+
+
+def test_adaptive_rate_limiter_ramps_up_when_healthy() -> None:
+    """Test AdaptiveRateLimiter grows its limits back on healthy responses."""
+    rate_limiter = AdaptiveRateLimiter(
+        rate_per_second=1.0,
+        max_rate_per_second=2.0,
+        rate_increase_per_second=0.5,
+        burst_size=10.0,
+        max_concurrency=4,
+    )
+    rate_limiter.concurrency = 2
+
+    for _ in range(3):
+        rate_limiter.acquire()
+        rate_limiter.release(status_code=200, elapsed_seconds=0.1)
+
+    assert rate_limiter.rate_per_second == 2.0
+    assert rate_limiter.concurrency == 3
+
+
+def test_pooled_http_client_reports_every_attempt_to_rate_limiter(mocker) -> None:
+    """Test PooledHttpClient sends every attempt through the rate limiter."""
+    mocker.patch.object(time, "sleep")
+    rate_limiter = _unlimited_rate_limiter()
+    acquire_spy = mocker.spy(rate_limiter, "acquire")
+    release_spy = mocker.spy(rate_limiter, "release")
+    client = PooledHttpClient(max_retries=1, rate_limiter=rate_limiter)
+    mocker.patch.object(
+        client.session,
+        "get",
+        side_effect=[_response(429, mocker), requests.ConnectionError],
+    )
+
+    with pytest.raises(requests.ConnectionError):
+        client.get("url")
+
+    assert acquire_spy.call_count == 2
+    assert [
+        release_call.kwargs["status_code"] for release_call in release_spy.mock_calls
+    ] == [429, None]
+
+
+def test_circuit_breaker_opens_and_recovers(mocker) -> None:
+    """Test CircuitBreaker opens after failures and closes after a trial request."""
+    monotonic = mocker.patch.object(time, "monotonic", return_value=100.0)
+    circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=10.0)
+
+    circuit_breaker.record_failure()
+    circuit_breaker.before_request(host="host")
+    circuit_breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request(host="host")
+
+    monotonic.return_value = 111.0
+    circuit_breaker.before_request(host="host")
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request(host="host")
+    circuit_breaker.record_success()
+
+    assert not circuit_breaker.is_open
+    circuit_breaker.before_request(host="host")
+
+
+def test_pooled_http_client_fails_fast_while_circuit_is_open(mocker) -> None:
+    """Test PooledHttpClient stops calling a host once its circuit opens."""
+    mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(
+        max_retries=5, rate_limiter=_unlimited_rate_limiter(), failure_threshold=2
+    )
+    session_get = mocker.patch.object(
+        client.session, "get", side_effect=requests.ConnectionError
+    )
+
+    with pytest.raises(CircuitOpenError):
+        client.get("https://host/a")
+    with pytest.raises(CircuitOpenError):
+        client.get("https://host/b")
+
+    assert session_get.call_count == 2
+    assert client.circuit_breaker(host="host").is_open
+    assert not client.circuit_breaker(host="other_host").is_open
+
+
+def test_request_deadline_nests_to_the_earliest_deadline() -> None:
+    """Test request_deadline and remaining_request_time."""
+    assert remaining_request_time() is None
+    with request_deadline(seconds=10.0):
+        with request_deadline(seconds=100.0):
+            outer_remaining_time = remaining_request_time()
+            assert outer_remaining_time is not None
+            assert outer_remaining_time <= 10.0
+        with request_deadline(seconds=1.0):
+            inner_remaining_time = remaining_request_time()
+            assert inner_remaining_time is not None
+            assert inner_remaining_time <= 1.0
+    assert remaining_request_time() is None
+
+
+def test_pooled_http_client_get_respects_request_deadline(mocker) -> None:
+    """Test PooledHttpClient caps timeouts and stops retrying at the deadline."""
+    sleep = mocker.patch.object(time, "sleep")
+    client = PooledHttpClient(
+        max_retries=3, backoff_factor=10.0, rate_limiter=_unlimited_rate_limiter()
+    )
+    session_get = mocker.patch.object(
+        client.session, "get", return_value=_response(503, mocker)
+    )
+
+    with request_deadline(seconds=2.0):
+        actual = client.get("url", timeout=60)
+
+    assert actual.status_code == 503
+    session_get.assert_called_once()
+    assert session_get.call_args.kwargs["timeout"] <= 2.0
+    sleep.assert_not_called()
+    with request_deadline(seconds=0.0):
+        with pytest.raises(DeadlineExceededError):
+            client.get("url")
+
+
+def test_pooled_http_client_keeps_circuit_closed_when_only_the_limiter_waits(
+    mocker,
+) -> None:
+    """Test PooledHttpClient does not blame the host for client side throttling."""
+    client = PooledHttpClient(
+        rate_limiter=_unlimited_rate_limiter(),
+        failure_threshold=1,
+        reset_timeout_seconds=0.0,
+    )
+    session_get = mocker.patch.object(
+        client.session, "get", return_value=_response(200, mocker)
+    )
+    mocker.patch.object(client.rate_limiter, "acquire", return_value=False)
+
+    for _ in range(3):
+        with request_deadline(seconds=1.0):
+            with pytest.raises(DeadlineExceededError):
+                client.get("https://host/a")
+
+    session_get.assert_not_called()
+    assert not client.circuit_breaker(host="host").is_open
+
+
+def test_circuit_breaker_release_trial_keeps_circuit_half_open(mocker) -> None:
+    """Test CircuitBreaker release_trial frees the trial slot without a failure."""
+    monotonic = mocker.patch.object(time, "monotonic", return_value=100.0)
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=10.0)
+    circuit_breaker.record_failure()
+
+    monotonic.return_value = 111.0
+    circuit_breaker.before_request(host="host")
+    circuit_breaker.release_trial()
+
+    circuit_breaker.before_request(host="host")
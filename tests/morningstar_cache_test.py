@@ -0,0 +1,78 @@
+"""This module tests all functions from module morningstar_cache."""
+from portfolio_allocation.morningstar_cache import JsonFileCache, time
+
+
+def test_json_file_cache_persists_entries(tmp_path) -> None:
+    """Test JsonFileCache reads back entries written by another instance."""
+    file_path = tmp_path / "cache.json"
+    JsonFileCache(file_path=file_path).set(key="key", value={"a": 1.0})
+
+    actual = JsonFileCache(file_path=file_path).get(key="key")
+
+    assert actual == {"a": 1.0}
+
+
+def test_json_file_cache_expires_entries(tmp_path, mocker) -> None:
+    """Test JsonFileCache treats entries older than the ttl as missing."""
+    time_mock = mocker.patch.object(time, "time", return_value=1000.0)
+    cache = JsonFileCache(file_path=tmp_path / "cache.json", ttl_seconds=10)
+    cache.set(key="key", value="value")
+
+    time_mock.return_value = 1005.0
+    fresh = cache.get(key="key")
+    time_mock.return_value = 1011.0
+    expired = cache.get(key="key")
+
+    assert fresh == "value"
+    assert expired is None
+
+
+def test_json_file_cache_ignores_corrupted_file(tmp_path) -> None:
+    """Test JsonFileCache starts empty when the cache file is unreadable."""
+    file_path = tmp_path / "cache.json"
+    file_path.write_text("not json", encoding="utf-8")
+
+    cache = JsonFileCache(file_path=file_path)
+
+    assert cache.get(key="key") is None
+    cache.set(key="key", value="value")
+    assert JsonFileCache(file_path=file_path).get(key="key") == "value"
+
+
+def test_json_file_cache_clear_removes_entries(tmp_path) -> None:
+    """Test JsonFileCache clear."""
+    file_path = tmp_path / "cache.json"
+    cache = JsonFileCache(file_path=file_path)
+    cache.set(key="key", value="value")
+
+    cache.clear()
+
+    assert cache.get(key="key") is None
+    assert JsonFileCache(file_path=file_path).get(key="key") is None
+
+
+def test_json_file_cache_evicts_least_recently_used_entry(tmp_path) -> None:
+    """Test JsonFileCache keeps at most max_entries entries."""
+    cache = JsonFileCache(file_path=tmp_path / "cache.json", max_entries=2)
+    cache.set(key="a", value=1)
+    cache.set(key="b", value=2)
+    cache.get(key="a")
+
+    cache.set(key="c", value=3)
+
+    assert cache.get(key="a") == 1
+    assert cache.get(key="b") is None
+    assert cache.get(key="c") == 3
+
+
+def test_json_file_cache_get_with_expiry_returns_stale_value(tmp_path, mocker) -> None:
+    """Test JsonFileCache get_with_expiry still returns an expired value."""
+    time_mock = mocker.patch.object(time, "time", return_value=1000.0)
+    cache = JsonFileCache(file_path=tmp_path / "cache.json", ttl_seconds=10)
+    cache.set(key="key", value="value")
+    time_mock.return_value = 1011.0
+
+    actual = cache.get_with_expiry(key="key")
+
+    assert actual == ("value", True)
+    assert cache.get_with_expiry(key="missing") == (None, False)
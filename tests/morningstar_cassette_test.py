@@ -0,0 +1,123 @@
+# pylint: disable = redefined-outer-name, missing-function-docstring
+"""This module tests all functions from module morningstar_cassette."""
+import pytest
+import requests
+
+from portfolio_allocation import http_session
+from portfolio_allocation.http_session import PooledHttpClient
+from portfolio_allocation.morningstar_cassette import (
+    CassetteHttpClient,
+    CassetteMode,
+    cassette_key,
+    cassette_path,
+    load_cassette,
+    record_cassette,
+    use_cassettes,
+)
+
+
+@pytest.fixture(scope="function")
+def live_response() -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    response.headers["Set-Cookie"] = "secret"
+    response._content = b'{"allocationMap": {}}'  # pylint: disable=protected-access
+    return response
+
+
+def test_cassette_key_ignores_host() -> None:
+    """Test cassette_key only uses the path and the query."""
+    live_key = cassette_key(url="https://api-global.morningstar.com/sal/v1/a?b=c")
+    local_key = cassette_key(url="http://127.0.0.1:8765/sal/v1/a?b=c")
+
+    assert live_key == local_key == cassette_key(url="/sal/v1/a?b=c")
+    assert cassette_key(url="/sal/v1/a?b=d") != live_key
+
+
+def test_record_cassette_stores_only_body_status_and_content_type(
+    tmp_path, live_response
+) -> None:
+    """Test record_cassette and load_cassette."""
+    record_cassette(
+        url="https://www.morningstar.com/funds/a",
+        response=live_response,
+        cassette_dir=tmp_path,
+    )
+
+    actual = load_cassette(url="/funds/a", cassette_dir=tmp_path)
+
+    assert actual is not None
+    assert actual["status_code"] == 200
+    assert actual["headers"] == {"Content-Type": "application/json; charset=utf-8"}
+    assert load_cassette(url="/funds/b", cassette_dir=tmp_path) is None
+
+
+def test_cassette_http_client_records_then_replays(
+    tmp_path, live_response, mocker
+) -> None:
+    """Test CassetteHttpClient record mode followed by replay mode."""
+    url = "https://api-global.morningstar.com/sal/v1/id/data?x=1"
+    live_client = PooledHttpClient()
+    live_get = mocker.patch.object(live_client, "get", return_value=live_response)
+    recorder = CassetteHttpClient(
+        mode=CassetteMode.RECORD, cassette_dir=tmp_path, http_client=live_client
+    )
+    replayer = CassetteHttpClient(
+        mode=CassetteMode.REPLAY, cassette_dir=tmp_path, http_client=live_client
+    )
+
+    recorded = recorder.get(url, headers={"apikey": "key"}, timeout=5)
+    replayed = replayer.get(url, headers={"apikey": "key"}, stream=True)
+
+    assert recorded is live_response
+    live_get.assert_called_once_with(url, headers={"apikey": "key"}, timeout=5)
+    assert "key" not in cassette_path(url=url, cassette_dir=tmp_path).read_text()
+    assert replayed.status_code == 200
+    assert replayed.json() == {"allocationMap": {}}
+    assert b"".join(replayed.iter_content(chunk_size=4)) == live_response.content
+
+
+@pytest.mark.parametrize("status_code", [404, 429, 503])
+def test_cassette_http_client_does_not_record_failed_responses(
+    tmp_path, live_response, status_code, mocker
+) -> None:
+    """Test CassetteHttpClient record mode skips unsuccessful responses."""
+    url = "https://www.morningstar.com/funds/a"
+    live_response.status_code = status_code
+    live_client = PooledHttpClient()
+    mocker.patch.object(live_client, "get", return_value=live_response)
+    recorder = CassetteHttpClient(
+        mode=CassetteMode.RECORD, cassette_dir=tmp_path, http_client=live_client
+    )
+
+    actual = recorder.get(url)
+
+    assert actual is live_response
+    assert load_cassette(url=url, cassette_dir=tmp_path) is None
+
+
+def test_cassette_http_client_replay_raises_for_missing_cassette(tmp_path) -> None:
+    """Test CassetteHttpClient replay mode never falls back to the network."""
+    replayer = CassetteHttpClient(mode=CassetteMode.REPLAY, cassette_dir=tmp_path)
+
+    with pytest.raises(requests.ConnectionError):
+        replayer.get("https://www.morningstar.com/funds/missing")
+
+
+def test_use_cassettes_wraps_and_unwraps_shared_client(tmp_path, monkeypatch) -> None:
+    """Test use_cassettes installs and removes the cassette layer."""
+    live_client = PooledHttpClient()
+    monkeypatch.setattr(http_session, "HTTP_CLIENT", live_client)
+
+    replay_client = use_cassettes(mode="replay", cassette_dir=tmp_path)
+    record_client = use_cassettes(mode=CassetteMode.RECORD, cassette_dir=tmp_path)
+    off_client = use_cassettes(mode="off")
+
+    assert isinstance(replay_client, CassetteHttpClient)
+    assert isinstance(record_client, CassetteHttpClient)
+    assert replay_client.http_client is live_client
+    assert record_client.http_client is live_client
+    assert record_client.mode is CassetteMode.RECORD
+    assert off_client is live_client
+    assert http_session.HTTP_CLIENT is live_client
@@ -0,0 +1,98 @@
+# pylint: disable = redefined-outer-name, missing-function-docstring
+"""This module tests all functions from module morningstar_stand_in_server."""
+import threading
+from typing import Iterator
+
+import pytest
+import requests
+
+from portfolio_allocation.morningstar_cassette import record_cassette
+from portfolio_allocation.morningstar_stand_in_server import StandInServer
+
+
+def _serve(server: StandInServer) -> Iterator[StandInServer]:
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        server_thread.join()
+
+
+@pytest.fixture(scope="function")
+def cassette_dir(tmp_path):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "text/html"
+    response._content = b"<sal-components security-id='F0'>"  # pylint: disable=W0212
+    record_cassette(
+        url="https://www.morningstar.com/funds/xnas/vtsax/portfolio",
+        response=response,
+        cassette_dir=tmp_path,
+    )
+    return tmp_path
+
+
+@pytest.fixture(scope="function")
+def stand_in_server(cassette_dir) -> Iterator[StandInServer]:
+    yield from _serve(StandInServer(cassette_dir=cassette_dir, port=0))
+
+
+def test_stand_in_server_serves_recorded_cassette(stand_in_server) -> None:
+    """Test StandInServer replays a cassette recorded from another host."""
+    response = requests.get(
+        f"{stand_in_server.base_url}/funds/xnas/vtsax/portfolio", timeout=5
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "text/html"
+    assert response.content == b"<sal-components security-id='F0'>"
+
+
+def test_stand_in_server_returns_not_found_for_missing_cassette(
+    stand_in_server,
+) -> None:
+    """Test StandInServer answers unknown requests with 404."""
+    response = requests.get(f"{stand_in_server.base_url}/funds/missing", timeout=5)
+
+    assert response.status_code == 404
+
+
+def test_stand_in_server_injects_errors(cassette_dir) -> None:
+    """Test StandInServer injects the configured error status code."""
+    for server in _serve(
+        StandInServer(
+            cassette_dir=cassette_dir, port=0, error_rate=1.0, error_status_code=429
+        )
+    ):
+        response = requests.get(
+            f"{server.base_url}/funds/xnas/vtsax/portfolio", timeout=5
+        )
+
+        assert response.status_code == 429
+
+
+def test_stand_in_server_draws_reproducible_latency(cassette_dir) -> None:
+    """Test StandInServer latency and errors are reproducible with a seed."""
+    servers = [
+        StandInServer(
+            cassette_dir=cassette_dir,
+            port=0,
+            latency_seconds=0.5,
+            latency_jitter_seconds=0.1,
+            error_rate=0.5,
+            seed=7,
+        )
+        for _ in range(2)
+    ]
+
+    draws = [
+        [server.draw_response_delay_and_error() for _ in range(5)] for server in servers
+    ]
+    for server in servers:
+        server.server_close()
+
+    assert draws[0] == draws[1]
+    assert all(0.5 <= delay <= 0.6 for delay, _ in draws[0])
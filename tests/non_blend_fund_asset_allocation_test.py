@@ -60,3 +60,34 @@ def test_generate_combined_non_blend_fund_asset_allocation(mocker) -> None:
     actual = generate_combined_non_blend_fund_asset_allocation()
 
     assert actual == expected
+
+
+def test_generate_combined_non_blend_fund_asset_allocation_keeps_unknown_asset_types(
+    mocker,
+) -> None:
+    """Test generate_combined_non_blend_fund_asset_allocation with an asset type
+    that is not one of ALL_ASSET_CLASSES."""
+    mocker.patch.object(builtins, "input", side_effect=["1000", "500"])
+    mocker.patch(
+        "portfolio_allocation.non_blend_fund_asset_allocation."
+        "NON_BLEND_FUND_ACCOUNT_TO_ASSET_TYPE_MAPPING",
+        {"gold_coins": "gold", "savings": "cash"},
+    )
+    mocker.patch(
+        "portfolio_allocation.non_blend_fund_asset_allocation."
+        "ALL_CURRENT_NON_BLEND_ACCOUNTS",
+        ["gold_coins", "savings"],
+    )
+
+    actual = generate_combined_non_blend_fund_asset_allocation()
+
+    assert actual == {
+        "us_stock": 0,
+        "international_stock": 0,
+        "fixed_income": 0,
+        "not_classified": 0,
+        "cash": 500.0,
+        "other": 0,
+        "mortgage": 0,
+        "gold": 1000.0,
+    }
@@ -1,8 +1,20 @@
 # pylint: disable = too-many-locals, duplicate-code
 """This module tests all functions from module pdf_parser."""
+import hashlib
+import mmap
+
 import pandas as pd
+import pytest
 
+from portfolio_allocation.extraction_cache import file_sha256
 from portfolio_allocation.pdf_parser import (
+    PdfDocument,
+    PdfDocumentCache,
+    TableRequest,
+    read_pdf_tables,
+    find_fund_pages,
+    iter_text_lines,
+    select_page_numbers,
     load_pdf_statements,
     parse_pdf_tables,
     PyPDF2,
@@ -10,21 +22,89 @@ from portfolio_allocation.pdf_parser import (
 )
 
 
-def test_load_pdf_statements_succeeds(pdf_statement_pages, mocker) -> None:
-    """Test load_pdf_statements."""
+@pytest.mark.parametrize(
+    "page_selection, expected",
+    [
+        (1, [1]),
+        (7, []),
+        ({4, 0, 2}, [0, 2, 4]),
+        ({-1, 1, 9}, [1]),
+        (range(1, 4), [1, 2, 3]),
+        (range(3, 10**9), [3, 4]),
+        (range(4, 0, -2), [2, 4]),
+    ],
+)
+def test_select_page_numbers_succeeds(page_selection, expected) -> None:
+    """Test select_page_numbers."""
+    actual = select_page_numbers(page_selection=page_selection, page_count=5)
+
+    assert actual == expected
+
+
+def test_pdf_document_page_texts_only_extracts_selected_pages(
+    pdf_statement_pages, pdf_text_page_two
+) -> None:
+    """Test PdfDocument page_texts is lazy and skips unselected pages."""
+    document = PdfDocument(file_path="test_file_path", pages=pdf_statement_pages)
+
+    page_texts = document.page_texts(page_selection={2})
+
+    pdf_statement_pages[2].extract_text.assert_not_called()
+    assert list(page_texts) == [(2, pdf_text_page_two)]
+    pdf_statement_pages[0].extract_text.assert_not_called()
+    pdf_statement_pages[1].extract_text.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "one line", "first\nsecond", "trailing\n", "\n\nblank lines\n\n"],
+)
+def test_iter_text_lines_matches_split(text) -> None:
+    """Test iter_text_lines yields the same lines as str.split."""
+    assert list(iter_text_lines(text=text)) == text.split("\n")
+
+
+def test_pdf_document_text_lines_streams_pages_lazily(pdf_statement_pages) -> None:
+    """Test PdfDocument text_lines numbers lines and extracts pages on demand."""
+    pdf_statement_pages[0].extract_text.return_value = "page zero"
+    pdf_statement_pages[1].extract_text.return_value = "first\nsecond"
+    document = PdfDocument(file_path="test_file_path", pages=pdf_statement_pages)
+
+    text_lines = document.text_lines(page_selection=range(3))
+
+    assert next(text_lines) == (0, 0, "page zero")
+    pdf_statement_pages[1].extract_text.assert_not_called()
+    assert next(text_lines) == (1, 0, "first")
+    assert next(text_lines) == (1, 1, "second")
+    pdf_statement_pages[2].extract_text.assert_not_called()
+
+
+def test_load_pdf_statements_succeeds(pdf_statement_pages, tmp_path, mocker) -> None:
+    """Test load_pdf_statements hands the memory mapped statement to PyPDF2."""
     pdfreader_return_mock = mocker.Mock()
     pdfreader_return_mock.pages = pdf_statement_pages
     pdfreader_mock_method = mocker.patch.object(
         PyPDF2, "PdfReader", return_value=pdfreader_return_mock
     )
-    file_path = "test_file_path"
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"%PDF-1.4")
 
-    actual = load_pdf_statements(file_path=file_path)
+    actual = load_pdf_statements(file_path=str(file_path))
 
     assert actual == pdf_statement_pages
-    pdfreader_mock_method.assert_called_once_with(
-        stream=file_path,
-    )
+    stream = pdfreader_mock_method.call_args.kwargs["stream"]
+    assert isinstance(stream, mmap.mmap)
+    assert stream[:] == b"%PDF-1.4"
+
+
+def test_pdf_document_hashes_mapped_statement(tmp_path) -> None:
+    """Test PdfDocument file_digest hashes the statement bytes."""
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"%PDF-1.4")
+    document = PdfDocument(file_path=str(file_path))
+
+    assert document.file_digest == hashlib.sha256(b"%PDF-1.4").hexdigest()
+    assert document.file_digest == file_sha256(file_path=str(file_path))
 
 
 def test_parse_pdf_tables_succeeds(blend_fund_table_one, mocker) -> None:
@@ -55,3 +135,109 @@ def test_parse_pdf_tables_succeeds(blend_fund_table_one, mocker) -> None:
         pages=pages,
         pandas_options=pandas_options,
     )
+
+
+def test_pdf_document_cache_parses_each_statement_once(
+    pdf_statement_pages, blend_fund_table_one, tmp_path, mocker
+) -> None:
+    """Test PdfDocumentCache reuses the reader, page texts and tables."""
+    pdfreader_return_mock = mocker.Mock()
+    pdfreader_return_mock.pages = pdf_statement_pages
+    pdfreader_mock_method = mocker.patch.object(
+        PyPDF2, "PdfReader", return_value=pdfreader_return_mock
+    )
+    tabula_read_pdf_mock_method = mocker.patch.object(
+        tabula, "read_pdf", return_value=[blend_fund_table_one]
+    )
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"pdf")
+    document_cache = PdfDocumentCache()
+
+    for _ in range(2):
+        document = document_cache.get(file_path=str(file_path))
+        document.page_text(page_num=1)
+        document.tables(
+            page_num=0, pandas_options={"headers": None}, multiple_table_flag=False
+        )
+
+    assert document_cache.get(file_path=str(file_path)) is document
+    pdfreader_mock_method.assert_called_once()
+    pdf_statement_pages[1].extract_text.assert_called_once()
+    tabula_read_pdf_mock_method.assert_called_once()
+
+
+def test_pdf_document_cache_reparses_changed_statement(tmp_path) -> None:
+    """Test PdfDocumentCache keys documents by modification time and size."""
+    file_path = tmp_path / "statement.pdf"
+    file_path.write_bytes(b"pdf")
+    document_cache = PdfDocumentCache()
+
+    document = document_cache.get(file_path=str(file_path))
+    file_path.write_bytes(b"changed pdf")
+
+    assert document_cache.get(file_path=str(file_path)) is not document
+
+
+def test_pdf_document_cache_evicts_least_recently_used(tmp_path) -> None:
+    """Test PdfDocumentCache stays within max_bytes."""
+    file_paths = []
+    for name in ("a", "b", "c"):
+        file_path = tmp_path / f"{name}.pdf"
+        file_path.write_bytes(b"x" * 10)
+        file_paths.append(str(file_path))
+    document_cache = PdfDocumentCache(max_bytes=25)
+
+    document_a = document_cache.get(file_path=file_paths[0])
+    document_b = document_cache.get(file_path=file_paths[1])
+    document_cache.get(file_path=file_paths[0])
+    document_cache.get(file_path=file_paths[2])
+
+    assert document_cache.get(file_path=file_paths[0]) is document_a
+    assert document_cache.get(file_path=file_paths[1]) is not document_b
+
+
+def test_read_pdf_tables_reads_each_distinct_table_once(
+    blend_fund_table_one, blend_fund_table_two, mocker
+) -> None:
+    """Test read_pdf_tables deduplicates table requests."""
+    tabula_read_pdf_mock_method = mocker.patch.object(
+        tabula,
+        "read_pdf",
+        side_effect=lambda pages, **_: [
+            blend_fund_table_one if pages == 0 else blend_fund_table_two
+        ],
+    )
+    table_requests = [
+        TableRequest(page_num=0, pandas_options={}, multiple_table_flag=False),
+        TableRequest(page_num=3, pandas_options={}, multiple_table_flag=False),
+        TableRequest(page_num=0, pandas_options={}, multiple_table_flag=False),
+    ]
+
+    actual = read_pdf_tables(file_path="test_file_path", table_requests=table_requests)
+
+    assert [tables[0] is blend_fund_table_one for tables in actual] == [
+        True,
+        False,
+        True,
+    ]
+    assert tabula_read_pdf_mock_method.call_count == 2
+
+
+def test_pdf_document_fund_locations_indexes_all_pages_once(
+    pdf_statement_pages, mocker
+) -> None:
+    """Test PdfDocument fund_locations builds an inverted fund index."""
+    document = PdfDocument(file_path="test_file_path", pages=pdf_statement_pages)
+    mocker.patch(
+        "portfolio_allocation.pdf_parser.load_pdf_document", return_value=document
+    )
+
+    actual = document.fund_locations(fund_names=["fund_B", "fund_F", "fund_Z"])
+    actual_pages = find_fund_pages(
+        file_path="test_file_path", fund_names=["fund_E", "fund_B"]
+    )
+
+    assert actual == {"fund_B": [(1, 2)], "fund_F": [(2, 2)], "fund_Z": []}
+    assert actual_pages == {1, 2}
+    for page in pdf_statement_pages:
+        page.extract_text.assert_called_once()
@@ -0,0 +1,78 @@
+"""This module tests the Portfolio type from package portfolio_allocation."""
+import numpy as np
+import pytest
+
+from portfolio_allocation import (
+    ALL_ASSET_CLASSES,
+    ASSET_CLASSES,
+    PORTFOLIO_BREAKDOWN,
+    Portfolio,
+)
+
+
+def test_portfolio_round_trips_dictionaries() -> None:
+    """Test Portfolio from_dict and to_dict."""
+    portfolio = Portfolio.from_dict(portfolio={"cash": 10.0, "us_stock": 30.0})
+
+    assert portfolio.to_dict() == {
+        **PORTFOLIO_BREAKDOWN,
+        "cash": 10.0,
+        "us_stock": 30.0,
+    }
+    assert portfolio["cash"] == 10.0
+    assert portfolio.total == 40.0
+
+
+def test_portfolio_accumulates_in_place() -> None:
+    """Test Portfolio += and add_dict reuse the preallocated buffer."""
+    total_portfolio = Portfolio()
+    buffer = total_portfolio.values
+
+    total_portfolio += Portfolio.from_dict(portfolio={"cash": 1.0})
+    total_portfolio.add_dict(portfolio={"cash": 2.0, "other": 3.0})
+    total_portfolio *= 2
+
+    assert total_portfolio.values is buffer
+    assert total_portfolio.to_dict() == {
+        **PORTFOLIO_BREAKDOWN,
+        "cash": 6.0,
+        "other": 6.0,
+    }
+
+
+def test_portfolio_arithmetic_returns_new_portfolios() -> None:
+    """Test Portfolio + and * leave their operands unchanged."""
+    portfolio = Portfolio.from_dict(portfolio={"fixed_income": 5.0})
+
+    actual = 2 * (portfolio + portfolio)
+
+    assert actual["fixed_income"] == 20.0
+    assert portfolio["fixed_income"] == 5.0
+    assert actual == portfolio * 4
+
+
+@pytest.mark.parametrize(
+    "portfolio, expected",
+    [
+        ({"cash": 25.0, "us_stock": 75.0}, {"cash": 25.0, "us_stock": 75.0}),
+        ({}, {}),
+    ],
+)
+def test_portfolio_percentages_succeeds(portfolio, expected) -> None:
+    """Test Portfolio percentages."""
+    actual = Portfolio.from_dict(portfolio=portfolio).percentages()
+
+    assert actual.to_dict() == {**PORTFOLIO_BREAKDOWN, **expected}
+
+
+def test_portfolio_rejects_unknown_asset_types_and_axes() -> None:
+    """Test Portfolio keeps asset classes on its axis."""
+    with pytest.raises(ValueError):
+        Portfolio.from_dict(portfolio={"mortgage": 1.0})
+    with pytest.raises(ValueError):
+        Portfolio(values=np.zeros(len(ASSET_CLASSES) + 1))
+
+    portfolio = Portfolio(asset_classes=ALL_ASSET_CLASSES)
+    portfolio.add(asset_type="mortgage", asset_value=1.0)
+    with pytest.raises(ValueError):
+        portfolio += Portfolio()
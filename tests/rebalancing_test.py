@@ -0,0 +1,188 @@
+"""This module tests all functions from module rebalancing."""
+import time
+
+import numpy as np
+import pytest
+
+from portfolio_allocation import ASSET_CLASSES, PORTFOLIO_BREAKDOWN
+from portfolio_allocation.rebalancing import (
+    AccountConstraint,
+    FundHolding,
+    Trade,
+    load_target_percentages,
+    rebalance,
+    screen_target_mixes,
+    target_vector,
+)
+
+STOCK_FUND = {"us_stock": 1.0}
+BOND_FUND = {"fixed_income": 1.0}
+BALANCED_FUND = {"us_stock": 0.6, "international_stock": 0.2, "fixed_income": 0.2}
+HALF_STOCK_HALF_BOND = {"us_stock": 50.0, "fixed_income": 50.0}
+
+
+def test_rebalance_finds_minimal_trades() -> None:
+    """Test rebalance within one account."""
+    holdings = [
+        FundHolding("ira", "stock", 600.0, STOCK_FUND),
+        FundHolding("ira", "bond", 400.0, BOND_FUND),
+    ]
+
+    actual = rebalance(holdings=holdings, target_percentages=HALF_STOCK_HALF_BOND)
+
+    assert [(trade.account, trade.fund_name) for trade in actual.trades] == [
+        ("ira", "stock"),
+        ("ira", "bond"),
+    ]
+    assert [trade.amount for trade in actual.trades] == pytest.approx([-100.0, 100.0])
+    assert actual.portfolio == pytest.approx(
+        {**PORTFOLIO_BREAKDOWN, "us_stock": 500.0, "fixed_income": 500.0}
+    )
+    assert actual.tracking_error == pytest.approx(0.0, abs=1e-6)
+    assert actual.turnover == pytest.approx(200.0)
+
+
+def test_rebalance_respects_account_constraints() -> None:
+    """Test rebalance does not sell in taxable accounts or move money."""
+    holdings = [
+        FundHolding("taxable", "stock", 800.0, STOCK_FUND),
+        FundHolding("taxable", "bond", 0.0, BOND_FUND),
+        FundHolding("ira", "stock", 100.0, STOCK_FUND),
+        FundHolding("ira", "bond", 100.0, BOND_FUND),
+    ]
+
+    actual = rebalance(
+        holdings=holdings,
+        target_percentages=HALF_STOCK_HALF_BOND,
+        account_constraints={"taxable": AccountConstraint(allow_sell=False)},
+    )
+
+    assert [(trade.account, trade.fund_name) for trade in actual.trades] == [
+        ("ira", "stock"),
+        ("ira", "bond"),
+    ]
+    assert [trade.amount for trade in actual.trades] == pytest.approx([-100.0, 100.0])
+    assert actual.tracking_error == pytest.approx(600.0)
+
+
+def test_rebalance_invests_cash_flow() -> None:
+    """Test rebalance invests new money without selling."""
+    holdings = [
+        FundHolding("taxable", "stock", 450.0, STOCK_FUND),
+        FundHolding("taxable", "bond", 350.0, BOND_FUND),
+    ]
+
+    actual = rebalance(
+        holdings=holdings,
+        target_percentages=HALF_STOCK_HALF_BOND,
+        account_constraints={
+            "taxable": AccountConstraint(allow_sell=False, cash_flow=200.0)
+        },
+    )
+
+    assert [(trade.account, trade.fund_name) for trade in actual.trades] == [
+        ("taxable", "stock"),
+        ("taxable", "bond"),
+    ]
+    assert [trade.amount for trade in actual.trades] == pytest.approx([50.0, 150.0])
+    assert actual.tracking_error == pytest.approx(0.0, abs=1e-6)
+
+
+def test_rebalance_rounds_trades_to_cents() -> None:
+    """Test rebalance returns cent trades and no solver noise trades."""
+    holdings = [
+        FundHolding("ira", "stock", 333.333, STOCK_FUND),
+        FundHolding("ira", "bond", 666.667, BOND_FUND),
+        FundHolding("401k", "balanced", 1000.0, BALANCED_FUND),
+    ]
+
+    actual = rebalance(
+        holdings=holdings,
+        target_percentages={
+            "us_stock": 55.0,
+            "international_stock": 10.0,
+            "fixed_income": 35.0,
+        },
+        account_constraints={"401k": AccountConstraint(allow_sell=False)},
+    )
+
+    assert actual.trades == [
+        Trade("ira", "stock", 166.67),
+        Trade("ira", "bond", -166.67),
+    ]
+    assert actual.turnover == pytest.approx(333.34)
+
+
+def test_rebalance_keeps_account_cash_flows_after_rounding() -> None:
+    """Test rebalance gives the rounding residual of an account to a trade."""
+    holdings = [
+        FundHolding("taxable", "us", 0.0, STOCK_FUND),
+        FundHolding("taxable", "international", 0.0, {"international_stock": 1.0}),
+        FundHolding("taxable", "bond", 0.0, BOND_FUND),
+    ]
+
+    actual = rebalance(
+        holdings=holdings,
+        target_percentages={
+            "us_stock": 100 / 3,
+            "international_stock": 100 / 3,
+            "fixed_income": 100 / 3,
+        },
+        account_constraints={"taxable": AccountConstraint(cash_flow=100.0)},
+    )
+
+    assert sorted(round(trade.amount * 100) for trade in actual.trades) == [
+        3333,
+        3333,
+        3334,
+    ]
+
+
+def test_target_vector_rejects_targets_not_adding_up_to_100() -> None:
+    """Test target_vector."""
+    with pytest.raises(ValueError):
+        target_vector(target_percentages={"us_stock": 60.0})
+
+
+def test_screen_target_mixes_bounds_rebalance_quickly() -> None:
+    """Test screen_target_mixes bounds the exact plans of many target mixes."""
+    holdings = [
+        FundHolding("taxable", "balanced", 700.0, BALANCED_FUND),
+        FundHolding("taxable", "bond", 0.0, BOND_FUND),
+        FundHolding("ira", "stock", 200.0, STOCK_FUND),
+        FundHolding("ira", "bond", 100.0, BOND_FUND),
+    ]
+    account_constraints = {"taxable": AccountConstraint(allow_sell=False)}
+    random_generator = np.random.default_rng(seed=7)
+    target_mixes = (
+        random_generator.dirichlet(np.ones(len(ASSET_CLASSES)), size=5000) * 100.0
+    )
+
+    start_time = time.perf_counter()
+    actual = screen_target_mixes(
+        holdings=holdings,
+        target_mixes=target_mixes,
+        account_constraints=account_constraints,
+    )
+    elapsed_seconds = time.perf_counter() - start_time
+
+    assert elapsed_seconds < 1.0
+    assert actual.min_turnover.shape == actual.min_tracking_error.shape == (5000,)
+    for target_mix, min_turnover, min_tracking_error in list(
+        zip(target_mixes, actual.min_turnover, actual.min_tracking_error)
+    )[:5]:
+        plan = rebalance(
+            holdings=holdings,
+            target_percentages=dict(zip(ASSET_CLASSES, target_mix)),
+            account_constraints=account_constraints,
+        )
+        assert min_tracking_error <= plan.tracking_error + 1e-6
+        assert min_turnover <= plan.turnover + plan.tracking_error + 1e-6
+
+
+def test_load_target_percentages(tmp_path) -> None:
+    """Test load_target_percentages."""
+    file_path = tmp_path / "target.json"
+    file_path.write_text('{"us_stock": 50, "fixed_income": 50}', encoding="utf-8")
+
+    assert load_target_percentages(file_path=file_path) == HALF_STOCK_HALF_BOND
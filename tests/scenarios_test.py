@@ -0,0 +1,133 @@
+"""This module tests all functions from module scenarios."""
+import pandas as pd
+import pytest
+
+from portfolio_allocation import ALL_ASSET_CLASSES
+from portfolio_allocation.combined_asset_allocation import (
+    generate_asset_allocation_by_asset_class_table,
+    generate_asset_allocation_by_region_and_asset_class_table,
+)
+from portfolio_allocation.allocation_engine import FundHolding
+from portfolio_allocation.scenarios import Scenario, evaluate_scenarios, load_scenarios
+
+HOLDINGS = [
+    FundHolding("401k", "stock", 600.0, {"us_stock": 1.0}),
+    FundHolding("401k", "bond", 200.0, {"fixed_income": 1.0}),
+    FundHolding(
+        "ira", "balanced", 200.0, {"us_stock": 0.5, "international_stock": 0.5}
+    ),
+]
+ASSET_VALUES = {"cash": 100.0, "mortgage": 900.0}
+
+
+def _asset_value(result, asset_type: str) -> float:
+    return result.asset_allocation_by_asset_class_table.loc[
+        asset_type, "asset_value($)"
+    ]
+
+
+def test_evaluate_scenarios_base_matches_tables() -> None:
+    """Test evaluate_scenarios without changes matches the per portfolio tables."""
+    all_asset_allocation = {
+        **dict.fromkeys(ALL_ASSET_CLASSES, 0.0),
+        "us_stock": 700.0,
+        "international_stock": 100.0,
+        "fixed_income": 200.0,
+        **ASSET_VALUES,
+    }
+    expected_asset_class_table = generate_asset_allocation_by_asset_class_table(
+        all_asset_allocation=all_asset_allocation
+    )
+    expected_region_table = generate_asset_allocation_by_region_and_asset_class_table(
+        asset_allocation_by_asset_class_table=expected_asset_class_table
+    )
+
+    (actual,) = evaluate_scenarios(
+        holdings=HOLDINGS, asset_values=ASSET_VALUES, scenarios=[Scenario("base")]
+    )
+
+    assert actual.name == "base"
+    pd.testing.assert_frame_equal(
+        actual.asset_allocation_by_asset_class_table,
+        expected_asset_class_table,
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(
+        actual.asset_allocation_by_region_and_asset_class_table,
+        expected_region_table.astype(float),
+    )
+
+
+def test_evaluate_scenarios_applies_every_delta_kind() -> None:
+    """Test evaluate_scenarios with holding, fund allocation and asset changes."""
+    scenarios = [
+        Scenario(
+            "move", holding_deltas={("401k", "stock"): -100.0, ("401k", "bond"): 100.0}
+        ),
+        Scenario("reallocate", fund_allocations={"balanced": {"fixed_income": 1.0}}),
+        Scenario(
+            "house",
+            asset_value_scales={"mortgage": 0.9},
+            asset_value_deltas={"cash": 50.0},
+        ),
+    ]
+
+    move, reallocate, house = evaluate_scenarios(
+        holdings=HOLDINGS, asset_values=ASSET_VALUES, scenarios=scenarios
+    )
+
+    assert _asset_value(move, "us_stock") == pytest.approx(600.0)
+    assert _asset_value(move, "fixed_income") == pytest.approx(300.0)
+    assert _asset_value(reallocate, "us_stock") == pytest.approx(600.0)
+    assert _asset_value(reallocate, "international_stock") == pytest.approx(0.0)
+    assert _asset_value(reallocate, "fixed_income") == pytest.approx(400.0)
+    assert _asset_value(house, "mortgage") == pytest.approx(810.0)
+    assert _asset_value(house, "cash") == pytest.approx(150.0)
+    assert house.asset_allocation_by_region_and_asset_class_table.loc[
+        "total"
+    ].sum() == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        Scenario("unknown holding", holding_deltas={("ira", "stock"): 1.0}),
+        Scenario("unknown fund", fund_allocations={"gold": {"other": 1.0}}),
+        Scenario("unknown asset", asset_value_deltas={"gold": 1.0}),
+    ],
+)
+def test_evaluate_scenarios_rejects_unknown_changes(scenario) -> None:
+    """Test evaluate_scenarios."""
+    with pytest.raises(ValueError):
+        evaluate_scenarios(
+            holdings=HOLDINGS, asset_values=ASSET_VALUES, scenarios=[scenario]
+        )
+
+
+def test_evaluate_scenarios_keeps_asset_types_outside_all_asset_classes() -> None:
+    """Test evaluate_scenarios with a non blend fund account asset type."""
+    (actual,) = evaluate_scenarios(
+        holdings=HOLDINGS,
+        asset_values={**ASSET_VALUES, "crypto": 50.0},
+        scenarios=[Scenario("crypto drop", asset_value_scales={"crypto": 0.5})],
+    )
+
+    assert _asset_value(actual, "crypto") == pytest.approx(25.0)
+    assert _asset_value(actual, "mortgage") == pytest.approx(900.0)
+
+
+def test_load_scenarios_reads_holding_deltas_as_keys(tmp_path) -> None:
+    """Test load_scenarios."""
+    file_path = tmp_path / "scenarios.json"
+    file_path.write_text(
+        '[{"name": "move", "holding_deltas": [["401k", "stock", -100]]},'
+        ' {"name": "house", "asset_value_scales": {"mortgage": 0.9}}]',
+        encoding="utf-8",
+    )
+
+    actual = load_scenarios(file_path=file_path)
+
+    assert actual == [
+        Scenario("move", holding_deltas={("401k", "stock"): -100.0}),
+        Scenario("house", asset_value_scales={"mortgage": 0.9}),
+    ]